@@ -0,0 +1,82 @@
+"""Configuración centralizada de WAV Automata.
+
+Carga el archivo `.env` una sola vez por proceso (`load_env`) y ofrece
+helpers para leer variables de entorno con defaults seguros.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import List, Optional
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Carga `.env` en el entorno del proceso. Idempotente.
+
+    `python-dotenv` se importa aquí para no pagarlo en el import de la app
+    cuando el entorno ya viene configurado (Cloud Run, GitHub Actions).
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    try:
+        from dotenv import load_dotenv
+    except Exception:  # pragma: no cover - dotenv es opcional en producción
+        return
+    load_dotenv()
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def env_list(name: str, default: Optional[List[str]] = None) -> List[str]:
+    """Lee una lista desde JSON (`["a","b"]`) o separada por comas (`a,b`)."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return list(default or [])
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list):
+            return [str(x).strip() for x in parsed if str(x).strip()]
+    except ValueError:
+        pass
+    return [p.strip() for p in raw.split(",") if p.strip()]
+
+
+def configured_accounts() -> List[str]:
+    """Cuentas gestionadas por el scheduler.
+
+    Usa `SCHEDULER_ACCOUNTS` y, si no está, `ACCOUNTS_JSON` (el mismo valor
+    que recibe el workflow diario).
+    """
+    accounts = env_list("SCHEDULER_ACCOUNTS") or env_list("ACCOUNTS_JSON")
+    return accounts or ["vibecodinglatam"]
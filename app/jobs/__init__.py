@@ -0,0 +1 @@
+"""Jobs batch ejecutables con `python -m app.jobs.<nombre>`."""
@@ -0,0 +1,164 @@
+"""Backfill de embeddings para items que aún no tienen fila en `item_embeddings`.
+
+Uso:
+    python -m app.jobs.backfill_embeddings [--page-size 500] [--batch-size 100]
+        [--concurrency 4] [--checkpoint .backfill_embeddings.json] [--reset]
+
+Recorre `items` por keyset (`id > último_id`), descarta los que ya tienen
+embedding, embebe el resto en lotes del tamaño del proveedor con
+concurrencia acotada y guarda los vectores en bulk. Tras cada página
+completa guarda el último id procesado en el checkpoint: un reinicio retoma
+desde ahí. Un item embebido por la cola entre el filtro y la escritura no se
+duplica: el upsert sobre `(item_id, model)` conserva la fila existente.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import load_env
+from ..services.embedding_codec import embedding_columns, upsert_embeddings
+from ..services.embeddings import DEFAULT_EMBEDDING_MODEL, embedding_text, get_embeddings_array
+from ..services.keyset import KeysetScan
+from ..services.supabase_client import get_client
+
+DEFAULT_CHECKPOINT = ".backfill_embeddings.json"
+
+
+def load_checkpoint(path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(path.read_text())
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path: Path, state: Dict[str, Any]) -> None:
+    """Escritura atómica: nunca deja un checkpoint a medio escribir."""
+    state = {**state, "updated_at": datetime.now(timezone.utc).isoformat()}
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+
+def iter_missing(
+    supabase: Any, after_id: int, page_size: int
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """Páginas `(último_id_visto, items_sin_embedding)` en orden de id (keyset, sin OFFSET).
+
+    El cursor avanza aunque la página no tenga faltantes.
+    """
+    scan = KeysetScan(
+        supabase, "items", columns="id,title,summary", page_size=page_size, after=(after_id,)
+    )
+    for rows in scan.pages():
+        ids = [r["id"] for r in rows]
+        have = (
+            supabase.table("item_embeddings").select("item_id").in_("item_id", ids).execute()
+        ).data or []
+        done = {r["item_id"] for r in have}
+        yield int(ids[-1]), [r for r in rows if r["id"] not in done]
+
+
+def embed_and_insert(supabase: Any, rows: Sequence[Dict[str, Any]], model: str) -> int:
+    """Embebe un lote con una llamada multi-input y guarda todas sus filas juntas."""
+    texts = [embedding_text(r.get("title") or "", r.get("summary")) for r in rows]
+    matrix = get_embeddings_array(texts, model=model, fallback=False)
+    payload = [
+        {"item_id": r["id"], **embedding_columns(vec), "model": model}
+        for r, vec in zip(rows, matrix)
+    ]
+    upsert_embeddings(supabase, payload).execute()
+    return len(payload)
+
+
+def run(
+    supabase: Any,
+    checkpoint: Path,
+    page_size: int = 500,
+    batch_size: int = 100,
+    concurrency: int = 4,
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    max_items: Optional[int] = None,
+    log: Any = print,
+) -> Dict[str, Any]:
+    """Ejecuta el backfill y devuelve el estado final del checkpoint."""
+    state = {"last_id": 0, "scanned_pages": 0, "embedded": 0, **load_checkpoint(checkpoint)}
+    t0 = time.perf_counter()
+    embedded_now = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for cursor, page in iter_missing(supabase, int(state["last_id"]), page_size):
+            if max_items is not None and len(page) > max_items - embedded_now:
+                # Corte parcial: el checkpoint queda en el último item realmente embebido
+                page = page[: max(0, max_items - embedded_now)]
+                cursor = int(page[-1]["id"]) if page else int(state["last_id"])
+            batches = [page[i : i + batch_size] for i in range(0, len(page), batch_size)]
+            # La página completa debe terminar antes de avanzar el checkpoint
+            counts = list(pool.map(lambda b: embed_and_insert(supabase, b, model), batches))
+            embedded_now += sum(counts)
+
+            state["last_id"] = cursor
+            state["scanned_pages"] = int(state["scanned_pages"]) + 1
+            state["embedded"] = int(state["embedded"]) + sum(counts)
+            save_checkpoint(checkpoint, state)
+
+            elapsed = time.perf_counter() - t0
+            rate = embedded_now / elapsed if elapsed > 0 else 0.0
+            log(
+                f"[backfill] last_id={cursor} +{sum(counts)} "
+                f"total={embedded_now} ({rate:.1f} items/s)"
+            )
+            if max_items is not None and embedded_now >= max_items:
+                break
+
+    elapsed = time.perf_counter() - t0
+    log(
+        f"[backfill] terminado: {embedded_now} items en {elapsed:.1f}s "
+        f"({embedded_now / elapsed if elapsed > 0 else 0.0:.1f} items/s)"
+    )
+    return state
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Backfill de embeddings faltantes en item_embeddings")
+    ap.add_argument("--page-size", type=int, default=500)
+    ap.add_argument("--batch-size", type=int, default=100, help="textos por llamada al proveedor")
+    ap.add_argument("--concurrency", type=int, default=4, help="llamadas simultáneas")
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    ap.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    ap.add_argument("--max-items", type=int, default=None)
+    ap.add_argument("--reset", action="store_true", help="ignora el checkpoint y empieza de cero")
+    args = ap.parse_args(argv)
+
+    load_env()
+    checkpoint = Path(args.checkpoint)
+    if args.reset and checkpoint.exists():
+        checkpoint.unlink()
+    try:
+        supabase = get_client()
+    except Exception as e:
+        print(f"[backfill] error: {e}", file=sys.stderr)
+        return 1
+    run(
+        supabase,
+        checkpoint,
+        page_size=args.page_size,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        model=args.model,
+        max_items=args.max_items,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
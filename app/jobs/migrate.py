@@ -0,0 +1,150 @@
+"""Migraciones SQL versionadas (`src/sql/migrations/NNNN_nombre.sql`).
+
+Uso:
+    python -m app.jobs.migrate [--status] [--dsn postgresql://...]
+
+Aplica en orden las migraciones pendientes, cada una en su propia transacción,
+y registra versión y checksum en `public.schema_migrations`. Requiere
+`psycopg` (`pip install "psycopg[binary]"`) y `DATABASE_URL`: la connection
+string de Supabase o la del Postgres local (`supabase start`).
+
+Las migraciones son idempotentes (`if not exists`): en una base creada con
+los scripts sueltos anteriores se aplican sin efecto y quedan registradas.
+Una migración ya aplicada cuyo archivo cambió se reporta y no se reaplica:
+los cambios van en una migración nueva.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..config import env_str, load_env
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "src" / "sql" / "migrations"
+_FILE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+_LEDGER = """
+create table if not exists public.schema_migrations (
+  version text primary key,
+  name text not null,
+  checksum text not null,
+  applied_at timestamptz not null default now()
+)
+"""
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    path: Path
+    checksum: str
+
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+
+def discover(root: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Migraciones ordenadas por versión; nombres inválidos o versiones repetidas fallan."""
+    found: Dict[str, Migration] = {}
+    for path in sorted(root.glob("*.sql")):
+        m = _FILE.match(path.name)
+        if m is None:
+            raise ValueError(
+                f"nombre de migración inválido: {path.name} (esperado NNNN_nombre.sql)"
+            )
+        version, name = m.groups()
+        if version in found:
+            raise ValueError(f"versión repetida {version}: {found[version].path.name}, {path.name}")
+        checksum = hashlib.sha256(path.read_bytes()).hexdigest()
+        found[version] = Migration(version, name, path, checksum)
+    return [found[v] for v in sorted(found)]
+
+
+def connect(dsn: Optional[str] = None) -> Any:
+    """Conexión psycopg en autocommit (cada migración abre su transacción)."""
+    dsn = dsn or env_str("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL no configurada")
+    try:
+        psycopg = importlib.import_module("psycopg")
+    except ModuleNotFoundError as e:
+        raise RuntimeError('falta psycopg: pip install "psycopg[binary]"') from e
+    return psycopg.connect(dsn, autocommit=True)
+
+
+def applied(conn: Any) -> Dict[str, str]:
+    """versión → checksum de lo ya aplicado ({} si la tabla de registro no existe)."""
+    row = conn.execute("select to_regclass('public.schema_migrations')").fetchone()
+    if row is None or row[0] is None:
+        return {}
+    rows = conn.execute("select version, checksum from public.schema_migrations").fetchall()
+    return {str(v): str(c) for v, c in rows}
+
+
+def pending(
+    migrations: Sequence[Migration], done: Dict[str, str]
+) -> Tuple[List[Migration], List[Migration]]:
+    """(por aplicar, aplicadas cuyo archivo cambió)."""
+    todo = [m for m in migrations if m.version not in done]
+    changed = [m for m in migrations if m.version in done and done[m.version] != m.checksum]
+    return todo, changed
+
+
+def apply(conn: Any, migrations: Sequence[Migration], log: Any = print) -> int:
+    """Aplica las pendientes en orden; devuelve cuántas. Se detiene en el primer error."""
+    conn.execute(_LEDGER)
+    todo, changed = pending(migrations, applied(conn))
+    for m in changed:
+        log(f"[migrate] warning: {m.path.name} cambió después de aplicarse (no se reaplica)")
+    for m in todo:
+        with conn.transaction():
+            conn.execute(m.sql())
+            conn.execute(
+                "insert into public.schema_migrations (version, name, checksum)"
+                " values (%s, %s, %s)",
+                (m.version, m.name, m.checksum),
+            )
+        log(f"[migrate] {m.version} {m.name} aplicada")
+    return len(todo)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Aplica las migraciones SQL pendientes")
+    ap.add_argument("--dsn", default=None, help="connection string (default: DATABASE_URL)")
+    ap.add_argument("--status", action="store_true", help="sólo lista el estado")
+    args = ap.parse_args(argv)
+
+    load_env()
+    migrations = discover()
+    try:
+        conn = connect(args.dsn)
+    except Exception as e:
+        print(f"[migrate] error: {e}", file=sys.stderr)
+        return 1
+    with conn:
+        if args.status:
+            done = applied(conn)
+            _, changed = pending(migrations, done)
+            for m in migrations:
+                state = (
+                    "cambiada" if m in changed else "aplicada" if m.version in done else "pendiente"
+                )
+                print(f"{m.version}  {state:<9}  {m.name}")
+            return 0
+        try:
+            n = apply(conn, migrations)
+        except Exception as e:
+            print(f"[migrate] error: {e}", file=sys.stderr)
+            return 1
+    print(f"[migrate] {n} migraciones aplicadas" if n else "[migrate] la base está al día")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""EXPLAIN de las consultas calientes de la app contra un Postgres local.
+
+Uso:
+    python -m app.jobs.query_plans [--dsn postgresql://...]   (o verify_supabase.py --plans)
+
+Cada entrada de `HOT_QUERIES` es el SQL que PostgREST genera para una
+consulta de los routers/servicios (`in_` → `= any(...)`, keyset compuesto →
+`a < X or (a = X and b < Y)`, en ascendente `... or a is null`). Se explica
+con `enable_seqscan = off`: en una base local casi vacía el planner prefiere
+Seq Scan aunque exista el índice; así sólo cae a Seq Scan si ningún índice
+sirve, y eso es lo que se reporta.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Iterator, List, NamedTuple, Optional, Sequence
+
+from ..config import load_env
+from .migrate import connect
+
+
+class HotQuery(NamedTuple):
+    name: str
+    origin: str  # dónde se emite en el código
+    sql: str
+
+
+_ACCOUNTS = "array['vibecodinglatam','wavwearevision']"
+_FEEDBACK_COLS = "account, likes, comments, saves, followers, content_type, posted_at, id"
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        "recent_items",
+        "services/recent_items.py",
+        "select id, title, summary, created_at from public.items "
+        "order by created_at desc limit 20",
+    ),
+    HotQuery(
+        "trends_page",
+        "routers/scheduler_ai.py trends (KeysetScan)",
+        "select title, created_at from public.items "
+        "where created_at >= now() - interval '14 days' "
+        "and (created_at < '2026-01-10' or (created_at = '2026-01-10' and id < 500)) "
+        "order by created_at desc, id desc limit 1000",
+    ),
+    HotQuery(
+        "dedup_rebuild",
+        "services/dedup.py rebuild (KeysetScan)",
+        "select id, title, summary from public.items "
+        "order by created_at desc, id desc limit 1000",
+    ),
+    HotQuery(
+        "engagement_matrix",
+        "services/engagement_matrix.py (next_post, heatmap)",
+        f"select {_FEEDBACK_COLS} from public.posts_feedback "
+        f"where account = any({_ACCOUNTS}) order by posted_at desc, id desc limit 1000",
+    ),
+    HotQuery(
+        "engagement_matrix_account_page",
+        "services/engagement_matrix.py (next_post de una cuenta, página siguiente)",
+        f"select {_FEEDBACK_COLS} from public.posts_feedback "
+        "where account = 'vibecodinglatam' "
+        "and (posted_at < '2026-01-10' or (posted_at = '2026-01-10' and id < 500)) "
+        "order by posted_at desc, id desc limit 1000",
+    ),
+    HotQuery(
+        "model_params",
+        "services/scheduler_core.py get_model_params_many",
+        "select account, w_engagement, w_relevance, learning_rate "
+        f"from public.scheduler_model_params where account = any({_ACCOUNTS})",
+    ),
+    HotQuery(
+        "daily_plan",
+        "services/daily_plan.py load",
+        "select account, hours, built_at from public.scheduler_daily_plan "
+        f"where plan_date = current_date and account = any({_ACCOUNTS})",
+    ),
+    HotQuery(
+        "daily_runs",
+        "services/daily_runs.py fetch_runs",
+        "select account, result from public.scheduler_daily_runs "
+        f"where run_date = current_date and account = any({_ACCOUNTS})",
+    ),
+    HotQuery(
+        "embed_status",
+        "routers/semantic.py embed_status",
+        "select item_id, model from public.item_embeddings where item_id = 1 limit 1",
+    ),
+    HotQuery(
+        "shared_index",
+        "services/shared_index.py",
+        "select * from public.item_embeddings where model = 'text-embedding-3-small' "
+        "order by item_id desc limit 5000",
+    ),
+    HotQuery(
+        "vector_store_sync",
+        "services/vector_store.py (KeysetScan)",
+        "select * from public.item_embeddings where model = 'text-embedding-3-small' "
+        "and (created_at > '2026-01-10' or (created_at = '2026-01-10' and item_id > 500) "
+        "or created_at is null) order by created_at, item_id limit 1000",
+    ),
+    HotQuery(
+        "export_posts_feedback",
+        "routers/export.py (KeysetScan por id)",
+        f"select {_FEEDBACK_COLS} from public.posts_feedback "
+        "where account = 'vibecodinglatam' and id > 500 order by id limit 1000",
+    ),
+]
+
+
+class PlanReport(NamedTuple):
+    query: HotQuery
+    seq_scans: List[str]  # tablas recorridas con Seq Scan
+    indexes: List[str]
+    error: Optional[str] = None
+
+
+def _nodes(plan: Any) -> Iterator[Any]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def seq_scans(plan: Any) -> List[str]:
+    return [n.get("Relation Name", "?") for n in _nodes(plan) if n.get("Node Type") == "Seq Scan"]
+
+
+def indexes(plan: Any) -> List[str]:
+    return [n["Index Name"] for n in _nodes(plan) if "Index Name" in n]
+
+
+def explain(conn: Any, sql: str) -> Any:
+    """Plan (raíz) de `EXPLAIN (FORMAT JSON)` con `enable_seqscan = off`; no ejecuta la consulta."""
+    with conn.transaction():
+        conn.execute("set local enable_seqscan = off")
+        raw = conn.execute("explain (format json) " + sql).fetchone()[0]
+    doc = json.loads(raw) if isinstance(raw, str) else raw
+    return doc[0]["Plan"]
+
+
+def check(conn: Any, queries: Sequence[HotQuery] = HOT_QUERIES) -> List[PlanReport]:
+    out = []
+    for q in queries:
+        try:
+            plan = explain(conn, q.sql)
+        except Exception as e:  # tabla o columna faltante: migración pendiente
+            out.append(PlanReport(q, [], [], error=str(e).strip()))
+            continue
+        out.append(PlanReport(q, seq_scans(plan), indexes(plan)))
+    return out
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="EXPLAIN de las consultas calientes")
+    ap.add_argument("--dsn", default=None, help="connection string (default: DATABASE_URL)")
+    args = ap.parse_args(argv)
+
+    load_env()
+    try:
+        conn = connect(args.dsn)
+    except Exception as e:
+        print(f"[query_plans] error: {e}", file=sys.stderr)
+        return 1
+    with conn:
+        reports = check(conn)
+    for r in reports:
+        if r.error:
+            print(f"ERROR     {r.query.name}: {r.error}")
+        elif r.seq_scans:
+            print(f"SEQ SCAN  {r.query.name}: {', '.join(r.seq_scans)}  ({r.query.origin})")
+        else:
+            print(f"ok        {r.query.name}: {', '.join(r.indexes)}")
+    return 1 if any(r.error or r.seq_scans for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
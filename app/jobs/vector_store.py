@@ -0,0 +1,65 @@
+"""Mantenimiento del vector store local (`VECTOR_STORE_DIR`).
+
+Uso:
+    python -m app.jobs.vector_store sync     [--dir .vectors] [--model text-embedding-3-small]
+    python -m app.jobs.vector_store check    [--dir .vectors]
+    python -m app.jobs.vector_store compact  [--dir .vectors]
+
+- `sync`    → baja sólo las filas posteriores a la marca de agua
+- `check`   → compara ids locales con `item_embeddings` (exit 2 si difieren)
+- `compact` → quita filas de items borrados en Supabase y duplicados
+
+Se puede correr con el servidor arriba: toma el mismo `flock` del directorio
+que el `sync` del publicador del índice y espera a que termine. `compact`
+lee los ids de Supabase con el lock tomado, así un `sync` del servidor no
+agrega filas entre el snapshot y la reescritura.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import Optional, Sequence
+
+from ..config import env_str, load_env
+from ..services.embeddings import DEFAULT_EMBEDDING_MODEL
+from ..services.supabase_client import get_client
+from ..services.vector_store import LocalVectorStore
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    load_env()
+    ap = argparse.ArgumentParser(description="Vector store local de item_embeddings")
+    ap.add_argument("command", choices=("sync", "check", "compact"))
+    ap.add_argument("--dir", default=env_str("VECTOR_STORE_DIR", ".vectors"))
+    ap.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    args = ap.parse_args(argv)
+
+    store = LocalVectorStore(args.dir, args.model)
+    try:
+        supabase = get_client()
+    except Exception as e:
+        print(f"[vector_store] error: {e}", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    if args.command == "sync":
+        added = store.sync(supabase)
+        print(
+            f"[vector_store] +{added} filas (total={store.count}, "
+            f"watermark={store.watermark}) en {time.perf_counter() - t0:.1f}s"
+        )
+        return 0
+    if args.command == "check":
+        report = store.check(supabase)
+        print(json.dumps(report, indent=2))
+        return 0 if report["consistent"] else 2
+    removed = store.compact(supabase)
+    print(f"[vector_store] compactado: -{removed} filas (total={store.count})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
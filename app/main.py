@@ -1,14 +1,44 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
+from .config import env_bool, load_env
 from .models.schemas import ItemInput
-from .routers import generator, scheduler_ai, semantic
+from .routers import debug, export, generator, scheduler_ai, semantic
+from .services import dedup, embedding_queue, embeddings, shared_index, warmup
+from .services.fastjson import FastJSONResponse, fast_json_enabled
+from .services.metrics import metrics
+from .services.profiling import ProfilingMiddleware
+from .services.recent_items import invalidate_recent_items
+from .services.supabase_client import breaker as supabase_breaker
 from .services.supabase_client import get_client
 
-# 🔹 Carga variables del archivo .env
-load_dotenv()
+# 🔹 Carga variables del archivo .env (único punto de carga del proceso)
+load_env()
+
+
+# 🔥 Warm-up en segundo plano: /health responde de inmediato, /ready al terminar
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    warmup.reset()
+    task = asyncio.create_task(warmup.run_warmup())
+    embedding_queue.start_queue()
+    # Índice de embeddings compartido: un worker lo publica, el resto lo mapea
+    shared_index.start_index()
+    try:
+        yield
+    finally:
+        if not task.done():
+            task.cancel()
+        # Drena los embeddings pendientes antes de salir (acotado)
+        await asyncio.to_thread(embedding_queue.stop_queue)
+        await asyncio.to_thread(embeddings.stop_batcher)
+        await asyncio.to_thread(shared_index.stop_index)
+
 
 # 🔹 Instancia de la app FastAPI
 app = FastAPI(
@@ -17,18 +47,49 @@ app = FastAPI(
     description=(
         "Backend neurocoherente para detección, análisis y generación de contenido " "inteligente."
     ),
+    lifespan=lifespan,
+    # FAST_JSON=1 → respuestas serializadas con orjson (ver services/fastjson.py)
+    default_response_class=FastJSONResponse if fast_json_enabled() else JSONResponse,
 )
 
 # 🔹 Registro de routers por dominio
+if env_bool("ASYNC_ROUTERS", False):
+    # ⚡ Versiones async (clientes async de Supabase/OpenAI): registradas antes, sus rutas
+    # tienen prioridad; el resto de endpoints sigue en los routers sync
+    from .routers import generator_async, scheduler_async, semantic_async
+
+    app.include_router(semantic_async.router)
+    app.include_router(generator_async.router)
+    app.include_router(scheduler_async.router)
 app.include_router(semantic.router)
 app.include_router(generator.router)
 app.include_router(scheduler_ai.router)
+app.include_router(export.router)
+app.include_router(debug.router)
+
+# 🔬 Perfilado por request: sólo con PROFILING_ENABLED + headers X-Profile y X-Admin-Token
+app.add_middleware(ProfilingMiddleware)
 
 
-# 🩺 Endpoint de salud (verifica que la API esté viva)
+# 🩺 Endpoint de salud (verifica que la API esté viva; incluye el circuito de Supabase)
 @app.get("/health")
 def health() -> dict:
-    return {"status": "ok", "project": "WAV Automata"}
+    return {"status": "ok", "project": "WAV Automata", "supabase": supabase_breaker.snapshot()}
+
+
+# 🚦 Readiness: 200 sólo cuando terminó el warm-up (gate para balanceadores y cron)
+@app.get("/ready")
+def ready() -> JSONResponse:
+    snapshot = warmup.state.snapshot()
+    if not snapshot["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", **snapshot})
+    return JSONResponse(content={"status": "ready", **snapshot})
+
+
+# 📊 Métricas en memoria del proceso (cola de embeddings, etc.)
+@app.get("/metrics")
+def get_metrics() -> dict:
+    return metrics.snapshot()
 
 
 # 🧩 Endpoint de prueba de conexión a Supabase
@@ -71,24 +132,39 @@ def insert_item(item: ItemInput) -> dict:
     desde cualquier fuente (RSS, IA o manual).
     """
     try:
+        # Casi duplicados: se rechazan o se enlazan al canónico según DEDUP_POLICY
+        dup = dedup.find_duplicate(item.title, item.summary)
+        if dup is not None and dup.action == "reject":
+            return {
+                "status": "duplicate",
+                "canonical_id": dup.item_id,
+                "similarity": dup.similarity,
+                "rows_affected": 0,
+            }
+
         supabase = get_client()
-        response = (
-            supabase.table("items")
-            .insert(
-                {
-                    "source": item.source,
-                    "title": item.title,
-                    "url": item.url,
-                    "summary": item.summary,
-                }
-            )
-            .execute()
-        )
+        row = {
+            "source": item.source,
+            "title": item.title,
+            "url": item.url,
+            "summary": item.summary,
+        }
+        if dup is not None:
+            row["canonical_item_id"] = dup.item_id
+        response = dedup.insert_row(supabase, row)
+        invalidate_recent_items()
+        inserted_id = response.data[0]["id"] if response.data else None
+        if dup is None:
+            dedup.register(inserted_id, item.title, item.summary)
+        # Embedding en segundo plano: la respuesta no espera al proveedor
+        embedding = embedding_queue.enqueue_item_embedding(inserted_id, item.title, item.summary)
 
         return {
             "status": "ok",
-            "inserted_id": response.data[0]["id"] if response.data else None,
+            "inserted_id": inserted_id,
             "rows_affected": len(response.data),
+            "embedding": embedding,
+            "canonical_id": dup.item_id if dup is not None else None,
         }
     except Exception as e:
         return {"status": "error", "detail": str(e)}
@@ -25,6 +25,25 @@ class EmbedItemResponse(BaseModel):
     embedding_dimensions: Optional[int] = None
 
 
+class EmbedStatusResponse(BaseModel):
+    item_id: str
+    state: str  # queued | processing | done | failed | dropped | unknown
+    updated_at: Optional[str] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+
+
+class SimilarItem(BaseModel):
+    item_id: int
+    similarity: float
+
+
+class SimilarResponse(BaseModel):
+    item_id: int
+    index_epoch: int
+    results: List[SimilarItem]
+
+
 # Scoring
 class ScoreRequest(BaseModel):
     text: str
@@ -40,6 +59,7 @@ class ScoreResponse(BaseModel):
 # Generación
 class GeneratorRequest(BaseModel):
     topic: str
+    account: Optional[str] = Field(default=None, description="Cuenta destino (estilo y hashtags)")
     brand_voice: Optional[str] = None
     keywords: Optional[List[str]] = None
     length: Optional[int] = Field(default=120, description="Largo aproximado del copy")
@@ -49,3 +69,26 @@ class GeneratorResponse(BaseModel):
     text: str
     hashtags: List[str]
     visual_prompt: str
+
+
+# Scheduler (compartidos por los routers y `services/scheduler_core`)
+class NextPostResponse(BaseModel):
+    account: str
+    recommended_time: str = Field(description="Hora local en formato HH:MM")
+    content_type: str
+    topic: str
+    priority: float
+    generated_at: Optional[str] = Field(
+        default=None, description="Cuándo se calculó la recomendación (plan diario)"
+    )
+
+
+class FeedbackRequest(BaseModel):
+    account: str
+    post_id: str
+    content_type: Optional[str] = Field(default=None, description="reel, carousel, post, story")
+    likes: int
+    comments: int
+    saves: int
+    reach: int
+    followers: Optional[int] = Field(default=None, description="Followers del momento del post")
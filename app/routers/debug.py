@@ -0,0 +1,56 @@
+"""Descarga de perfiles capturados por `ProfilingMiddleware` (services/profiling.py).
+
+    GET /debug/profiles                        → lista, el más nuevo primero
+    GET /debug/profiles/{id}                   → `.prof` (pstats / snakeviz)
+    GET /debug/profiles/{id}?format=text       → top de funciones por tiempo acumulado
+
+Requieren `X-Admin-Token`; con `PROFILING_ENABLED` apagado responden 404.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any, Dict
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+
+from ..services.auth import admin_ok
+from ..services.profiling import profile_store, profiling_enabled
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def _guard(x_admin_token: str) -> None:
+    if not profiling_enabled():
+        raise HTTPException(status_code=404, detail="Profiling disabled")
+    if not admin_ok(x_admin_token):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+@router.get("/profiles")
+def list_profiles(x_admin_token: str = Header(..., alias="X-Admin-Token")) -> Dict[str, Any]:
+    _guard(x_admin_token)
+    store = profile_store()
+    return {"dir": str(store.root), "keep": store.keep, "profiles": store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("prof", pattern="^(prof|text)$"),
+    limit: int = Query(40, ge=1, le=500),
+    x_admin_token: str = Header(..., alias="X-Admin-Token"),
+) -> Response:
+    _guard(x_admin_token)
+    path = profile_store().path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "prof":
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+    import pstats
+
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).sort_stats("cumulative").print_stats(limit)
+    return PlainTextResponse(out.getvalue())
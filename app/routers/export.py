@@ -0,0 +1,257 @@
+"""Export en streaming de `posts_feedback` e `items` para análisis.
+
+    GET /export/posts_feedback?format=csv&account=acc&since=2026-01-01&gzip=true
+    GET /export/items?format=ndjson&until=2026-02-01
+
+Requieren `X-Admin-Token` (el `ADMIN_TOKEN` del entorno, como
+`/scheduler/weights/update`): son volcados completos de las tablas.
+
+Recorre la tabla por keyset sobre `id` (`services/keyset.py`) en páginas de
+`page_size` filas y serializa cada página apenas llega: la memoria no crece
+con el tamaño del resultado. Formatos: `csv`, `ndjson` y `parquet`
+(un row group por página con el esquema declarado en `TABLES`; requiere
+`pyarrow`, si no está responde 501). `gzip=true` comprime al vuelo y entrega
+un `.gz`.
+"""
+
+from __future__ import annotations
+
+import csv
+import importlib
+import io
+import itertools
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..config import env_int
+from ..services.auth import admin_ok
+from ..services.fastjson import dumps
+from ..services.keyset import KeysetScan
+from ..services.metrics import metrics
+from ..services.supabase_client import get_client
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# tabla → (columna exportada → tipo Arrow, columna de fecha para since/until).
+# El esquema Parquet es fijo: inferirlo de la primera página deja como `null`
+# una columna vacía ahí y la página siguiente falla con la respuesta ya en curso.
+# Las fechas van como texto ISO, tal como las devuelve PostgREST.
+TABLES: Dict[str, Tuple[Dict[str, str], str]] = {
+    "posts_feedback": (
+        {
+            "id": "int64",
+            "account": "string",
+            "post_id": "string",
+            "content_type": "string",
+            "likes": "int64",
+            "comments": "int64",
+            "saves": "int64",
+            "reach": "int64",
+            "followers": "int64",
+            "engagement_score": "float64",
+            "posted_at": "string",
+        },
+        "posted_at",
+    ),
+    "items": (
+        {
+            "id": "int64",
+            "source": "string",
+            "title": "string",
+            "url": "string",
+            "summary": "string",
+            "created_at": "string",
+        },
+        "created_at",
+    ),
+}
+
+
+def _pages(
+    supabase: Any,
+    table: str,
+    page_size: int,
+    account: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Iterator[List[Dict[str, Any]]]:
+    """Páginas de filas en orden de `id` (keyset, con la siguiente en prefetch)."""
+    types, date_col = TABLES[table]
+
+    def where(q: Any) -> Any:
+        if account:
+            q = q.eq("account", account)
+        if since:
+            q = q.gte(date_col, since.isoformat())
+        if until:
+            q = q.lt(date_col, until.isoformat())
+        return q
+
+    return KeysetScan(
+        supabase, table, columns=list(types), page_size=page_size, where=where
+    ).pages()
+
+
+def _csv(columns: List[str], pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for rows in pages:
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _ndjson(pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in pages:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+class _Sink(io.RawIOBase):
+    """Archivo de sólo escritura que acumula bytes hasta que se drenan."""
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        out, self.chunks = b"".join(self.chunks), []
+        return out
+
+
+def _parquet(
+    pa: Any, types: Dict[str, str], pages: Iterator[List[Dict[str, Any]]]
+) -> Iterator[bytes]:
+    pq = importlib.import_module("pyarrow.parquet")
+
+    schema = pa.schema([(col, getattr(pa, t)()) for col, t in types.items()])
+    sink = _Sink()
+    # Sin filas queda un archivo válido con el esquema y cero filas
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in pages:
+        writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def _export(
+    table: str,
+    fmt: str,
+    account: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    page_size: Optional[int],
+    gzip: bool,
+) -> StreamingResponse:
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=422, detail="format must be 'csv', 'ndjson' or 'parquet'")
+    pa: Any = None
+    if fmt == "parquet":
+        try:
+            pa = importlib.import_module("pyarrow")  # opcional
+        except ImportError:
+            raise HTTPException(status_code=501, detail="parquet requiere pyarrow")
+    try:
+        supabase = get_client()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Supabase unavailable")
+
+    types, _ = TABLES[table]
+    size = max(1, min(page_size or env_int("EXPORT_PAGE_SIZE", 1000), 10_000))
+    pages = _pages(supabase, table, size, account, since, until)
+    # Primera página antes de responder: un error de Supabase es 503, no un 200 cortado
+    try:
+        first = next(pages, None)
+    except Exception as e:
+        print("[export] warning:", e)
+        raise HTTPException(status_code=503, detail="Supabase query failed")
+
+    def counted() -> Iterator[List[Dict[str, Any]]]:
+        for page in itertools.chain([first] if first else [], pages):
+            metrics.inc(f"export.{table}.rows", len(page))
+            yield page
+
+    if fmt == "csv":
+        body = _csv(list(types), counted())
+    elif fmt == "ndjson":
+        body = _ndjson(counted())
+    else:
+        body = _parquet(pa, types, counted())
+
+    media_type, ext = FORMATS[fmt]
+    filename = f"{table}-{datetime.now(timezone.utc):%Y%m%d}.{ext}"
+    if gzip:
+        body, media_type, filename = _gzip(body), "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _guard(x_admin_token: str) -> None:
+    if not admin_ok(x_admin_token):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+@router.get("/posts_feedback")
+def export_posts_feedback(
+    format: str = "csv",
+    account: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="posted_at >= since"),
+    until: Optional[datetime] = Query(None, description="posted_at < until"),
+    page_size: Optional[int] = Query(None, ge=1, le=10_000),
+    gzip: bool = False,
+    x_admin_token: str = Header(..., alias="X-Admin-Token"),
+) -> StreamingResponse:
+    """Historial de engagement, filtrable por cuenta y rango de `posted_at`."""
+    _guard(x_admin_token)
+    return _export("posts_feedback", format, account, since, until, page_size, gzip)
+
+
+@router.get("/items")
+def export_items(
+    format: str = "csv",
+    since: Optional[datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime] = Query(None, description="created_at < until"),
+    page_size: Optional[int] = Query(None, ge=1, le=10_000),
+    gzip: bool = False,
+    x_admin_token: str = Header(..., alias="X-Admin-Token"),
+) -> StreamingResponse:
+    """Items ingeridos, filtrables por rango de `created_at`."""
+    _guard(x_admin_token)
+    return _export("items", format, None, since, until, page_size, gzip)
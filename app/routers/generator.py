@@ -1,57 +1,62 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+import json
+from typing import Any, Dict, Iterator
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from ..models.schemas import GeneratorRequest, GeneratorResponse
+from ..services.fastjson import fast_route
+from ..services.generation import generate, stream_post
 
 router = APIRouter(prefix="/generator", tags=["generator"])
 
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
 
-@router.post("/post", response_model=GeneratorResponse)
+@fast_route(router.post("/post", response_model=GeneratorResponse))
 def generate_post(payload: GeneratorRequest) -> GeneratorResponse:
     """
     Genera un copy, hashtags y prompt visual coherente con la cuenta o marca indicada.
     Puede ser usado por el agente para generar contenido diario automatizado.
+
+    El backend (plantilla o LLM) se elige con `GENERATION_BACKEND`; ver services/generation.py.
     """
-    topic = payload.topic.strip()
-    voice = (payload.brand_voice or "").strip()
-    kws = payload.keywords or []
-    account = getattr(payload, "account", "").lower()
-    length = max(80, min(400, payload.length or 150))
-
-    # Estilos base por cuenta
-    styles = {
-        "wavwearevision": "tono institucional, reflexivo y estratégico",
-        "vibecodinglatam": "tono innovador, optimista y tecnológico",
-        "consdelrosario": "tono empático, emocional y humano",
-        "felguetaedwards": "tono inspirador, introspectivo y honesto",
-    }
-    style = styles.get(account, f"tono {voice}" if voice else "tono neutro y coherente")
-
-    # Construcción del copy
-    base = f"{topic} ({style})."
-    detail = " " + ", ".join(kws) if kws else ""
-    copy = (
-        f"{base} {detail}"
-        if len(base) + len(detail) <= length
-        else (base + detail)[: length - 1] + "…"
-    )
+    return generate(payload)
+
+
+def frame(fmt: str, kind: str, record: Dict[str, Any]) -> str:
+    body = json.dumps({"type": kind, **record}, ensure_ascii=False)
+    if fmt == "sse":
+        return f"event: {kind}\ndata: {body}\n\n"
+    return body + "\n"
 
-    # Hashtags adaptativos
-    hashtags = [f"#{k.replace(' ', '').capitalize()}" for k in kws if k]
-    if account == "vibecodinglatam":
-        hashtags += ["#IA", "#Innovacion", "#Comunidad"]
-    elif account == "wavwearevision":
-        hashtags += ["#Liderazgo", "#Cultura", "#Proposito"]
-    elif account == "consdelrosario":
-        hashtags += ["#Psicologia", "#Autenticidad", "#Bienestar"]
-    elif account == "felguetaedwards":
-        hashtags += ["#MasculinidadConsciente", "#Reflexion", "#Propósito"]
-
-    # Prompt visual
-    visual_prompt = (
-        f"Arte conceptual del tema '{topic}', estilo coherente con {account or 'la marca'}, "
-        f"{style}, composición limpia, color balanceado, formato cuadrado 1:1."
-    )
 
-    return GeneratorResponse(text=copy.strip(), hashtags=hashtags[:8], visual_prompt=visual_prompt)
+def stream_media_type(format: str) -> str:
+    fmt = format.lower()
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=422, detail="format must be 'ndjson' or 'sse'")
+    return STREAM_FORMATS[fmt]
+
+
+@router.post("/post/stream")
+def generate_post_stream(payload: GeneratorRequest, format: str = "ndjson") -> StreamingResponse:
+    """Variante en streaming de `/generator/post`.
+
+    Emite `token` con cada fragmento del copy apenas llega, luego un `field` por
+    hashtags y prompt visual (generados en paralelo) y un `done` con la respuesta
+    completa. `format=ndjson` (default) o `format=sse`.
+    """
+    media_type = stream_media_type(format)
+    fmt = format.lower()
+
+    def body() -> Iterator[str]:
+        for kind, record in stream_post(payload):
+            yield frame(fmt, kind, record)
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,45 @@
+"""Versión async del router del generador (`ASYNC_ROUTERS=1`).
+
+Con el backend de plantilla la generación es CPU breve sin I/O; con un LLM
+los tres campos se piden en paralelo con httpx async, sin ocupar hilos del
+threadpool mientras se espera al proveedor.
+"""
+
+from __future__ import annotations
+
+from typing import AsyncIterator
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from ..models.schemas import GeneratorRequest, GeneratorResponse
+from ..services.fastjson import fast_route
+from ..services.generation import agenerate, astream_post
+from .generator import frame, stream_media_type
+
+router = APIRouter(prefix="/generator", tags=["generator"])
+
+
+@fast_route(router.post("/post", response_model=GeneratorResponse))
+async def generate_post_async(payload: GeneratorRequest) -> GeneratorResponse:
+    """Genera copy, hashtags y prompt visual coherentes con la cuenta indicada."""
+    return await agenerate(payload)
+
+
+@router.post("/post/stream")
+async def generate_post_stream_async(
+    payload: GeneratorRequest, format: str = "ndjson"
+) -> StreamingResponse:
+    """Como `/generator/post/stream`, con el stream del proveedor leído en el event loop."""
+    media_type = stream_media_type(format)
+    fmt = format.lower()
+
+    async def body() -> AsyncIterator[str]:
+        async for kind, record in astream_post(payload):
+            yield frame(fmt, kind, record)
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -11,46 +11,33 @@ Notas:
 
 from __future__ import annotations
 
-import os
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 
-try:
-    import numpy as np
-except Exception:  # pragma: no cover - fallback mínimo
-    # Fallback liviano si numpy no está disponible en el entorno del editor
-    import random as _random
-
-    class _RNG:
-        def __init__(self, seed: int):
-            self._r = _random.Random(seed)
-
-        def integers(self, low: int, high: Optional[int] = None) -> int:
-            if high is None:
-                return self._r.randrange(low)
-            return self._r.randrange(low, high)
-
-    class _NP:
-        @staticmethod
-        def mean(arr: List[float]) -> float:
-            return float(sum(arr) / len(arr)) if arr else 0.0
-
-        @staticmethod
-        def clip(x: float, a: float, b: float) -> float:
-            return max(a, min(b, x))
-
-        class random:
-            @staticmethod
-            def default_rng(seed: int) -> _RNG:
-                return _RNG(seed)
-
-    np = _NP()
-
-from ..models.schemas import GeneratorRequest, GeneratorResponse
+from ..config import configured_accounts, env_int
+from ..models.schemas import (
+    FeedbackRequest,
+    GeneratorRequest,
+    GeneratorResponse,
+    NextPostResponse,
+)
+from ..services import dedup, scheduler_core, versions
+from ..services.auth import admin_ok
+from ..services.daily_runs import fetch_runs, local_run_date, record_run
+from ..services.embedding_queue import enqueue_item_embedding
+from ..services.engagement_matrix import get_matrix
+from ..services.fastjson import fast_route, json_response
+from ..services.keyset import KeysetScan
+from ..services.recent_items import get_recent_items, invalidate_recent_items
+from ..services.singleflight import single_flight
 from ..services.supabase_client import get_client
+from ..services.warmup import warmup_step
 from .generator import generate_post
 
 router = APIRouter(prefix="/scheduler", tags=["scheduler"])
@@ -61,22 +48,13 @@ router = APIRouter(prefix="/scheduler", tags=["scheduler"])
 # --------------------------
 
 
-class NextPostResponse(BaseModel):
-    account: str
-    recommended_time: str = Field(description="Hora local en formato HH:MM")
-    content_type: str
-    topic: str
-    priority: float
+class NextPostBatchRequest(BaseModel):
+    accounts: List[str] = Field(min_length=1, max_length=500)
+    refresh: bool = Field(default=False, description="Recalcula el plan del día")
 
 
-class FeedbackRequest(BaseModel):
-    account: str
-    post_id: str
-    likes: int
-    comments: int
-    saves: int
-    reach: int
-    followers: Optional[int] = Field(default=None, description="Followers del momento del post")
+class NextPostBatchResponse(BaseModel):
+    results: Dict[str, NextPostResponse]
 
 
 class FeedbackResponse(BaseModel):
@@ -85,6 +63,22 @@ class FeedbackResponse(BaseModel):
     engagement_score: float
 
 
+class HeatmapCell(BaseModel):
+    values: List[List[float]] = Field(description="7×24 engagement contraído (lun..dom × 0..23)")
+    counts: List[List[int]]
+
+
+class HeatmapResponse(BaseModel):
+    account: str
+    days: List[str]
+    hours: List[int]
+    account_mean: float
+    shrinkage_k: float
+    observations: int
+    built_at: Optional[str] = None
+    content_types: Dict[str, HeatmapCell]
+
+
 class TrendItem(BaseModel):
     topic: str
     momentum: float
@@ -103,6 +97,14 @@ class AutoGenerateResponse(BaseModel):
     # Nota: En algunas instalaciones la tabla `items` usa BIGSERIAL (int)
     # y en otras UUID. Para compatibilidad amplia, exponemos item_id como str.
     item_id: Optional[str] = None
+    duplicate_of: Optional[str] = Field(
+        default=None,
+        description="Id del item canónico si el contenido es un casi duplicado (DEDUP_POLICY)",
+    )
+    replayed: bool = Field(
+        default=False,
+        description="True si se devolvió el resultado ya registrado hoy (rerun idempotente)",
+    )
 
 
 class WeightsResponse(BaseModel):
@@ -147,12 +149,17 @@ class WeightsUpdateResponse(BaseModel):
 
 
 class RunDailyRequest(BaseModel):
-    """Payload para ejecutar generación diaria por múltiples cuentas."""
+    """Payload para ejecutar generación diaria por múltiples cuentas.
+
+    Las ejecuciones son idempotentes por (cuenta, fecha local): un rerun del
+    mismo día devuelve el resultado registrado. `force=True` regenera.
+    """
 
     accounts: List[str] = ["vibecodinglatam"]
     brand_voice: Optional[str] = None
     keywords: Optional[List[str]] = None
     length: Optional[int] = 120
+    force: bool = False
 
 
 class RunDailyResponse(BaseModel):
@@ -160,159 +167,31 @@ class RunDailyResponse(BaseModel):
 
 
 # --------------------------
-# Utilidades internas
+# Warm-up
 # --------------------------
 
 
-def _stable_choice(options: List[str], seed: int) -> str:
-    rng = np.random.default_rng(seed)
-    idx = int(rng.integers(0, len(options)))
-    return options[idx]
-
-
-def _stable_time(seed: int) -> str:
-    """Devuelve una hora HH:MM estable para el día, basada en seed."""
-    rng = np.random.default_rng(seed)
-    hour = int(rng.integers(17, 21))  # ventana 17-20 hs
-    minute = int(rng.integers(0, 2)) * 30  # 00 o 30
-    return f"{hour:02d}:{minute:02d}"
-
-
-def _heuristic_next_post(account: str, topic_hint: str | None = None) -> NextPostResponse:
-    now = datetime.now().astimezone()
-    seed = int(now.strftime("%Y%j"))  # año+día_juliano
-    weekday = now.weekday()
-
-    # Formatos candidatos
-    formats = ["reel", "carousel", "post", "story"]
-    content_type = _stable_choice(formats, seed + weekday)
-
-    # Horas sugeridas por día (semilla + patrón base)
-    recommended_time = _stable_time(seed + 3 * weekday)
-
-    topic = topic_hint or "Innovación humana y colaboración IA"
-    priority = float(np.clip(0.75 + (weekday * 0.01), 0.75, 0.9))
-
-    return NextPostResponse(
-        account=account,
-        recommended_time=recommended_time,
-        content_type=content_type,
-        topic=topic,
-        priority=round(priority, 2),
-    )
-
-
-def _compute_engagement_score(row: Dict[str, float]) -> float:
-    likes = float(row.get("likes", 0))
-    comments = float(row.get("comments", 0))
-    saves = float(row.get("saves", 0))
-    followers = float(row.get("followers", 0) or 0)
-    if followers <= 0:
-        return 0.0
-    return float((likes + 2 * comments + 0.5 * saves) / followers)
-
-
-def _simple_relevance(text: str, context: str) -> float:
-    """Replica una métrica de relevancia simple estilo /semantic/score."""
-    tset = set(text.lower().split())
-    cset = set(context.lower().split()) if context else set()
-    overlap = len(tset & cset)
-    return float(min(1.0, (overlap / (len(tset) + 1e-6)) * 2))
-
-
-def _topical_relevance(supabase: Any, topic: str) -> float:
-    """Calcula relevancia temática respecto a items recientes.
-
-    Hoy usa un proxy de solapamiento de tokens contra títulos/resúmenes
-    de items recientes. En el futuro, puede sustituirse por embeddings
-    y similitudes promedio.
-    """
-    try:
-        if not supabase:
-            return 0.5
-        # Últimos 20 items
-        recent = (
-            supabase.table("items")
-            .select("title,summary")
-            .order("created_at", desc=True)
-            .limit(20)
-            .execute()
-        )
-        ctx_list = []
-        for r in recent.data or []:
-            title = (r.get("title") or "").strip()
-            summary = (r.get("summary") or "").strip()
-            if title:
-                ctx_list.append(title)
-            if summary:
-                ctx_list.append(summary)
-        context = " \n ".join(ctx_list)
-        if not context:
-            return 0.5
-        return _simple_relevance(topic, context)
-    except Exception:
-        return 0.5
-
+@warmup_step("model_params")
+def _prime_model_params(supabase: Any) -> int:
+    """Precarga en cache los pesos de las cuentas configuradas (una sola consulta)."""
+    if not supabase:
+        raise RuntimeError("Supabase no disponible")
+    return len(scheduler_core.load_model_params(supabase, configured_accounts()))
 
-def _get_model_params(supabase: Any, account: str) -> tuple[float, float, float]:
-    """Obtiene (w_engagement, w_relevance, learning_rate) para una cuenta.
 
-    Si no existe registro, intenta crearlo con defaults (0.6, 0.4, 0.05).
-    Ante cualquier error, devuelve los defaults.
-    """
-    DEFAULTS = (0.6, 0.4, 0.05)
-    try:
-        if not supabase:
-            return DEFAULTS
-        res = (
-            supabase.table("scheduler_model_params")
-            .select("w_engagement,w_relevance,learning_rate")
-            .eq("account", account)
-            .limit(1)
-            .execute()
-        )
-        row = (res.data or [None])[0]
-        if not row:
-            try:
-                supabase.table("scheduler_model_params").insert(
-                    {
-                        "account": account,
-                        "w_engagement": 0.6,
-                        "w_relevance": 0.4,
-                        "learning_rate": 0.05,
-                    }
-                ).execute()
-                return DEFAULTS
-            except Exception:
-                return DEFAULTS
-        return (
-            float(row.get("w_engagement", 0.6)),
-            float(row.get("w_relevance", 0.4)),
-            float(row.get("learning_rate", 0.05)),
-        )
-    except Exception:
-        return DEFAULTS
+@warmup_step("recent_items")
+def _prime_recent_items(supabase: Any) -> int:
+    if not supabase:
+        raise RuntimeError("Supabase no disponible")
+    return len(get_recent_items(supabase))
 
 
-def _update_model_params(
-    supabase: Any, account: str, w_e: float, w_r: float, learning_rate: float
-) -> None:
-    """Actualiza pesos del modelo para una cuenta. Falla de forma silenciosa."""
-    try:
-        if not supabase:
-            return
-        supabase.table("scheduler_model_params").upsert(
-            {
-                "account": account,
-                "w_engagement": w_e,
-                "w_relevance": w_r,
-                "learning_rate": learning_rate,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }
-        ).execute()
-    except Exception:
-        # Silencioso: no romper endpoint por fallos de tabla/conexión
-        pass
+@warmup_step("daily_plan")
+def _prime_daily_plan(supabase: Any) -> int:
+    """Construye (o carga) el plan del día de las cuentas configuradas."""
+    if not supabase:
+        raise RuntimeError("Supabase no disponible")
+    return len(scheduler_core.planned(supabase, configured_accounts()))
 
 
 # --------------------------
@@ -320,187 +199,80 @@ def _update_model_params(
 # --------------------------
 
 
-@router.get("/next_post", response_model=NextPostResponse)
-def next_post(account: str = "vibecodinglatam") -> NextPostResponse:
+@fast_route(router.get("/next_post", response_model=NextPostResponse))
+@single_flight("scheduler.next_post", tags=("items", "feedback", "model_params"))
+def next_post(account: str = "vibecodinglatam", refresh: bool = False) -> NextPostResponse:
     """Recomienda cuenta, formato y horario para la próxima publicación.
 
     Combina engagement histórico y relevancia temática:
     priority = 0.6 * engagement_score + 0.4 * topical_relevance
+
+    Se sirve del plan diario materializado; `refresh=true` lo recalcula.
+    `generated_at` indica cuándo se calculó.
     """
     try:
         supabase = get_client()
     except Exception:
         # Sin entorno de Supabase configurado: usar heurística directa
-        return _heuristic_next_post(account)
+        return scheduler_core.heuristic_next_post(account)
+    return scheduler_core.planned(supabase, [account], refresh)[account]
 
-    # 1) Intentar derivar topic más prometedor (título más reciente)
-    topic_hint = None
-    try:
-        items = (
-            supabase.table("items")
-            .select("title")
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if items.data:
-            topic_hint = (items.data[0].get("title") or "").strip() or None
-    except Exception:
-        topic_hint = None
 
-    # 2) Buscar métricas históricas por cuenta para inferir formato y hora
+@fast_route(router.post("/next_post_batch", response_model=NextPostBatchResponse))
+def next_post_batch(payload: NextPostBatchRequest) -> NextPostBatchResponse:
+    """`next_post` para muchas cuentas: una consulta por tabla, resultados por cuenta."""
     try:
-        rows = (
-            supabase.table("posts_feedback")
-            .select("likes,comments,saves,followers,content_type,posted_at")
-            .eq("account", account)
-            .order("posted_at", desc=True)
-            .limit(200)
-            .execute()
-        )
-
-        data = rows.data or []
-        if not data:
-            return _heuristic_next_post(account, topic_hint)
-
-        # Agregación por (content_type, hour)
-        buckets: Dict[tuple, List[float]] = {}
-        hours: Dict[tuple, str] = {}
-        for r in data:
-            score = _compute_engagement_score(r)
-            ctype = (r.get("content_type") or "reel").lower()
-            posted_at = r.get("posted_at")
-            try:
-                # posted_at ISO -> hour local
-                dt = (
-                    datetime.fromisoformat(posted_at.replace("Z", "+00:00"))
-                    if isinstance(posted_at, str)
-                    else datetime.now(timezone.utc)
-                )
-                hour_local = dt.astimezone().strftime("%H:00")
-            except Exception:
-                hour_local = "18:00"
-            key = (ctype, hour_local)
-            buckets.setdefault(key, []).append(score)
-            hours[key] = hour_local
-
-        # Seleccionar bucket top por promedio
-        best_key = None
-        best_value = -1.0
-        for k, scores in buckets.items():
-            avg = float(np.mean(scores)) if scores else 0.0
-            if avg > best_value:
-                best_value = avg
-                best_key = k
-
-        if best_key is None:
-            return _heuristic_next_post(account, topic_hint)
-
-        content_type, recommended_time = best_key
-
-        # 3) Relevancia temática
-        topic = topic_hint or "Innovación humana y colaboración IA"
-        top_rel = _topical_relevance(supabase, topic)
-
-        # 4) Pesos por cuenta (defaults si no existen)
-        w_e, w_r, _lr = _get_model_params(supabase, account)
-        best_value = float(np.clip(best_value, 0.0, 1.0))
-        top_rel = float(np.clip(top_rel, 0.0, 1.0))
-        priority = float(w_e * best_value + w_r * top_rel)
-
-        return NextPostResponse(
-            account=account,
-            recommended_time=recommended_time,
-            content_type=str(content_type),
-            topic=topic,
-            priority=round(priority, 2),
-        )
+        supabase = get_client()
     except Exception:
-        # Cualquier error: fallback estable
-        return _heuristic_next_post(account, topic_hint)
+        supabase = None
+    return NextPostBatchResponse(
+        results=scheduler_core.planned(supabase, payload.accounts, payload.refresh)
+    )
 
 
-@router.post("/feedback", response_model=FeedbackResponse)
+@fast_route(router.post("/feedback", response_model=FeedbackResponse))
 def store_feedback(payload: FeedbackRequest) -> FeedbackResponse:
     """Guarda feedback real del post publicada para mejorar el scheduler."""
+    engagement = scheduler_core.engagement_score(payload.model_dump())
     try:
         supabase = get_client()
     except Exception:
-        engagement = _compute_engagement_score(payload.model_dump())
         return FeedbackResponse(status="error", stored=False, engagement_score=round(engagement, 4))
 
-    engagement = _compute_engagement_score(payload.model_dump())
+    # Si no se pudo guardar, igual se aprende y se reporta stored=False
+    stored_ok = scheduler_core.save_feedback(supabase, payload, engagement)
+    scheduler_core.learn(supabase, payload.account, engagement)
+    return FeedbackResponse(status="ok", stored=stored_ok, engagement_score=round(engagement, 4))
 
-    try:
-        supabase.table("posts_feedback").insert(
-            {
-                "account": payload.account,
-                "post_id": payload.post_id,
-                "likes": payload.likes,
-                "comments": payload.comments,
-                "saves": payload.saves,
-                "reach": payload.reach,
-                "followers": payload.followers,
-                "engagement_score": engagement,
-                "posted_at": datetime.now(timezone.utc).isoformat(),
-            }
-        ).execute()
-        stored_ok = True
-    except Exception:
-        # Si no se pudo guardar, seguir con aprendizaje y reportar stored=False
-        stored_ok = False
 
-    # Mini gradient descent learning
+@fast_route(router.get("/heatmap", response_model=HeatmapResponse))
+def heatmap(
+    account: str = "vibecodinglatam", content_type: Optional[str] = None
+) -> HeatmapResponse:
+    """Matriz 7×24 de engagement por formato para planificación (valores contraídos)."""
     try:
-        # 1) Pesos actuales
-        w_e, w_r, lr = _get_model_params(supabase, payload.account)
-
-        # 2) Señales
-        #    Para topical_relevance usamos topic más reciente como proxy
-        topic_hint = None
-        try:
-            items = (
-                supabase.table("items")
-                .select("title")
-                .order("created_at", desc=True)
-                .limit(1)
-                .execute()
-            )
-            if items.data:
-                topic_hint = (items.data[0].get("title") or "").strip() or None
-        except Exception:
-            topic_hint = None
-        topic = topic_hint or "Innovación humana y colaboración IA"
-        top_rel = float(np.clip(_topical_relevance(supabase, topic), 0.0, 1.0))
-
-        # 3) Predicción y error
-        if hasattr(np, "array"):
-            weights = np.array([w_e, w_r], dtype=float)
-            feats = np.array([engagement, top_rel], dtype=float)
-            pred = float(weights.dot(feats))
-            err = float(engagement - pred)
-            weights = weights + lr * err * feats
-            s = float(weights.sum()) or 1.0
-            weights = np.clip(weights / s, 0.0, 1.0)
-            w_e, w_r = float(weights[0]), float(weights[1])
-        else:
-            pred = w_e * engagement + w_r * top_rel
-            err = engagement - pred
-            w_e = w_e + lr * err * engagement
-            w_r = w_r + lr * err * top_rel
-            s = (w_e + w_r) or 1.0
-            w_e, w_r = max(0.0, w_e / s), max(0.0, w_r / s)
-
-        # 4) Persistir
-        _update_model_params(supabase, payload.account, w_e, w_r, lr)
+        matrix = get_matrix(get_client(), account, scheduler_core.engagement_score)
     except Exception as e:
-        print("[scheduler.learning] warning:", e)
-
-    return FeedbackResponse(status="ok", stored=bool(stored_ok), engagement_score=round(engagement, 4))
+        raise HTTPException(status_code=503, detail=f"posts_feedback no disponible: {e}")
+    return HeatmapResponse.model_validate(matrix.to_dict(content_type))
 
 
 @router.get("/trends", response_model=List[TrendItem])
-def trends(limit: int = 6) -> List[TrendItem]:
+def trends(request: Request, limit: int = 6) -> Response:
+    """Momentum semanal por tema, con ETag: un `If-None-Match` vigente recibe 304.
+
+    La versión de `items` sube con cada inserción de este proceso; mientras no
+    cambie se responde sin consultar Supabase.
+    """
+    etag = versions.etag_for("items", params=f"limit={limit}")
+    headers = versions.cache_headers(etag)
+    if versions.not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(_trends(limit), headers)
+
+
+@single_flight("scheduler.trends", tags=("items",))
+def _trends(limit: int = 6) -> List[TrendItem]:
     """Calcula momentum semanal por tema simple derivado de títulos.
 
     momentum = current_week_count / max(1, previous_week_count)
@@ -510,19 +282,18 @@ def trends(limit: int = 6) -> List[TrendItem]:
     except Exception:
         supabase = None
 
-    # Ventana: últimos 14 días
+    # Ventana: últimos 14 días, en streaming por keyset (acotado por TRENDS_MAX_ROWS)
     now = datetime.now(timezone.utc)
-    try:
-        rows = (
-            supabase.table("items")
-            .select("title, created_at")
-            .order("created_at", desc=True)
-            .limit(500)
-            .execute()
-        )
-        data = rows.data or []
-    except Exception:
-        data = []
+    since = (now - timedelta(days=14)).isoformat()
+    scan = KeysetScan(
+        supabase,
+        "items",
+        columns="title,created_at",
+        key=("created_at", "id"),
+        desc=True,
+        where=lambda q: q.gte("created_at", since),
+        max_rows=env_int("TRENDS_MAX_ROWS", 5000),
+    )
 
     def topic_of(title: str) -> str:
         parts = [p for p in title.strip().split() if p]
@@ -531,23 +302,27 @@ def trends(limit: int = 6) -> List[TrendItem]:
     buckets_cur: Dict[str, int] = {}
     buckets_prev: Dict[str, int] = {}
 
-    for r in data:
-        title = (r.get("title") or "").strip()
-        created_at = r.get("created_at")
-        try:
-            dt = (
-                datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                if isinstance(created_at, str)
-                else now
-            )
-        except Exception:
-            dt = now
-        topic = topic_of(title)
-        days_diff = (now - dt).days
-        if days_diff <= 7:
-            buckets_cur[topic] = buckets_cur.get(topic, 0) + 1
-        elif days_diff <= 14:
-            buckets_prev[topic] = buckets_prev.get(topic, 0) + 1
+    try:
+        for r in scan.rows():
+            title = (r.get("title") or "").strip()
+            created_at = r.get("created_at")
+            try:
+                dt = (
+                    datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+                    if isinstance(created_at, str)
+                    else now
+                )
+            except Exception:
+                dt = now
+            topic = topic_of(title)
+            days_diff = (now - dt).days
+            if days_diff <= 7:
+                buckets_cur[topic] = buckets_cur.get(topic, 0) + 1
+            elif days_diff <= 14:
+                buckets_prev[topic] = buckets_prev.get(topic, 0) + 1
+    except Exception:
+        # Sin Supabase o scan cortado: sin tendencias (no parciales)
+        buckets_cur, buckets_prev = {}, {}
 
     items: List[TrendItem] = []
     all_topics = set(buckets_cur) | set(buckets_prev)
@@ -562,7 +337,7 @@ def trends(limit: int = 6) -> List[TrendItem]:
     return items[: max(1, limit)]
 
 
-@router.post("/auto_generate", response_model=AutoGenerateResponse)
+@fast_route(router.post("/auto_generate", response_model=AutoGenerateResponse))
 def auto_generate(payload: AutoGenerateRequest) -> AutoGenerateResponse:
     """Orquesta recomendación + generación y persiste el item en `items`.
 
@@ -571,66 +346,202 @@ def auto_generate(payload: AutoGenerateRequest) -> AutoGenerateResponse:
     - Inserta un item en Supabase con source="scheduler".
     """
     # 1) Recomendación
-    scheduled = next_post(account=payload.account)
+    return _auto_generate(payload, next_post(account=payload.account))
+
 
+def _auto_generate(
+    payload: AutoGenerateRequest, scheduled: NextPostResponse
+) -> AutoGenerateResponse:
     # 2) Generación
     gen_req = GeneratorRequest(
         topic=scheduled.topic,
+        account=payload.account,
         brand_voice=payload.brand_voice,
         keywords=payload.keywords,
         length=payload.length,
     )
     content = generate_post(gen_req)
 
-    # 3) Persistencia (best-effort)
+    # 3) Casi duplicado de un item existente (DEDUP_POLICY)
+    dup = dedup.find_duplicate(scheduled.topic, content.text)
+    if dup is not None and dup.action == "reject":
+        return AutoGenerateResponse(
+            scheduled=scheduled, content=content, duplicate_of=str(dup.item_id)
+        )
+
+    # 4) Persistencia (best-effort)
     item_id: Optional[str] = None
     try:
         supabase = get_client()
-        resp = (
-            supabase.table("items")
-            .insert(
-                {
-                    "source": "scheduler",
-                    "title": scheduled.topic,
-                    "url": None,
-                    "summary": content.text,
-                }
-            )
-            .execute()
-        )
-        if resp.data:
-            _id = resp.data[0].get("id")
-            # Coerce a string para soportar BIGINT o UUID sin validar tipo
-            if _id is not None:
-                item_id = str(_id)
+        row = {
+            "source": "scheduler",
+            "title": scheduled.topic,
+            "url": None,
+            "summary": content.text,
+        }
+        if dup is not None:
+            row["canonical_item_id"] = dup.item_id
+        resp = dedup.insert_row(supabase, row)
+        _id = resp.data[0].get("id") if resp.data else None
+        # Coerce a string para soportar BIGINT o UUID sin validar tipo
+        if _id is not None:
+            item_id = str(_id)
+        invalidate_recent_items()
+        if dup is None:
+            dedup.register(_id, scheduled.topic, content.text)
+        enqueue_item_embedding(_id, scheduled.topic, content.text)
     except Exception:
         item_id = None
 
-    return AutoGenerateResponse(scheduled=scheduled, content=content, item_id=item_id)
+    return AutoGenerateResponse(
+        scheduled=scheduled,
+        content=content,
+        item_id=item_id,
+        duplicate_of=str(dup.item_id) if dup is not None else None,
+    )
 
 
-@router.post("/run_daily", response_model=RunDailyResponse)
+@fast_route(router.post("/run_daily", response_model=RunDailyResponse))
 def run_daily(payload: RunDailyRequest) -> RunDailyResponse:
     """Ejecuta auto_generate para una lista de cuentas y devuelve resultados.
 
     Persiste cada item (best-effort) mediante el proceso interno de auto_generate.
     """
     results: List[AutoGenerateResponse] = []
-    for acc in payload.accounts:
-        ag = auto_generate(
-            AutoGenerateRequest(
-                account=acc,
-                brand_voice=payload.brand_voice,
-                keywords=payload.keywords,
-                length=payload.length,
-            )
-        )
+    for _acc, ag in _iter_daily(payload):
+        if isinstance(ag, Exception):
+            raise ag
         results.append(ag)
     return RunDailyResponse(results=results)
 
 
+def _iter_daily(
+    payload: RunDailyRequest,
+) -> Iterator[Tuple[str, Union[AutoGenerateResponse, Exception]]]:
+    """Ejecuta auto_generate cuenta por cuenta, cediendo cada resultado al terminar.
+
+    Las cuentas ya ejecutadas hoy se resuelven con una sola lectura de
+    `scheduler_daily_runs` y se devuelven con `replayed=True`.
+    """
+    run_date = local_run_date()
+    try:
+        supabase = get_client()
+    except Exception:
+        supabase = None
+
+    done: Dict[str, Dict[str, Any]] = {}
+    if not payload.force:
+        try:
+            done = fetch_runs(supabase, payload.accounts, run_date)
+        except Exception:
+            done = {}
+
+    # Recomendaciones de las cuentas pendientes en un solo pase (ver next_post_batch)
+    scheduled: Dict[str, NextPostResponse] = {}
+
+    for acc in payload.accounts:
+        if acc in done:
+            try:
+                replay = AutoGenerateResponse.model_validate(done[acc])
+                yield acc, replay.model_copy(update={"replayed": True})
+                continue
+            except Exception:
+                pass  # registro corrupto o de otra versión: regenerar
+        try:
+            if acc not in scheduled:
+                pending = [a for a in payload.accounts if a not in done or a == acc]
+                scheduled.update(scheduler_core.planned(supabase, pending))
+            ag = _auto_generate(
+                AutoGenerateRequest(
+                    account=acc,
+                    brand_voice=payload.brand_voice,
+                    keywords=payload.keywords,
+                    length=payload.length,
+                ),
+                scheduled[acc],
+            )
+        except Exception as e:
+            yield acc, e
+            continue
+        # Sólo se registra si el item quedó persistido (o se rechazó por duplicado):
+        # si no, un rerun debe reintentar
+        if supabase and (ag.item_id is not None or ag.duplicate_of is not None):
+            result = ag.model_dump(mode="json", exclude={"replayed"})
+            if record_run(supabase, acc, run_date, result):
+                done[acc] = result
+        yield acc, ag
+
+
+def _stream_daily(payload: RunDailyRequest, fmt: str) -> Iterator[str]:
+    """Serializa `_iter_daily` como NDJSON o SSE, con un registro resumen al final.
+
+    Sólo se retiene un resultado a la vez: la memoria no crece con el número
+    de cuentas y el cliente ve cada cuenta en cuanto termina.
+    """
+
+    def frame(kind: str, record: Dict[str, Any]) -> str:
+        body = json.dumps({"type": kind, **record}, ensure_ascii=False)
+        if fmt == "sse":
+            return f"event: {kind}\ndata: {body}\n\n"
+        return body + "\n"
+
+    t0 = time.perf_counter()
+    ok = failed = 0
+    for acc, ag in _iter_daily(payload):
+        if isinstance(ag, Exception):
+            failed += 1
+            yield frame("error", {"account": acc, "detail": str(ag)})
+        else:
+            ok += 1
+            yield frame("result", {"account": acc, "data": ag.model_dump(mode="json")})
+    yield frame(
+        "summary",
+        {
+            "accounts": ok + failed,
+            "succeeded": ok,
+            "failed": failed,
+            "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+        },
+    )
+
+
+@router.post("/run_daily/stream")
+def run_daily_stream(payload: RunDailyRequest, format: str = "ndjson") -> StreamingResponse:
+    """Variante en streaming de `run_daily`.
+
+    Emite un registro `result` (o `error`) por cuenta apenas termina y un
+    `summary` final. `format=ndjson` (default) o `format=sse`.
+    """
+    fmt = format.lower()
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(status_code=422, detail="format must be 'ndjson' or 'sse'")
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_daily(payload, fmt),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/weights", response_model=WeightsResponse)
-def get_weights(account: str) -> WeightsResponse:
+def get_weights(account: str, request: Request) -> Response:
+    """Pesos actuales por cuenta, con ETag: un `If-None-Match` vigente recibe 304.
+
+    La versión sube con cada actualización de pesos de la cuenta (feedback o
+    update manual). Las respuestas de error no se marcan como cacheables.
+    """
+    etag = versions.etag_for(f"model_params:{account}", params=account)
+    headers = versions.cache_headers(etag)
+    if versions.not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    result = _weights(account)
+    if result.error:
+        return json_response(result, {"Cache-Control": "no-store"})
+    return json_response(result, headers)
+
+
+@single_flight("scheduler.weights", tags=("model_params",))
+def _weights(account: str) -> WeightsResponse:
     """Devuelve los pesos actuales del modelo por cuenta.
 
     Usa `scheduler_model_params`. Si no existen registros, devuelve defaults
@@ -698,8 +609,7 @@ def update_weights(
     Aplica validaciones estrictas de rangos y normalización tolerada.
     Registra un evento en `scheduler_model_audit` (best-effort).
     """
-    admin_token = os.getenv("ADMIN_TOKEN")
-    if not admin_token or x_admin_token != admin_token:
+    if not admin_ok(x_admin_token):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     w_e = float(payload.w_engagement)
@@ -720,10 +630,10 @@ def update_weights(
         raise HTTPException(status_code=503, detail="Supabase unavailable")
 
     # Pesos previos
-    prev_w_e, prev_w_r, prev_lr = _get_model_params(supabase, payload.account)
+    prev_w_e, prev_w_r, prev_lr = scheduler_core.get_model_params(supabase, payload.account)
 
     # Upsert de nuevos pesos
-    _update_model_params(supabase, payload.account, w_e, w_r, lr)
+    scheduler_core.update_model_params(supabase, payload.account, w_e, w_r, lr)
 
     # Auditoría (best-effort)
     try:
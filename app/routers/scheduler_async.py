@@ -0,0 +1,93 @@
+"""Versión async del router del scheduler (`ASYNC_ROUTERS=1`).
+
+Mismas rutas y respuestas que `scheduler_ai` para el camino caliente
+(`next_post`, `next_post_batch`, `feedback`, `heatmap`), pero el I/O va por
+el cliente async de Supabase: mientras se espera a PostgREST no se ocupa un
+hilo del threadpool (40 por defecto). Las consultas independientes de una
+petición se lanzan juntas con `asyncio.gather`: ventana de items, matrices
+de engagement y pesos al construir el plan; insert del feedback y lecturas
+para el aprendizaje en `feedback`. La lógica está en `services/scheduler_core`
+(adaptadores `a*`), la misma que usa `scheduler_ai`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+from ..models.schemas import FeedbackRequest, NextPostResponse
+from ..services import scheduler_core
+from ..services.engagement_matrix import aget_matrices
+from ..services.fastjson import fast_route
+from ..services.singleflight import single_flight
+from ..services.supabase_client import get_async_client
+from .scheduler_ai import (
+    FeedbackResponse,
+    HeatmapResponse,
+    NextPostBatchRequest,
+    NextPostBatchResponse,
+)
+
+router = APIRouter(prefix="/scheduler", tags=["scheduler"])
+
+
+# --------------------------
+# Endpoints
+# --------------------------
+
+
+@fast_route(router.get("/next_post", response_model=NextPostResponse))
+@single_flight("scheduler.next_post.async", tags=("items", "feedback", "model_params"))
+async def next_post_async(
+    account: str = "vibecodinglatam", refresh: bool = False
+) -> NextPostResponse:
+    """Recomienda formato y horario para la próxima publicación (plan diario)."""
+    try:
+        client = await get_async_client()
+    except Exception:
+        return scheduler_core.heuristic_next_post(account)
+    return (await scheduler_core.aplanned(client, [account], refresh))[account]
+
+
+@fast_route(router.post("/next_post_batch", response_model=NextPostBatchResponse))
+async def next_post_batch_async(payload: NextPostBatchRequest) -> NextPostBatchResponse:
+    """`next_post` para muchas cuentas: una consulta por tabla, resultados por cuenta."""
+    try:
+        client = await get_async_client()
+    except Exception:
+        client = None
+    return NextPostBatchResponse(
+        results=await scheduler_core.aplanned(client, payload.accounts, payload.refresh)
+    )
+
+
+@fast_route(router.post("/feedback", response_model=FeedbackResponse))
+async def store_feedback_async(payload: FeedbackRequest) -> FeedbackResponse:
+    """Guarda feedback real del post y ajusta los pesos de la cuenta."""
+    engagement = scheduler_core.engagement_score(payload.model_dump())
+    try:
+        client = await get_async_client()
+    except Exception:
+        return FeedbackResponse(status="error", stored=False, engagement_score=round(engagement, 4))
+
+    # El insert y el aprendizaje (lecturas + upsert de pesos) no dependen entre sí
+    stored_ok, _ = await asyncio.gather(
+        scheduler_core.asave_feedback(client, payload, engagement),
+        scheduler_core.alearn(client, payload.account, engagement),
+    )
+    return FeedbackResponse(status="ok", stored=stored_ok, engagement_score=round(engagement, 4))
+
+
+@fast_route(router.get("/heatmap", response_model=HeatmapResponse))
+async def heatmap_async(
+    account: str = "vibecodinglatam", content_type: Optional[str] = None
+) -> HeatmapResponse:
+    """Matriz 7×24 de engagement por formato para planificación (valores contraídos)."""
+    try:
+        client = await get_async_client()
+        matrices = await aget_matrices(client, [account], scheduler_core.engagement_score)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"posts_feedback no disponible: {e}")
+    return HeatmapResponse.model_validate(matrices[account].to_dict(content_type))
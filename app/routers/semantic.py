@@ -1,22 +1,48 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query
 
 from ..models.schemas import (
     EmbedItemRequest,
     EmbedItemResponse,
+    EmbedStatusResponse,
     ScoreRequest,
     ScoreResponse,
+    SimilarItem,
+    SimilarResponse,
+)
+from ..services import dedup
+from ..services.embedding_codec import embedding_columns, upsert_embeddings
+from ..services.embedding_queue import enqueue_item_embedding, get_queue
+from ..services.embeddings import (
+    DEFAULT_EMBEDDING_MODEL,
+    embedding_dimensions,
+    embedding_text,
+    get_embedding_array,
 )
-from ..services.embeddings import DEFAULT_DIMENSIONS, DEFAULT_EMBEDDING_MODEL, get_embedding
+from ..services.fastjson import fast_route, supabase_row
+from ..services.recent_items import invalidate_recent_items
+from ..services.shared_index import index as embed_index
+from ..services.singleflight import single_flight
 from ..services.supabase_client import get_client
 
 router = APIRouter(prefix="/semantic", tags=["semantic"])
 
 
-@router.post("/embed_item", response_model=EmbedItemResponse)
-def embed_item(payload: EmbedItemRequest) -> EmbedItemResponse:
+@fast_route(router.post("/embed_item", response_model=EmbedItemResponse))
+def embed_item(
+    payload: EmbedItemRequest,
+    wait: bool = Query(False, description="Embebe en línea en vez de encolar"),
+) -> EmbedItemResponse:
     supabase = get_client()
+    model = payload.model or DEFAULT_EMBEDDING_MODEL
+
+    # 0) Casi duplicado con DEDUP_POLICY=reject → devuelve el canónico sin insertar
+    dup = dedup.find_duplicate(payload.title, payload.summary)
+    if dup is not None and dup.action == "reject":
+        return EmbedItemResponse(status="duplicate", item_id=dup.item_id, embedding_model=model)
 
     # 1) Inserta item base
     data = {
@@ -25,28 +51,88 @@ def embed_item(payload: EmbedItemRequest) -> EmbedItemResponse:
         "url": payload.url,
         "summary": payload.summary,
     }
-    insert = supabase.table("items").insert(data).execute()
+    if dup is not None:
+        data["canonical_item_id"] = dup.item_id
+    insert = dedup.insert_row(supabase, data)
     item_id = insert.data[0]["id"] if insert.data else None
+    invalidate_recent_items()
+    if dup is None:
+        dedup.register(item_id, payload.title, payload.summary)
 
-    # 2) Genera embedding del texto combinado
-    text = f"{payload.title}\n\n{payload.summary or ''}"
-    model = payload.model or DEFAULT_EMBEDDING_MODEL
-    vector = get_embedding(text, model=model)
-
-    # 3) Persiste embedding
-    supabase.table("item_embeddings").insert(
-        {
-            "item_id": item_id,
-            "embedding": vector,
-            "model": model,
-        }
+    # 2a) Con la cola activa, el embedding se hace en segundo plano
+    if not wait and get_queue() is not None:
+        queued = enqueue_item_embedding(item_id, payload.title, payload.summary, model)
+        if queued == "queued":
+            return EmbedItemResponse(
+                status="queued",
+                item_id=item_id,
+                embedding_model=model,
+                embedding_dimensions=embedding_dimensions(model),
+            )
+
+    # 2b) Genera embedding del texto combinado
+    text = embedding_text(payload.title, payload.summary)
+    vector = get_embedding_array(text, model=model)
+
+    # 3) Persiste embedding (float32 / halfvec / int8 según EMBEDDING_STORAGE)
+    upsert_embeddings(
+        supabase,
+        supabase_row(
+            {
+                "item_id": item_id,
+                **embedding_columns(vector),
+                "model": model,
+            }
+        ),
     ).execute()
 
     return EmbedItemResponse(
         status="ok",
         item_id=item_id,
         embedding_model=model,
-        embedding_dimensions=len(vector) if vector else DEFAULT_DIMENSIONS,
+        embedding_dimensions=int(vector.size) if vector.size else embedding_dimensions(model),
+    )
+
+
+@router.get("/embed_status/{item_id}", response_model=EmbedStatusResponse)
+@single_flight("semantic.embed_status", ttl=0)  # sólo coalescing: el estado cambia
+def embed_status(item_id: str) -> EmbedStatusResponse:
+    """Estado del embedding de un item: memoria de la cola y, si no, la tabla."""
+    queue = get_queue()
+    status = queue.status(item_id) if queue is not None else None
+    if status is not None:
+        return EmbedStatusResponse(item_id=item_id, **status)
+    try:
+        res: Any = (
+            get_client()
+            .table("item_embeddings")
+            .select("item_id,model")
+            .eq("item_id", item_id)
+            .limit(1)
+            .execute()
+        )
+        if res.data:
+            return EmbedStatusResponse(
+                item_id=item_id, state="done", model=res.data[0].get("model")
+            )
+    except Exception as e:
+        print("[embed_status] warning:", e)
+    return EmbedStatusResponse(item_id=item_id, state="unknown")
+
+
+@router.get("/similar/{item_id}", response_model=SimilarResponse)
+def similar(item_id: int, k: int = Query(5, ge=1, le=100)) -> SimilarResponse:
+    """Items más parecidos (coseno) según el índice de embeddings en memoria compartida."""
+    view = embed_index.view()
+    if view is None:
+        raise HTTPException(status_code=503, detail="Índice de embeddings no disponible")
+    neighbors = view.neighbors(item_id, k)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail="Item sin embedding en el índice")
+    return SimilarResponse(
+        item_id=item_id,
+        index_epoch=view.epoch,
+        results=[SimilarItem(item_id=i, similarity=s) for i, s in neighbors],
     )
 
 
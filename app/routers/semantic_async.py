@@ -0,0 +1,133 @@
+"""Versión async del router semántico (`ASYNC_ROUTERS=1`).
+
+`embed_item` inserta el item y pide el embedding al mismo tiempo
+(`asyncio.gather`: el texto sólo depende del payload) con los clientes async
+de Supabase y OpenAI. `embed_status` consulta sin ocupar un hilo; `similar`
+y `score` son CPU breve y corren en el event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from fastapi import APIRouter, Query
+
+from ..models.schemas import (
+    EmbedItemRequest,
+    EmbedItemResponse,
+    EmbedStatusResponse,
+    ScoreRequest,
+    ScoreResponse,
+    SimilarResponse,
+)
+from ..services import dedup
+from ..services.embedding_codec import embedding_columns, upsert_embeddings
+from ..services.embedding_queue import enqueue_item_embedding, get_queue
+from ..services.embeddings import (
+    DEFAULT_EMBEDDING_MODEL,
+    aget_embedding_array,
+    embedding_dimensions,
+    embedding_text,
+)
+from ..services.fastjson import fast_route, supabase_row
+from ..services.recent_items import invalidate_recent_items
+from ..services.singleflight import single_flight
+from ..services.supabase_client import get_async_client
+from .semantic import score, similar
+
+router = APIRouter(prefix="/semantic", tags=["semantic"])
+
+
+@fast_route(router.post("/embed_item", response_model=EmbedItemResponse))
+async def embed_item_async(
+    payload: EmbedItemRequest,
+    wait: bool = Query(False, description="Embebe en línea en vez de encolar"),
+) -> EmbedItemResponse:
+    client = await get_async_client()
+    model = payload.model or DEFAULT_EMBEDDING_MODEL
+
+    dup = dedup.find_duplicate(payload.title, payload.summary)
+    if dup is not None and dup.action == "reject":
+        return EmbedItemResponse(status="duplicate", item_id=dup.item_id, embedding_model=model)
+
+    data = {
+        "source": payload.source,
+        "title": payload.title,
+        "url": payload.url,
+        "summary": payload.summary,
+    }
+    if dup is not None:
+        data["canonical_item_id"] = dup.item_id
+    text = embedding_text(payload.title, payload.summary)
+    vector: Any = None
+    if not wait and get_queue() is not None:
+        insert = await dedup.ainsert_row(client, data)
+    else:
+        # Insert y embedding en paralelo: la latencia es la del más lento
+        insert, vector = await asyncio.gather(
+            dedup.ainsert_row(client, data), aget_embedding_array(text, model=model)
+        )
+    item_id = insert.data[0]["id"] if insert.data else None
+    invalidate_recent_items()
+    if dup is None:
+        dedup.register(item_id, payload.title, payload.summary)
+
+    if vector is None:
+        queued = enqueue_item_embedding(item_id, payload.title, payload.summary, model)
+        if queued == "queued":
+            return EmbedItemResponse(
+                status="queued",
+                item_id=item_id,
+                embedding_model=model,
+                embedding_dimensions=embedding_dimensions(model),
+            )
+        vector = await aget_embedding_array(text, model=model)
+
+    await upsert_embeddings(
+        client, supabase_row({"item_id": item_id, **embedding_columns(vector), "model": model})
+    ).execute()
+
+    return EmbedItemResponse(
+        status="ok",
+        item_id=item_id,
+        embedding_model=model,
+        embedding_dimensions=int(vector.size) if vector.size else embedding_dimensions(model),
+    )
+
+
+@router.get("/embed_status/{item_id}", response_model=EmbedStatusResponse)
+@single_flight("semantic.embed_status.async", ttl=0)
+async def embed_status_async(item_id: str) -> EmbedStatusResponse:
+    """Estado del embedding de un item: memoria de la cola y, si no, la tabla."""
+    queue = get_queue()
+    status = queue.status(item_id) if queue is not None else None
+    if status is not None:
+        return EmbedStatusResponse(item_id=item_id, **status)
+    try:
+        client = await get_async_client()
+        res = await (
+            client.table("item_embeddings")
+            .select("item_id,model")
+            .eq("item_id", item_id)
+            .limit(1)
+            .execute()
+        )
+        if res.data:
+            return EmbedStatusResponse(
+                item_id=item_id, state="done", model=res.data[0].get("model")
+            )
+    except Exception as e:
+        print("[embed_status] warning:", e)
+    return EmbedStatusResponse(item_id=item_id, state="unknown")
+
+
+@router.get("/similar/{item_id}", response_model=SimilarResponse)
+async def similar_async(item_id: int, k: int = Query(5, ge=1, le=100)) -> SimilarResponse:
+    """Items más parecidos (coseno) según el índice de embeddings en memoria compartida."""
+    return similar(item_id, k)
+
+
+@router.post("/score", response_model=ScoreResponse)
+async def score_async(payload: ScoreRequest) -> ScoreResponse:
+    return score(payload)
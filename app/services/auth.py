@@ -0,0 +1,19 @@
+"""Token de administración (`X-Admin-Token` contra `ADMIN_TOKEN` del entorno).
+
+Lo comparten `/scheduler/weights/update`, `/export/*`, `/debug/*` y el
+perfilado por request. La comparación es de tiempo constante.
+"""
+
+from __future__ import annotations
+
+import hmac
+import os
+from typing import Optional
+
+
+def admin_ok(token: Optional[str]) -> bool:
+    """True si `ADMIN_TOKEN` está definido y `token` coincide."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), admin_token.encode())
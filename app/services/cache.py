@@ -0,0 +1,68 @@
+"""Cache en memoria con expiración por entrada (thread-safe).
+
+Pensado para datos que cambian lento y se leen en cada request
+(pesos por cuenta, ventana de items recientes). El TTL puede ser un número
+o un callable, para resolverlo desde el entorno en el primer uso.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple, Union
+
+TTL = Union[float, Callable[[], float]]
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Diccionario acotado (LRU) cuyas entradas expiran tras `ttl` segundos."""
+
+    def __init__(self, ttl: TTL, maxsize: int = 1024) -> None:
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> float:
+        return float(self._ttl() if callable(self._ttl) else self._ttl)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Elimina una entrada, o todas si `key` es None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,138 @@
+"""Circuit breaker para dependencias remotas (Supabase).
+
+Estados:
+- `closed`    → las llamadas pasan; se cuentan fallos consecutivos.
+- `open`      → tras `failure_threshold` fallos, las llamadas se rechazan al
+                instante con `CircuitOpenError` durante `recovery_s` segundos.
+- `half_open` → pasado el cool-down se deja pasar hasta `half_open_max`
+                llamadas de prueba: un éxito cierra el circuito, un fallo lo
+                vuelve a abrir.
+
+Los endpoints ya tienen fallbacks ante excepciones; con el circuito abierto
+llegan a ellos en microsegundos en vez de esperar cada timeout de red.
+
+Los umbrales pueden ser números o callables (como el TTL de `TTLCache`), para
+resolverlos desde el entorno en cada uso y no al importar el módulo.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Union
+
+from .metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+Setting = Union[float, Callable[[], float]]
+
+
+def _resolve(value: Setting) -> float:
+    return float(value() if callable(value) else value)
+
+
+class CircuitOpenError(RuntimeError):
+    """La dependencia se considera caída: no se intentó la llamada."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Setting = 5,
+        recovery_s: Setting = 30.0,
+        half_open_max: Setting = 1,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._recovery_s = recovery_s
+        self._half_open_max = half_open_max
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._last_error: Optional[str] = None
+        self._changed_at: Optional[str] = None
+        metrics.gauge_fn(f"{name}.breaker.state", lambda: _STATE_GAUGE[self.state])
+
+    @property
+    def failure_threshold(self) -> int:
+        return max(1, int(_resolve(self._failure_threshold)))
+
+    @property
+    def recovery_s(self) -> float:
+        return _resolve(self._recovery_s)
+
+    @property
+    def half_open_max(self) -> int:
+        return max(1, int(_resolve(self._half_open_max)))
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_s:
+            self._transition(HALF_OPEN)
+            self._trials = 0
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._changed_at = datetime.now(timezone.utc).isoformat()
+        metrics.inc(f"{self.name}.breaker.{state}")
+
+    def before_call(self) -> None:
+        """Lanza `CircuitOpenError` si la llamada no debe intentarse."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._trials < self.half_open_max:
+                self._trials += 1
+                return
+        metrics.inc(f"{self.name}.breaker.rejected")
+        raise CircuitOpenError(f"{self.name} no disponible (circuito abierto)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, error: Any = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    self._transition(OPEN)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trials = 0
+            self._last_error = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = (
+                max(0.0, self.recovery_s - (time.monotonic() - self._opened_at))
+                if state == OPEN
+                else 0.0
+            )
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in_s": round(retry_in, 1),
+                "last_error": self._last_error,
+                "changed_at": self._changed_at,
+            }
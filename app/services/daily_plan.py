@@ -0,0 +1,208 @@
+"""Plan diario materializado de recomendaciones por cuenta.
+
+Para cada cuenta y fecha local se guarda la recomendación de las 24 horas
+del día (la de la hora `h` considera sólo las horas desde `h` en adelante),
+así `next_post` es una búsqueda O(1) por (cuenta, hora) en memoria.
+
+El plan se construye en el warm-up y al primer acceso de cada día para
+todas las cuentas configuradas, se persiste en `scheduler_daily_plan`
+(otros procesos lo leen en vez de recalcularlo) y se invalida por cuenta
+tras cada feedback. Un plan persistido construido antes del último cambio
+local de sus fuentes (`not_before` en `load`) no se adopta: se reconstruye.
+`DAILY_PLAN_MAX_AGE_S` acota cuánto tiempo se sirve una entrada antes de
+recalcularla (items nuevos, cambios de otros procesos).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from ..config import env_float
+
+TABLE = "scheduler_daily_plan"
+
+
+class _Entry:
+    __slots__ = ("hours", "built_at", "built_mono", "stamp")
+
+    def __init__(self, hours: List[Any], built_at: str, built_mono: float, stamp: Hashable) -> None:
+        self.hours = hours
+        self.built_at = built_at
+        self.built_mono = built_mono
+        self.stamp = stamp
+
+
+class DailyPlan:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._date: Optional[str] = None
+        self._entries: Dict[str, _Entry] = {}
+
+    def lookup(
+        self, account: str, plan_date: str, hour: int, stamp: Hashable = None
+    ) -> Optional[Any]:
+        """Recomendación planificada para (cuenta, hora), o None si falta o venció.
+
+        `stamp` son las versiones de las fuentes al consultar: si difieren de
+        las del momento de construcción, la entrada se descarta.
+        """
+        max_age = env_float("DAILY_PLAN_MAX_AGE_S", 3600.0)
+        with self._lock:
+            if self._date != plan_date:
+                return None
+            entry = self._entries.get(account)
+        if entry is None or entry.stamp != stamp:
+            return None
+        if max_age > 0 and time.monotonic() - entry.built_mono > max_age:
+            return None
+        return entry.hours[hour]
+
+    def is_empty(self, plan_date: str) -> bool:
+        with self._lock:
+            return self._date != plan_date or not self._entries
+
+    def put(
+        self,
+        plan_date: str,
+        account: str,
+        hours: List[Any],
+        built_at: str,
+        stamp: Hashable = None,
+        age_s: float = 0.0,
+    ) -> None:
+        if len(hours) != 24:
+            raise ValueError("el plan diario requiere 24 horas")
+        with self._lock:
+            if self._date != plan_date:
+                # Cambio de día: el plan anterior ya no sirve
+                self._date = plan_date
+                self._entries = {}
+            self._entries[account] = _Entry(hours, built_at, time.monotonic() - age_s, stamp)
+
+    def forget(self, account: Optional[str] = None) -> None:
+        with self._lock:
+            if account is None:
+                self._date, self._entries = None, {}
+            else:
+                self._entries.pop(account, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "plan_date": self._date,
+                "accounts": {acc: e.built_at for acc, e in self._entries.items()},
+            }
+
+
+plan = DailyPlan()
+
+
+def _upsert(
+    supabase: Any, plan_date: str, rows: Dict[str, Tuple[List[Dict[str, Any]], str]]
+) -> Any:
+    return supabase.table(TABLE).upsert(
+        [
+            {"account": acc, "plan_date": plan_date, "hours": hours, "built_at": built_at}
+            for acc, (hours, built_at) in rows.items()
+        ],
+        on_conflict="account,plan_date",
+    )
+
+
+def persist(
+    supabase: Any, plan_date: str, rows: Dict[str, Tuple[List[Dict[str, Any]], str]]
+) -> bool:
+    """Upsert de los planes `{cuenta: (horas_json, built_at)}`. Best-effort."""
+    if not supabase or not rows:
+        return False
+    try:
+        _upsert(supabase, plan_date, rows).execute()
+        return True
+    except Exception as e:
+        print("[daily_plan] warning:", e)
+        return False
+
+
+async def apersist(
+    client: Any, plan_date: str, rows: Dict[str, Tuple[List[Dict[str, Any]], str]]
+) -> bool:
+    """`persist` con el cliente async de Supabase."""
+    if not client or not rows:
+        return False
+    try:
+        await _upsert(client, plan_date, rows).execute()
+        return True
+    except Exception as e:
+        print("[daily_plan] warning:", e)
+        return False
+
+
+def _select(supabase: Any, plan_date: str, accounts: List[str]) -> Any:
+    return (
+        supabase.table(TABLE)
+        .select("account,hours,built_at")
+        .eq("plan_date", plan_date)
+        .in_("account", accounts)
+    )
+
+
+def _fresh(
+    data: List[Dict[str, Any]], accounts: List[str], not_before: Dict[str, float]
+) -> Dict[str, Tuple[List[Dict[str, Any]], str, float]]:
+    max_age = env_float("DAILY_PLAN_MAX_AGE_S", 3600.0)
+    out: Dict[str, Tuple[List[Dict[str, Any]], str, float]] = {}
+    for row in data:
+        hours, built_at = row.get("hours"), row.get("built_at")
+        if row.get("account") not in accounts or not isinstance(hours, list) or len(hours) != 24:
+            continue
+        try:
+            built = datetime.fromisoformat(str(built_at)).timestamp()
+        except ValueError:
+            continue
+        if built < not_before.get(row["account"], 0.0):
+            continue  # anterior a un feedback, item o ajuste de pesos
+        age = max(0.0, time.time() - built)
+        if max_age <= 0 or age <= max_age:
+            out[row["account"]] = (hours, str(built_at), age)
+    return out
+
+
+def load(
+    supabase: Any,
+    plan_date: str,
+    accounts: List[str],
+    not_before: Optional[Dict[str, float]] = None,
+) -> Dict[str, Tuple[List[Dict[str, Any]], str, float]]:
+    """Planes persistidos (por otro proceso): `{cuenta: (horas, built_at, edad_s)}`.
+
+    Sólo devuelve los que siguen dentro de `DAILY_PLAN_MAX_AGE_S` y no son
+    anteriores a `not_before[cuenta]` (epoch). Best-effort.
+    """
+    if not supabase or not accounts:
+        return {}
+    try:
+        res = _select(supabase, plan_date, accounts).execute()
+    except Exception as e:
+        print("[daily_plan] warning:", e)
+        return {}
+    return _fresh(res.data or [], accounts, not_before or {})
+
+
+async def aload(
+    client: Any,
+    plan_date: str,
+    accounts: List[str],
+    not_before: Optional[Dict[str, float]] = None,
+) -> Dict[str, Tuple[List[Dict[str, Any]], str, float]]:
+    """`load` con el cliente async de Supabase."""
+    if not client or not accounts:
+        return {}
+    try:
+        res = await _select(client, plan_date, accounts).execute()
+    except Exception as e:
+        print("[daily_plan] warning:", e)
+        return {}
+    return _fresh(res.data or [], accounts, not_before or {})
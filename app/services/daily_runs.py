@@ -0,0 +1,76 @@
+"""Registro idempotente de ejecuciones diarias por (cuenta, fecha local).
+
+`run_daily` consulta en una sola lectura qué cuentas ya se generaron hoy y
+devuelve ese resultado en vez de regenerar contenido e insertar items
+duplicados (reruns del workflow con `workflow_dispatch`). Tabla:
+`scheduler_daily_runs` (ver `src/sql/migrations/0005_scheduler_daily_runs.sql`).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from ..config import env_float
+from .cache import TTLCache
+
+# Espejo en memoria de los registros persistidos: evita la consulta en reruns
+_runs = TTLCache(ttl=lambda: env_float("DAILY_RUNS_TTL_S", 3600.0), maxsize=4096)
+
+
+def local_run_date(now: Optional[datetime] = None) -> str:
+    """Fecha local (ISO) que identifica la ejecución diaria."""
+    return (now or datetime.now().astimezone()).date().isoformat()
+
+
+def fetch_runs(supabase: Any, accounts: Iterable[str], run_date: str) -> Dict[str, Dict[str, Any]]:
+    """Devuelve {account: result} de las cuentas ya ejecutadas en `run_date`.
+
+    Sirve desde memoria lo que puede y consulta el resto con un único `in_`.
+    Propaga errores de consulta; el caller decide el fallback.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for acc in dict.fromkeys(accounts):
+        cached = _runs.get((acc, run_date))
+        if cached is not None:
+            found[acc] = cached
+        else:
+            missing.append(acc)
+    if missing and supabase:
+        res = (
+            supabase.table("scheduler_daily_runs")
+            .select("account,result")
+            .eq("run_date", run_date)
+            .in_("account", missing)
+            .execute()
+        )
+        for row in res.data or []:
+            if isinstance(row.get("result"), dict):
+                found[row["account"]] = row["result"]
+                _runs.set((row["account"], run_date), row["result"])
+    return found
+
+
+def record_run(supabase: Any, account: str, run_date: str, result: Dict[str, Any]) -> bool:
+    """Persiste (upsert) el resultado del día. Best-effort: devuelve False si falla."""
+    try:
+        supabase.table("scheduler_daily_runs").upsert(
+            {
+                "account": account,
+                "run_date": run_date,
+                "item_id": result.get("item_id"),
+                "result": result,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            },
+            on_conflict="account,run_date",
+        ).execute()
+    except Exception:
+        return False
+    _runs.set((account, run_date), result)
+    return True
+
+
+def forget_runs() -> None:
+    """Vacía el espejo en memoria (tests o tras borrar registros a mano)."""
+    _runs.invalidate()
@@ -0,0 +1,242 @@
+"""Detección de items casi duplicados (MinHash + LSH en memoria).
+
+Cada item se resume en una firma MinHash de `NUM_PERM` enteros sobre los
+shingles de 5 caracteres de título + resumen normalizados. Las firmas se
+agrupan por bandas (LSH): dos textos con Jaccard alto comparten al menos
+una banda con alta probabilidad, así que una consulta sólo compara contra
+los pocos candidatos de sus buckets (sub-milisegundo con miles de items).
+
+Las firmas viven en una matriz `uint32` preasignada de `DEDUP_INDEX_SIZE`
+filas que funciona como ring buffer (~256 B por item). Al arrancar se
+reconstruye con los últimos `DEDUP_REBUILD_ROWS` items (paso de warm-up).
+
+`DEDUP_POLICY` decide qué hacer con un duplicado:
+- `link`   → se inserta igual, con `canonical_item_id` apuntando al original (default)
+- `reject` → no se inserta; se devuelve el id canónico
+- `off`    → sin detección
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from ..config import env_float, env_int, env_str
+from .keyset import KeysetScan
+from .lazy import LazyModule
+from .metrics import metrics
+from .warmup import warmup_step
+
+np: Any = LazyModule("numpy")
+
+POLICIES = ("link", "reject", "off")
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 5
+_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+class Match(NamedTuple):
+    item_id: Any
+    similarity: float
+    action: str  # link | reject
+
+
+def policy() -> str:
+    value = (env_str("DEDUP_POLICY", "link") or "link").lower()
+    return value if value in POLICIES else "link"
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni puntuación, espacios colapsados."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def dedup_text(title: str, summary: Optional[str]) -> str:
+    return normalize(f"{title} {summary or ''}")
+
+
+class MinHashIndex:
+    def __init__(
+        self,
+        capacity: int = 5000,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        shingle: int = SHINGLE,
+        seed: int = 7,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser múltiplo de bands")
+        rng = np.random.default_rng(seed)
+        self.capacity = max(1, capacity)
+        self.bands = bands
+        self.shingle = shingle
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        # Hash polinomial de cada ventana de bytes (módulo 2**64, luego 32 bits)
+        self._weights = np.power(np.uint64(131), np.arange(shingle, dtype=np.uint64))
+        self._sigs = np.zeros((self.capacity, num_perm), dtype=np.uint32)
+        self._ids: List[Any] = [None] * self.capacity
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(1 for i in self._ids if i is not None)
+
+    def signature(self, text: str) -> Optional[Any]:
+        """Firma MinHash de un texto ya normalizado; None si está vacío."""
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        if data.size == 0:
+            return None
+        if data.size < self.shingle:
+            data = np.pad(data, (0, self.shingle - data.size))
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle)
+        shingles = np.unique((windows.astype(np.uint64) @ self._weights) & np.uint64(0xFFFFFFFF))
+        hashed = (self._a * shingles[None, :] + self._b) % np.uint64(_PRIME)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: Any) -> List[int]:
+        return [hash(band.tobytes()) for band in sig.reshape(self.bands, -1)]
+
+    def query(self, sig: Any, threshold: float) -> Optional[Match]:
+        """Item indexado más parecido con similitud estimada >= `threshold`."""
+        with self._lock:
+            slots: Set[int] = set()
+            for buckets, key in zip(self._buckets, self._band_keys(sig)):
+                slots.update(buckets.get(key, ()))
+            if not slots:
+                return None
+            cand = np.fromiter(slots, dtype=np.int64, count=len(slots))
+            sims = (self._sigs[cand] == sig).mean(axis=1)
+            best = int(sims.argmax())
+            if sims[best] < threshold:
+                return None
+            return Match(self._ids[cand[best]], round(float(sims[best]), 4), "link")
+
+    def add(self, item_id: Any, sig: Any) -> None:
+        with self._lock:
+            slot = self._next
+            self._next = (slot + 1) % self.capacity
+            if self._ids[slot] is not None:
+                self._evict(slot)
+            self._sigs[slot] = sig
+            self._ids[slot] = item_id
+            for buckets, key in zip(self._buckets, self._band_keys(sig)):
+                buckets.setdefault(key, []).append(slot)
+
+    def _evict(self, slot: int) -> None:
+        for buckets, key in zip(self._buckets, self._band_keys(self._sigs[slot])):
+            members = buckets.get(key)
+            if members is None:
+                continue
+            members.remove(slot)
+            if not members:
+                del buckets[key]
+        self._ids[slot] = None
+
+
+_index: Optional[MinHashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> MinHashIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MinHashIndex(capacity=env_int("DEDUP_INDEX_SIZE", 5000))
+    return _index
+
+
+def find_duplicate(title: str, summary: Optional[str]) -> Optional[Match]:
+    """Busca un casi duplicado ya indexado. None si no hay o si `DEDUP_POLICY=off`."""
+    action = policy()
+    if action == "off":
+        return None
+    t0 = time.perf_counter()
+    index = get_index()
+    sig = index.signature(dedup_text(title, summary))
+    match = index.query(sig, env_float("DEDUP_THRESHOLD", 0.8)) if sig is not None else None
+    metrics.inc("dedup.checks")
+    metrics.observe("dedup.check_ms", (time.perf_counter() - t0) * 1000)
+    if match is None:
+        return None
+    metrics.inc(f"dedup.{action}")
+    return match._replace(action=action)
+
+
+def register(item_id: Any, title: str, summary: Optional[str]) -> None:
+    """Indexa un item canónico recién insertado (los duplicados no se indexan)."""
+    if item_id is None or policy() == "off":
+        return
+    index = get_index()
+    sig = index.signature(dedup_text(title, summary))
+    if sig is not None:
+        index.add(item_id, sig)
+
+
+def insert_row(supabase: Any, row: Dict[str, Any]) -> Any:
+    """Inserta en `items`; si la columna `canonical_item_id` aún no existe, reintenta sin ella."""
+    try:
+        return supabase.table("items").insert(row).execute()
+    except Exception as e:
+        if "canonical_item_id" not in row or "canonical_item_id" not in str(e):
+            raise
+        print("[dedup] warning: falta items.canonical_item_id (migración 0007_items_dedup.sql)")
+        rest = {k: v for k, v in row.items() if k != "canonical_item_id"}
+        return supabase.table("items").insert(rest).execute()
+
+
+async def ainsert_row(client: Any, row: Dict[str, Any]) -> Any:
+    """`insert_row` con el cliente async de Supabase."""
+    try:
+        return await client.table("items").insert(row).execute()
+    except Exception as e:
+        if "canonical_item_id" not in row or "canonical_item_id" not in str(e):
+            raise
+        print("[dedup] warning: falta items.canonical_item_id (migración 0007_items_dedup.sql)")
+        rest = {k: v for k, v in row.items() if k != "canonical_item_id"}
+        return await client.table("items").insert(rest).execute()
+
+
+@warmup_step("dedup_index")
+def rebuild(supabase: Any, limit: Optional[int] = None) -> int:
+    """Reconstruye el índice con los últimos items (el más antiguo de cada grupo queda canónico)."""
+    global _index
+    if policy() == "off":
+        return 0
+    if not supabase:
+        raise RuntimeError("Supabase no disponible")
+    n = limit if limit is not None else env_int("DEDUP_REBUILD_ROWS", 2000)
+    scan = KeysetScan(
+        supabase,
+        "items",
+        columns="id,title,summary",
+        key=("created_at", "id"),
+        desc=True,
+        max_rows=n,
+    )
+    rows = list(scan.rows())
+    index = MinHashIndex(capacity=env_int("DEDUP_INDEX_SIZE", 5000))
+    threshold = env_float("DEDUP_THRESHOLD", 0.8)
+    for row in reversed(rows):
+        sig = index.signature(dedup_text(row.get("title") or "", row.get("summary")))
+        if sig is not None and index.query(sig, threshold) is None:
+            index.add(row["id"], sig)
+    with _index_lock:
+        _index = index
+    return len(index)
+
+
+def reset() -> None:
+    """Descarta el índice en memoria (tests)."""
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,121 @@
+"""Representaciones compactas de embeddings y su serialización a Supabase.
+
+En memoria los embeddings viven como `numpy.float32` (4 bytes/dim en vez de
+un `float` de Python por dimensión). Al persistir, `EMBEDDING_STORAGE`
+decide la columna de `item_embeddings`:
+
+- `vector`  → `embedding vector(N)` (float32, default histórico)
+- `halfvec` → `embedding_half halfvec(N)` (float16, mitad de espacio, indexable)
+- `int8`    → `embedding_q bytea` + `embedding_scale real` (cuantización
+  simétrica por vector, un cuarto del espacio; no indexable por pgvector)
+
+El esquema está en `src/sql/migrations/0006_schema_embeddings_compact.sql`;
+`(item_id, model)` es único desde `0010_item_embeddings_unique.sql`.
+"""
+
+from __future__ import annotations
+
+import base64
+from typing import Any, Dict, Sequence, Tuple, Union
+
+from ..config import env_str
+from .lazy import LazyModule
+
+np: Any = LazyModule("numpy")
+
+try:  # orjson serializa arrays numpy sin pasar por floats de Python
+    import orjson as _orjson
+except Exception:  # pragma: no cover - dependencia opcional
+    _orjson = None  # type: ignore[assignment]
+
+STORAGE_KINDS = ("vector", "halfvec", "int8")
+
+ArrayLike = Union[Sequence[float], Any]
+
+
+def storage_kind() -> str:
+    kind = (env_str("EMBEDDING_STORAGE", "vector") or "vector").lower()
+    return kind if kind in STORAGE_KINDS else "vector"
+
+
+def to_float32(vec: ArrayLike) -> Any:
+    """Convierte listas/arrays a un `ndarray` float32 contiguo (sin copia si ya lo es)."""
+    return np.ascontiguousarray(vec, dtype=np.float32)
+
+
+def decode_base64_f32(data: str) -> Any:
+    """Decodifica el formato `encoding_format="base64"` de OpenAI (float32 little-endian)."""
+    return np.frombuffer(base64.b64decode(data), dtype="<f4").astype(np.float32, copy=False)
+
+
+def quantize_int8(vec: ArrayLike) -> Tuple[Any, float]:
+    """Cuantización simétrica por vector: `q = round(x / scale)`, `scale = max|x| / 127`."""
+    arr = to_float32(vec)
+    peak = float(np.max(np.abs(arr))) if arr.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    q = np.clip(np.rint(arr / scale), -127, 127).astype(np.int8)
+    return q, scale
+
+
+def dequantize_int8(q: Any, scale: float) -> Any:
+    return q.astype(np.float32) * np.float32(scale)
+
+
+def to_pgvector_literal(vec: ArrayLike) -> str:
+    """Texto `[x1,x2,...]` aceptado por columnas `vector`/`halfvec` vía PostgREST.
+
+    Usa orjson sobre el buffer float32 si está disponible; si no, `repr` de
+    cada float (ambos son round-trip exactos para float32).
+    """
+    arr = to_float32(vec)
+    if _orjson is not None:
+        return str(_orjson.dumps(arr, option=_orjson.OPT_SERIALIZE_NUMPY).decode())
+    return "[" + ",".join(map(repr, arr.tolist())) + "]"
+
+
+def parse_pgvector_literal(text: str) -> Any:
+    """Inverso de `to_pgvector_literal` (PostgREST devuelve vectores como texto)."""
+    body = text.strip().lstrip("[").rstrip("]")
+    if not body:
+        return np.zeros(0, dtype=np.float32)
+    return np.array(body.split(","), dtype=np.float32)
+
+
+def embedding_columns(vec: ArrayLike, storage: str | None = None) -> Dict[str, Any]:
+    """Columnas de `item_embeddings` para el vector según el tipo de almacenamiento."""
+    kind = storage or storage_kind()
+    arr = to_float32(vec)
+    if kind == "halfvec":
+        # Redondeo a float16 aquí para que el payload refleje lo que se guarda
+        return {"embedding_half": to_pgvector_literal(arr.astype(np.float16))}
+    if kind == "int8":
+        q, scale = quantize_int8(arr)
+        return {"embedding_q": "\\x" + q.tobytes().hex(), "embedding_scale": scale}
+    return {"embedding": to_pgvector_literal(arr)}
+
+
+def upsert_embeddings(supabase: Any, rows: Any) -> Any:
+    """Query (sin ejecutar) que guarda filas de `item_embeddings` una vez por `(item_id, model)`.
+
+    Si otro escritor (cola, backfill, `/insert_item`) ya guardó el vector, la
+    fila existente gana: mismo texto y modelo, y `created_at` no se mueve bajo
+    el sync incremental del vector store.
+    """
+    return supabase.table("item_embeddings").upsert(
+        rows, on_conflict="item_id,model", ignore_duplicates=True
+    )
+
+
+def decode_embedding_row(row: Dict[str, Any]) -> Any:
+    """Reconstruye el vector float32 desde una fila de `item_embeddings` en cualquier formato."""
+    for col in ("embedding", "embedding_half"):
+        value = row.get(col)
+        if isinstance(value, str) and value:
+            return parse_pgvector_literal(value)
+        if isinstance(value, list) and value:
+            return to_float32(value)
+    q = row.get("embedding_q")
+    if isinstance(q, str) and q:
+        raw = bytes.fromhex(q[2:] if q.startswith("\\x") else q)
+        return dequantize_int8(np.frombuffer(raw, dtype=np.int8), float(row["embedding_scale"]))
+    raise ValueError("fila sin embedding decodificable")
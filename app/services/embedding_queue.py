@@ -0,0 +1,260 @@
+"""Cola en proceso para embeber items en segundo plano.
+
+Las escrituras de items (`/insert_item`, `/scheduler/auto_generate`,
+`/semantic/embed_item`) encolan un job y responden de inmediato. Un pool de
+workers agrupa los textos encolados en micro-lotes (hasta `batch_size` o
+`batch_wait_ms`), hace una sola llamada multi-input al proveedor por lote y
+escribe los vectores en bulk en `item_embeddings`.
+
+La cola es acotada. Al llenarse aplica `EMBED_QUEUE_POLICY`:
+- `drop_new`    → rechaza el job nuevo (default)
+- `drop_oldest` → descarta el job más antiguo y acepta el nuevo
+- `block`       → espera hasta `EMBED_QUEUE_BLOCK_TIMEOUT_MS` (backpressure)
+  y, si sigue llena, rechaza
+
+El estado por item (queued/processing/done/failed/dropped) vive en memoria
+y se consulta con `/semantic/embed_status/{item_id}`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from ..config import env_bool, env_float, env_int, env_str
+from .embedding_codec import embedding_columns, upsert_embeddings
+from .embeddings import DEFAULT_EMBEDDING_MODEL, embedding_text, get_embeddings_array
+from .metrics import metrics
+from .supabase_client import get_client
+
+POLICIES = ("drop_new", "drop_oldest", "block")
+_STATUS_LIMIT = 10_000
+
+
+class _Job:
+    __slots__ = ("item_id", "text", "model", "enqueued_at")
+
+    def __init__(self, item_id: Any, text: str, model: str) -> None:
+        self.item_id = item_id
+        self.text = text
+        self.model = model
+        self.enqueued_at = time.monotonic()
+
+
+class EmbeddingQueue:
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        workers: int = 2,
+        batch_size: int = 64,
+        batch_wait_s: float = 0.05,
+        policy: str = "drop_new",
+        block_timeout_s: float = 0.1,
+    ) -> None:
+        self.maxsize = max(1, maxsize)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_s = max(0.0, batch_wait_s)
+        self.policy = policy if policy in POLICIES else "drop_new"
+        self.block_timeout_s = block_timeout_s
+        self._jobs: Deque[_Job] = deque()
+        self._cond = threading.Condition()
+        self._status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._busy = 0
+
+    # ---- ciclo de vida ----
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        metrics.gauge_fn("embed_queue.depth", lambda: len(self._jobs))
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"embed-queue-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, drain_timeout_s: float = 5.0) -> None:
+        """Detiene los workers; intenta vaciar la cola hasta `drain_timeout_s`."""
+        deadline = time.monotonic() + drain_timeout_s
+        with self._cond:
+            while (self._jobs or self._busy) and time.monotonic() < deadline:
+                self._cond.wait(timeout=0.05)
+            self._running = False
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=max(0.0, deadline - time.monotonic()) + 0.5)
+        self._threads = []
+
+    # ---- API ----
+
+    def enqueue(self, item_id: Any, text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> bool:
+        """Encola el embedding de `item_id`. Devuelve False si el job fue descartado."""
+        job = _Job(item_id, text, model)
+        with self._cond:
+            if len(self._jobs) >= self.maxsize and self.policy == "block":
+                metrics.inc("embed_queue.blocked")
+                deadline = time.monotonic() + self.block_timeout_s
+                while len(self._jobs) >= self.maxsize and time.monotonic() < deadline:
+                    self._cond.wait(timeout=max(0.0, deadline - time.monotonic()))
+            if len(self._jobs) >= self.maxsize:
+                if self.policy != "drop_oldest":
+                    self._set_status(item_id, "dropped")
+                    metrics.inc("embed_queue.dropped")
+                    return False
+                old = self._jobs.popleft()
+                self._set_status(old.item_id, "dropped")
+                metrics.inc("embed_queue.dropped")
+            self._jobs.append(job)
+            self._set_status(item_id, "queued")
+            metrics.inc("embed_queue.enqueued")
+            self._cond.notify()
+        return True
+
+    def status(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            st = self._status.get(str(item_id))
+            return dict(st) if st else None
+
+    def depth(self) -> int:
+        return len(self._jobs)
+
+    # ---- internos ----
+
+    def _set_status(self, item_id: Any, state: str, error: Optional[str] = None) -> None:
+        key = str(item_id)
+        entry: Dict[str, Any] = {
+            "state": state,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if error:
+            entry["error"] = error
+        self._status[key] = entry
+        self._status.move_to_end(key)
+        while len(self._status) > _STATUS_LIMIT:
+            self._status.popitem(last=False)
+
+    def _take_batch(self) -> List[_Job]:
+        """Bloquea hasta tener trabajo; luego junta hasta `batch_size` en `batch_wait_s`."""
+        with self._cond:
+            while self._running and not self._jobs:
+                self._cond.wait(timeout=0.5)
+            if not self._jobs:
+                return []
+            deadline = time.monotonic() + self.batch_wait_s
+            while len(self._jobs) < self.batch_size and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+            model = self._jobs[0].model
+            batch: List[_Job] = []
+            rest: Deque[_Job] = deque()
+            while self._jobs and len(batch) < self.batch_size:
+                job = self._jobs.popleft()
+                (batch if job.model == model else rest).append(job)
+            self._jobs.extendleft(reversed(rest))
+            for job in batch:
+                self._set_status(job.item_id, "processing")
+            self._busy += 1
+            self._cond.notify_all()  # libera productores en modo `block`
+            return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+            try:
+                self._process(batch)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+                    self._cond.notify_all()
+
+    def _process(self, batch: List[_Job]) -> None:
+        t0 = time.perf_counter()
+        model = batch[0].model
+        try:
+            matrix = get_embeddings_array([j.text for j in batch], model=model, fallback=False)
+            rows = [
+                {"item_id": j.item_id, **embedding_columns(vec), "model": model}
+                for j, vec in zip(batch, matrix)
+            ]
+            # Upsert sobre (item_id, model): si el backfill ya lo guardó, queda su fila
+            upsert_embeddings(get_client(), rows).execute()
+        except Exception as e:
+            with self._cond:
+                for job in batch:
+                    self._set_status(job.item_id, "failed", error=str(e))
+            metrics.inc("embed_queue.failed", len(batch))
+            return
+        now = time.monotonic()
+        with self._cond:
+            for job in batch:
+                self._set_status(job.item_id, "done")
+        metrics.inc("embed_queue.processed", len(batch))
+        metrics.inc("embed_queue.batches")
+        metrics.observe("embed_queue.batch_size", len(batch))
+        metrics.observe("embed_queue.batch_ms", (time.perf_counter() - t0) * 1000)
+        for job in batch:
+            metrics.observe("embed_queue.latency_ms", (now - job.enqueued_at) * 1000)
+
+
+_queue: Optional[EmbeddingQueue] = None
+
+
+def get_queue() -> Optional[EmbeddingQueue]:
+    """Cola activa del proceso, o None si no se inició (tests, jobs CLI)."""
+    return _queue if _queue is not None and _queue.running else None
+
+
+def start_queue() -> Optional[EmbeddingQueue]:
+    """Crea e inicia la cola según el entorno (`EMBED_QUEUE_*`). Idempotente."""
+    global _queue
+    if not env_bool("EMBED_QUEUE_ENABLED", True):
+        return None
+    if _queue is None or not _queue.running:
+        _queue = EmbeddingQueue(
+            maxsize=env_int("EMBED_QUEUE_MAXSIZE", 1000),
+            workers=env_int("EMBED_QUEUE_WORKERS", 2),
+            batch_size=env_int("EMBED_QUEUE_BATCH_SIZE", 64),
+            batch_wait_s=env_float("EMBED_QUEUE_BATCH_WAIT_MS", 50.0) / 1000,
+            policy=env_str("EMBED_QUEUE_POLICY", "drop_new") or "drop_new",
+            block_timeout_s=env_float("EMBED_QUEUE_BLOCK_TIMEOUT_MS", 100.0) / 1000,
+        )
+        _queue.start()
+    return _queue
+
+
+def stop_queue(drain_timeout_s: float = 5.0) -> None:
+    global _queue
+    if _queue is not None:
+        _queue.stop(drain_timeout_s)
+        _queue = None
+
+
+def enqueue_item_embedding(
+    item_id: Any, title: str, summary: Optional[str], model: str = DEFAULT_EMBEDDING_MODEL
+) -> str:
+    """Encola el embedding de un item recién insertado.
+
+    Devuelve el estado resultante: `queued`, `dropped` o `disabled` (sin cola
+    activa; el caller decide si embebe en línea o lo deja al backfill).
+    """
+    queue = get_queue()
+    if queue is None or item_id is None:
+        return "disabled"
+    return "queued" if queue.enqueue(item_id, embedding_text(title, summary), model) else "dropped"
@@ -1,17 +1,59 @@
 from __future__ import annotations
 
-import os
-import math
+import asyncio
 import hashlib
-from typing import List
-
-from dotenv import load_dotenv
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, cast
 
-load_dotenv()
+from ..config import env_float, env_int, env_str
+from .embedding_codec import decode_base64_f32, np, to_float32
+from .microbatch import MicroBatcher
+from .rate_limit import estimate_tokens, openai_limiter
 
 DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
 DEFAULT_DIMENSIONS = 1536
 
+# Dimensión nativa por modelo; sólo text-embedding-3-* acepta `dimensions`
+MODEL_NATIVE_DIMENSIONS: Dict[str, int] = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+MODELS_WITH_DIMENSIONS_PARAM = frozenset({"text-embedding-3-small", "text-embedding-3-large"})
+
+_openai_clients: Dict[Tuple[Any, str], Any] = {}
+
+
+def embedding_text(title: str, summary: Optional[str]) -> str:
+    """Texto que se embebe por item (mismo formato en todos los caminos)."""
+    return f"{title}\n\n{summary or ''}"
+
+
+def _openai_client(api_key: str) -> Any:
+    """Cliente OpenAI reutilizado por API key (evita reconstruir el pool HTTP)."""
+    # Import local para no requerir paquete si no se usa
+    from openai import OpenAI
+
+    key = (OpenAI, api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        client = _openai_clients[key] = OpenAI(api_key=api_key)
+    return client
+
+
+def _async_openai_client(api_key: str) -> Any:
+    """`AsyncOpenAI` reutilizado por (event loop, API key)."""
+    from openai import AsyncOpenAI
+
+    key = (asyncio.get_running_loop(), api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        client = _openai_clients[key] = AsyncOpenAI(api_key=api_key)
+    return client
+
 
 def _pseudo_embedding(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> List[float]:
     """Genera un embedding determinístico pseudoaleatorio cuando no hay proveedor.
@@ -36,27 +78,220 @@ def _pseudo_embedding(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> List[f
             if len(vec) >= dimensions:
                 break
         counter += 1
-    # Normaliza vector a norma 1 para estabilidad
-    s = sum(abs(x) for x in vec) or 1.0
+    # Norma L2 = 1, como los vectores del proveedor y `truncate_embedding`
+    s = math.sqrt(sum(x * x for x in vec)) or 1.0
     return [x / s for x in vec]
 
 
+def embedding_dimensions(model: str = DEFAULT_EMBEDDING_MODEL) -> int:
+    """Dimensión configurada para `model`.
+
+    Prioridad: `EMBEDDING_DIMENSIONS_BY_MODEL` (JSON `{"modelo": 512}`),
+    luego `EMBEDDING_DIMENSIONS`, luego la dimensión nativa del modelo.
+    Nunca supera la nativa; los modelos sin parámetro `dimensions` usan la nativa.
+    """
+    native = MODEL_NATIVE_DIMENSIONS.get(model, DEFAULT_DIMENSIONS)
+    if model not in MODELS_WITH_DIMENSIONS_PARAM:
+        return native
+    dims: Optional[int] = None
+    raw = env_str("EMBEDDING_DIMENSIONS_BY_MODEL")
+    if raw:
+        try:
+            value = json.loads(raw).get(model)
+            dims = int(value) if value else None
+        except (ValueError, TypeError, AttributeError):
+            dims = None
+    if dims is None:
+        dims = env_int("EMBEDDING_DIMENSIONS", native)
+    return max(1, min(native, dims))
+
+
+def truncate_embedding(vec: Any, dimensions: int) -> Any:
+    """Prefijo de `dimensions` componentes renormalizado a norma L2 = 1.
+
+    Válido para modelos entrenados con Matryoshka (text-embedding-3-*), que es
+    lo mismo que hace el proveedor con el parámetro `dimensions`.
+    """
+    arr = to_float32(vec)
+    if arr.size <= dimensions:
+        return arr
+    head = arr[:dimensions]
+    norm = float(np.linalg.norm(head))
+    return head / norm if norm > 0 else head
+
+
+def _pseudo_array(text: str, model: str, dimensions: int) -> Any:
+    native = MODEL_NATIVE_DIMENSIONS.get(model, DEFAULT_DIMENSIONS)
+    full = to_float32(_pseudo_embedding(text, native))
+    return truncate_embedding(full, dimensions) if dimensions < native else full
+
+
 def get_embedding(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> List[float]:
     """Obtiene un embedding con OpenAI si hay API key, o uno pseudo si no.
 
-    Devuelve un vector de tamaño 'DEFAULT_DIMENSIONS' por defecto.
+    Devuelve un vector de tamaño `embedding_dimensions(model)` (por defecto
+    'DEFAULT_DIMENSIONS').
     """
+    dims = embedding_dimensions(model)
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
-        return _pseudo_embedding(text, DEFAULT_DIMENSIONS)
+        native = MODEL_NATIVE_DIMENSIONS.get(model, DEFAULT_DIMENSIONS)
+        if dims >= native:
+            return _pseudo_embedding(text, native)
+        return list(_pseudo_array(text, model, dims).tolist())
+    return list(get_embedding_array(text, model).tolist())
+
+
+def _decode_rows(data: Sequence[Any], dims: int) -> Any:
+    """Matriz float32 `(n, dims)` desde `resp.data` (base64 o floats), en orden de input."""
+    rows = sorted(data, key=lambda d: getattr(d, "index", 0))
+    return np.stack(
+        [
+            truncate_embedding(
+                (
+                    decode_base64_f32(d.embedding)
+                    if isinstance(d.embedding, str)
+                    else to_float32(d.embedding)
+                ),
+                dims,
+            )
+            for d in rows
+        ]
+    )
+
 
+def _provider_array(api_key: str, texts: Sequence[str], model: str, dims: int) -> Any:
+    """Una llamada multi-input al proveedor dentro de `OPENAI_RPM`/`OPENAI_TPM`. Propaga errores."""
+    client = _openai_client(api_key)
+    openai_limiter().acquire(estimate_tokens(texts))
+    resp = client.embeddings.create(
+        model=model,
+        input=list(texts),
+        encoding_format="base64",
+        **_dimensions_kwargs(model, dims),
+    )
+    return _decode_rows(resp.data, dims)
+
+
+def _embed_batch(key: Hashable, texts: List[str]) -> List[Any]:
+    """Función de lote del micro-batcher: una fila por texto, en orden."""
+    api_key, model, dims = cast(Tuple[str, str, int], key)
     try:
-        # Import local para no requerir paquete si no se usa
-        from openai import OpenAI
+        return list(_provider_array(api_key, texts, model, dims))
+    except Exception as e:
+        if len(texts) == 1 or getattr(e, "status_code", None) != 400:
+            raise
+    # Un input inválido (400) no debe arrastrar al resto del lote: reintento uno a uno
+    out: List[Any] = []
+    for text in texts:
+        try:
+            out.append(_provider_array(api_key, [text], model, dims)[0])
+        except Exception as e:
+            out.append(e)
+    return out
+
 
-        client = OpenAI(api_key=api_key)
-        resp = client.embeddings.create(model=model, input=text)
-        return list(resp.data[0].embedding)
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> Optional[MicroBatcher]:
+    """Micro-batcher de embeddings sueltos; None si `EMBED_BATCH_WINDOW_MS` es 0."""
+    global _batcher
+    window_ms = env_float("EMBED_BATCH_WINDOW_MS", 10.0)
+    if window_ms <= 0:
+        return None
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(
+                "embed_batch",
+                _embed_batch,
+                window_s=window_ms / 1000,
+                max_size=env_int("EMBED_BATCH_MAX", 64),
+                concurrency=env_int("EMBED_BATCH_CONCURRENCY", 4),
+            )
+        return _batcher
+
+
+def stop_batcher() -> None:
+    """Despacha los pedidos pendientes y libera los hilos (shutdown, tests)."""
+    global _batcher
+    with _batcher_lock:
+        batcher, _batcher = _batcher, None
+    if batcher is not None:
+        batcher.stop()
+
+
+def get_embedding_array(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> Any:
+    """Como `get_embedding`, pero devuelve un `numpy.ndarray` float32.
+
+    Pide el embedding en formato base64 y lo decodifica directo a float32,
+    sin materializar 1536 floats de Python por el camino. Los pedidos
+    concurrentes viajan juntos en una llamada multi-input (`get_batcher()`).
+    """
+    dims = embedding_dimensions(model)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return _pseudo_array(text, model, dims)
+
+    try:
+        batcher = get_batcher()
+        if batcher is not None:
+            return batcher.submit((api_key, model, dims), text).result()
+        return _provider_array(api_key, [text], model, dims)[0]
     except Exception:
         # Fallback robusto en caso de error de red o modelo
-        return _pseudo_embedding(text, DEFAULT_DIMENSIONS)
+        return _pseudo_array(text, model, dims)
+
+
+async def aget_embedding_array(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> Any:
+    """`get_embedding_array` sin bloquear el event loop (micro-batcher o `AsyncOpenAI`)."""
+    dims = embedding_dimensions(model)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return _pseudo_array(text, model, dims)
+
+    try:
+        batcher = get_batcher()
+        if batcher is not None:
+            return await asyncio.wrap_future(batcher.submit((api_key, model, dims), text))
+        client = _async_openai_client(api_key)
+        await openai_limiter().aacquire(estimate_tokens([text]))
+        resp = await client.embeddings.create(
+            model=model, input=text, encoding_format="base64", **_dimensions_kwargs(model, dims)
+        )
+        return _decode_rows(resp.data, dims)[0]
+    except Exception:
+        return _pseudo_array(text, model, dims)
+
+
+def get_embeddings_array(
+    texts: Sequence[str], model: str = DEFAULT_EMBEDDING_MODEL, fallback: bool = True
+) -> Any:
+    """Embeddings de varios textos en una sola llamada multi-input al proveedor.
+
+    Devuelve una matriz float32 `(len(texts), dims)` en el mismo orden que
+    `texts`. Con `fallback=False` los errores del proveedor se propagan en vez
+    de devolver vectores pseudo (jobs que persisten en lote, p. ej. backfill).
+    """
+    dims = embedding_dimensions(model)
+    if not texts:
+        return np.zeros((0, dims), dtype=np.float32)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return np.stack([_pseudo_array(t, model, dims) for t in texts])
+
+    try:
+        return _provider_array(api_key, texts, model, dims)
+    except Exception:
+        if not fallback:
+            raise
+        return np.stack([_pseudo_array(t, model, dims) for t in texts])
+
+
+def _dimensions_kwargs(model: str, dimensions: int) -> Dict[str, Any]:
+    """Sólo envía `dimensions` si reduce la nativa (y el modelo lo admite)."""
+    native = MODEL_NATIVE_DIMENSIONS.get(model, DEFAULT_DIMENSIONS)
+    if model in MODELS_WITH_DIMENSIONS_PARAM and dimensions < native:
+        return {"dimensions": dimensions}
+    return {}
@@ -0,0 +1,277 @@
+"""Matriz de engagement por hora de la semana (7×24) por cuenta y formato.
+
+Para cada cuenta se mantienen dos arrays `float32` de forma
+`(formatos, 7, 24)`: suma y cantidad de scores de engagement por
+(content_type, día de semana local, hora local). El valor de cada celda se
+contrae hacia la media de la cuenta (shrinkage bayesiano):
+
+    valor = (suma + k · media_cuenta) / (cantidad + k)
+
+así una celda con un solo post excelente no domina a otra con veinte
+posts buenos. La matriz se construye una vez desde `posts_feedback`, se
+cachea en memoria (`ENGAGEMENT_MATRIX_TTL_S`) y el feedback nuevo la
+actualiza en el lugar, sin volver a leer la tabla.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import env_float, env_int
+from .cache import TTLCache
+from .keyset import KeysetScan
+from .lazy import LazyModule
+
+np: Any = LazyModule("numpy")
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DEFAULT_CONTENT_TYPE = "reel"
+
+_matrices = TTLCache(ttl=lambda: env_float("ENGAGEMENT_MATRIX_TTL_S", 3600.0), maxsize=256)
+
+
+def local_slot(posted_at: Any) -> Tuple[int, int]:
+    """(día de semana, hora) locales de un `posted_at` ISO; ahora si no se puede parsear."""
+    try:
+        dt = datetime.fromisoformat(str(posted_at).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        dt = datetime.now(timezone.utc)
+    local = dt.astimezone()
+    return local.weekday(), local.hour
+
+
+class EngagementMatrix:
+    def __init__(self, account: str, shrinkage_k: float = 5.0) -> None:
+        self.account = account
+        self.k = shrinkage_k
+        self.content_types: List[str] = []
+        self.sums = np.zeros((0, 7, 24), dtype=np.float32)
+        self.counts = np.zeros((0, 7, 24), dtype=np.float32)
+        self.built_at = datetime.now(timezone.utc).isoformat()
+        self._lock = threading.Lock()
+
+    @property
+    def observations(self) -> int:
+        return int(self.counts.sum())
+
+    def _index(self, content_type: Optional[str]) -> int:
+        ctype = (content_type or DEFAULT_CONTENT_TYPE).lower()
+        if ctype not in self.content_types:
+            self.content_types.append(ctype)
+            empty = np.zeros((1, 7, 24), dtype=np.float32)
+            self.sums = np.concatenate([self.sums, empty])
+            self.counts = np.concatenate([self.counts, empty])
+        return self.content_types.index(ctype)
+
+    def add(self, content_type: Optional[str], weekday: int, hour: int, score: float) -> None:
+        with self._lock:
+            i = self._index(content_type)
+            self.sums[i, weekday, hour] += score
+            self.counts[i, weekday, hour] += 1
+
+    def mean(self) -> float:
+        total = float(self.counts.sum())
+        return float(self.sums.sum()) / total if total else 0.0
+
+    def shrunk(self) -> Any:
+        """Matriz `(formatos, 7, 24)` con cada celda contraída hacia la media de la cuenta."""
+        with self._lock:
+            return (self.sums + self.k * self.mean()) / (self.counts + self.k)
+
+    def best(self, weekday: int, hour: int) -> Optional[Tuple[str, int, float]]:
+        """Mejor (content_type, hora, valor) con historial, desde `hour` en adelante.
+
+        Busca primero en las horas que quedan de hoy; si no hay historial ahí,
+        en el perfil por hora de toda la semana (resto del día y luego el día
+        completo). None si la cuenta no tiene datos.
+        """
+        with self._lock:
+            mean = self.mean()
+            weekly_sums, weekly_counts = self.sums.sum(axis=1), self.counts.sum(axis=1)
+            candidates = (
+                (self.sums[:, weekday, hour:], self.counts[:, weekday, hour:], hour),
+                (weekly_sums[:, hour:], weekly_counts[:, hour:], hour),
+                (weekly_sums, weekly_counts, 0),
+            )
+            for sums, counts, start in candidates:
+                if not counts.any():
+                    continue
+                values = np.where(counts > 0, (sums + self.k * mean) / (counts + self.k), -np.inf)
+                c, h = np.unravel_index(int(values.argmax()), values.shape)
+                return self.content_types[int(c)], int(h) + start, float(values[c, h])
+        return None
+
+    def to_dict(self, content_type: Optional[str] = None) -> Dict[str, Any]:
+        values = self.shrunk()
+        types = [content_type.lower()] if content_type else list(self.content_types)
+        out: Dict[str, Any] = {}
+        for ctype in types:
+            if ctype not in self.content_types:
+                continue
+            i = self.content_types.index(ctype)
+            out[ctype] = {
+                "values": np.round(values[i], 4).tolist(),
+                "counts": self.counts[i].astype(int).tolist(),
+            }
+        return {
+            "account": self.account,
+            "days": list(DAYS),
+            "hours": list(range(24)),
+            "account_mean": round(self.mean(), 4),
+            "shrinkage_k": self.k,
+            "observations": self.observations,
+            "built_at": self.built_at,
+            "content_types": out,
+        }
+
+
+class _Quota:
+    """Cupo de `ENGAGEMENT_MATRIX_ROWS` filas por cuenta sobre un scan compartido.
+
+    Cada página filtra sólo las cuentas con cupo (`open`, tupla reemplazada
+    de una vez: la lee el hilo de prefetch); las filas que llegan de una
+    cuenta ya llena (página prefetcheada antes de cerrarla) se descartan.
+    """
+
+    def __init__(self, accounts: List[str], limit: int) -> None:
+        self.left = {acc: max(0, limit) for acc in accounts}
+        self.open: Tuple[str, ...] = tuple(acc for acc in accounts if self.left[acc])
+
+    def where(self, q: Any) -> Any:
+        return q.in_("account", list(self.open))
+
+    def take(self, row: Dict[str, Any]) -> bool:
+        acc = row.get("account") or ""
+        left = self.left.get(acc, 0)
+        if left <= 0:
+            return False
+        self.left[acc] = left - 1
+        if left == 1:
+            self.open = tuple(a for a in self.open if a != acc)
+        return True
+
+
+def _scan(supabase: Any, quota: _Quota) -> KeysetScan:
+    return KeysetScan(
+        supabase,
+        "posts_feedback",
+        columns="account,likes,comments,saves,followers,content_type,posted_at",
+        key=("posted_at", "id"),
+        desc=True,
+        where=quota.where,
+    )
+
+
+def _setup(accounts: List[str]) -> Tuple[Dict[str, EngagementMatrix], _Quota]:
+    k = env_float("ENGAGEMENT_SHRINKAGE_K", 5.0)
+    matrices = {acc: EngagementMatrix(acc, k) for acc in accounts}
+    return matrices, _Quota(accounts, env_int("ENGAGEMENT_MATRIX_ROWS", 2000))
+
+
+def _add_page(
+    matrices: Dict[str, EngagementMatrix],
+    quota: _Quota,
+    rows: List[Dict[str, Any]],
+    score_fn: Callable[[Dict[str, Any]], float],
+) -> None:
+    for row in rows:
+        if quota.take(row):
+            weekday, hour = local_slot(row.get("posted_at"))
+            matrices[row["account"]].add(row.get("content_type"), weekday, hour, score_fn(row))
+
+
+def build_matrices(
+    supabase: Any, accounts: List[str], score_fn: Callable[[Dict[str, Any]], float]
+) -> Dict[str, EngagementMatrix]:
+    """Construye las matrices de varias cuentas con un solo scan `in_`.
+
+    Lee los `ENGAGEMENT_MATRIX_ROWS` feedbacks más recientes de cada cuenta
+    (una cuenta muy activa no consume el cupo de las demás), en páginas por
+    keyset: las filas se acumulan en la matriz sin retener la respuesta
+    completa, y el scan termina cuando todas las cuentas llenaron su cupo.
+    """
+    matrices, quota = _setup(accounts)
+    if quota.open:
+        for rows in _scan(supabase, quota).pages():
+            _add_page(matrices, quota, rows, score_fn)
+            if not quota.open:
+                break
+    return matrices
+
+
+async def abuild_matrices(
+    client: Any, accounts: List[str], score_fn: Callable[[Dict[str, Any]], float]
+) -> Dict[str, EngagementMatrix]:
+    """`build_matrices` con el cliente async de Supabase."""
+    matrices, quota = _setup(accounts)
+    if quota.open:
+        async with aclosing(_scan(client, quota).apages()) as pages:
+            async for rows in pages:
+                _add_page(matrices, quota, rows, score_fn)
+                if not quota.open:
+                    break
+    return matrices
+
+
+def _cached(accounts: List[str]) -> Tuple[Dict[str, EngagementMatrix], List[str]]:
+    out: Dict[str, EngagementMatrix] = {}
+    missing: List[str] = []
+    for acc in dict.fromkeys(accounts):
+        matrix: Optional[EngagementMatrix] = _matrices.get(acc)
+        if matrix is None:
+            missing.append(acc)
+        else:
+            out[acc] = matrix
+    return out, missing
+
+
+def _store(out: Dict[str, EngagementMatrix], built: Dict[str, EngagementMatrix]) -> None:
+    for acc, matrix in built.items():
+        _matrices.set(acc, matrix)
+        out[acc] = matrix
+
+
+def get_matrices(
+    supabase: Any, accounts: List[str], score_fn: Callable[[Dict[str, Any]], float]
+) -> Dict[str, EngagementMatrix]:
+    """Matrices cacheadas por cuenta; las faltantes se construyen juntas. Propaga errores."""
+    out, missing = _cached(accounts)
+    if missing:
+        _store(out, build_matrices(supabase, missing, score_fn))
+    return out
+
+
+async def aget_matrices(
+    client: Any, accounts: List[str], score_fn: Callable[[Dict[str, Any]], float]
+) -> Dict[str, EngagementMatrix]:
+    """`get_matrices` con el cliente async (misma cache). Propaga errores."""
+    out, missing = _cached(accounts)
+    if missing:
+        _store(out, await abuild_matrices(client, missing, score_fn))
+    return out
+
+
+def get_matrix(
+    supabase: Any, account: str, score_fn: Callable[[Dict[str, Any]], float]
+) -> EngagementMatrix:
+    """Matriz cacheada de la cuenta; la construye si no está. Propaga errores de consulta."""
+    return get_matrices(supabase, [account], score_fn)[account]
+
+
+def record_feedback(
+    account: str, content_type: Optional[str], posted_at: Any, score: float
+) -> bool:
+    """Suma un feedback a la matriz cacheada (si existe). True si se actualizó."""
+    matrix: Optional[EngagementMatrix] = _matrices.get(account)
+    if matrix is None:
+        return False
+    weekday, hour = local_slot(posted_at)
+    matrix.add(content_type, weekday, hour, score)
+    return True
+
+
+def forget_matrices(account: Optional[str] = None) -> None:
+    _matrices.invalidate(account)
@@ -0,0 +1,140 @@
+"""Serialización JSON rápida (opt-in con `FAST_JSON=1`).
+
+- `FastJSONResponse`: respuesta basada en orjson (numpy incluido).
+- `fast_route`: registra un endpoint cuyo resultado, si ya es el modelo de
+  respuesta construido por la app, se serializa con un `TypeAdapter`
+  precompilado y se devuelve como bytes, sin que FastAPI lo re-valide.
+- `supabase_row`: normaliza payloads de inserción con valores numpy
+  (arrays → literal pgvector, escalares → tipos nativos).
+
+Sin orjson o con `FAST_JSON` apagado todo vuelve al camino estándar.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from ..config import env_bool
+from .embedding_codec import to_pgvector_literal
+
+try:
+    import orjson as _orjson
+except Exception:  # pragma: no cover - dependencia opcional
+    _orjson = None  # type: ignore[assignment]
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_adapters: Dict[type, TypeAdapter[Any]] = {}
+
+
+def fast_json_enabled() -> bool:
+    return _orjson is not None and env_bool("FAST_JSON", False)
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "tolist"):  # numpy arrays y escalares
+        return obj.tolist()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON a bytes; orjson con soporte numpy si está instalado."""
+    if _orjson is not None:
+        return bytes(
+            _orjson.dumps(
+                obj,
+                default=_default,
+                option=_orjson.OPT_SERIALIZE_NUMPY | _orjson.OPT_NON_STR_KEYS,
+            )
+        )
+    return json.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` serializada con orjson (acepta arrays numpy)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def adapter_for(tp: type) -> TypeAdapter[Any]:
+    """`TypeAdapter` construido una vez por tipo de respuesta."""
+    adapter = _adapters.get(tp)
+    if adapter is None:
+        adapter = _adapters[tp] = TypeAdapter(tp)
+    return adapter
+
+
+def model_response(obj: BaseModel, status_code: int = 200) -> Response:
+    """Serializa un modelo ya construido directo a bytes (sin validar de nuevo)."""
+    body = adapter_for(type(obj)).dump_json(obj)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def json_response(obj: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Modelo o lista de modelos → bytes con pydantic-core, con headers propios (ETag...)."""
+    return Response(content=to_json(obj), media_type="application/json", headers=headers)
+
+
+def _maybe_fast(result: Any) -> Any:
+    if isinstance(result, BaseModel) and fast_json_enabled():
+        return model_response(result)
+    return result
+
+
+def fast_route(route_decorator: Callable[[Any], Any]) -> Callable[[F], F]:
+    """Registra el endpoint con el camino rápido y deja la función original intacta.
+
+    Uso: `@fast_route(router.post("/run_daily", response_model=RunDailyResponse))`.
+    Llamadas internas (p. ej. `auto_generate` → `next_post`) siguen recibiendo
+    el modelo; sólo la ruta HTTP devuelve bytes cuando `FAST_JSON` está activo.
+    El `response_model` se mantiene para OpenAPI y para el camino estándar.
+    """
+
+    def decorator(fn: F) -> F:
+        wrapper: Callable[..., Any]
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                return _maybe_fast(await fn(*args, **kwargs))
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                return _maybe_fast(fn(*args, **kwargs))
+
+        # Firma con anotaciones resueltas: FastAPI no depende de los globals del wrapper
+        wrapper.__signature__ = inspect.signature(fn, eval_str=True)  # type: ignore[attr-defined]
+        route_decorator(wrapper)
+        return fn
+
+    return decorator
+
+
+def supabase_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepara un payload de inserción con valores numpy para PostgREST.
+
+    Arrays 1-D float → literal pgvector (serializado con orjson sobre el
+    buffer); otros arrays y escalares numpy → tipos nativos de Python.
+    """
+    out: Dict[str, Any] = {}
+    for key, value in row.items():
+        kind: Optional[str] = getattr(getattr(value, "dtype", None), "kind", None)
+        if kind == "f" and getattr(value, "ndim", 0) == 1:
+            out[key] = to_pgvector_literal(value)
+        elif kind is not None:
+            out[key] = value.tolist()
+        else:
+            out[key] = value
+    return out
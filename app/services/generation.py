@@ -0,0 +1,578 @@
+"""Generación de posts (copy, hashtags, prompt visual) con backend intercambiable.
+
+    resp = generate(GeneratorRequest(topic="IA en marketing", account="vibecodinglatam"))
+    for kind, event in stream_post(payload): ...      # tokens del copy + campos + done
+    resp = await agenerate(payload)                   # routers async
+
+`GENERATION_BACKEND`:
+
+- `template` (default): plantilla determinista por cuenta, sin red.
+- `openai`: cualquier API compatible con `/chat/completions` de OpenAI
+  (`GENERATION_BASE_URL`: OpenAI, vLLM, Ollama...), vía httpx. Los tres
+  campos se piden en paralelo; si uno falla se usa el de la plantilla.
+
+Las respuestas completas (sin fallback) se cachean `GENERATION_CACHE_TTL_S`
+por backend + campos normalizados de la request; pedidos idénticos
+concurrentes comparten una sola generación (single-flight).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from ..config import env_float, env_int, env_str
+from ..models.schemas import GeneratorRequest, GeneratorResponse
+from .cache import TTLCache
+from .metrics import metrics
+from .rate_limit import RateLimiter, estimate_tokens
+from .singleflight import SingleFlight
+
+FIELDS = ("text", "hashtags", "visual_prompt")
+MAX_HASHTAGS = 8
+
+# Estilos base por cuenta
+STYLES = {
+    "wavwearevision": "tono institucional, reflexivo y estratégico",
+    "vibecodinglatam": "tono innovador, optimista y tecnológico",
+    "consdelrosario": "tono empático, emocional y humano",
+    "felguetaedwards": "tono inspirador, introspectivo y honesto",
+}
+ACCOUNT_HASHTAGS = {
+    "vibecodinglatam": ["#IA", "#Innovacion", "#Comunidad"],
+    "wavwearevision": ["#Liderazgo", "#Cultura", "#Proposito"],
+    "consdelrosario": ["#Psicologia", "#Autenticidad", "#Bienestar"],
+    "felguetaedwards": ["#MasculinidadConsciente", "#Reflexion", "#Propósito"],
+}
+_HASHTAG = re.compile(r"#\w+")
+_TOKEN = re.compile(r"\S+\s*")
+
+
+class GenerationSpec(NamedTuple):
+    """Request normalizada: clave de cache y entrada de los backends."""
+
+    topic: str
+    account: str
+    brand_voice: str
+    keywords: Tuple[str, ...]
+    length: int
+
+    @classmethod
+    def from_request(cls, payload: GeneratorRequest) -> "GenerationSpec":
+        return cls(
+            topic=" ".join(payload.topic.split()),
+            account=(payload.account or "").strip().lower(),
+            brand_voice=" ".join((payload.brand_voice or "").split()),
+            keywords=tuple(" ".join(k.split()) for k in payload.keywords or [] if k.strip()),
+            length=max(80, min(400, payload.length or 150)),
+        )
+
+    @property
+    def style(self) -> str:
+        voice = f"tono {self.brand_voice}" if self.brand_voice else "tono neutro y coherente"
+        return STYLES.get(self.account, voice)
+
+
+def parse_hashtags(raw: str) -> List[str]:
+    out: List[str] = []
+    for tag in _HASHTAG.findall(raw):
+        if tag not in out:
+            out.append(tag)
+    return out[:MAX_HASHTAGS]
+
+
+class _Clamp:
+    """Corta el copy en `length` caracteres (con "…"), como la plantilla.
+
+    Un fragmento que llenaría el cupo se retiene hasta saber si es el último.
+    """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.used = 0
+        self.pending: Optional[str] = None
+        self.done = False
+
+    def _cut(self, tok: str) -> str:
+        return tok[: max(0, self.length - 1 - self.used)] + "…"
+
+    def feed(self, tok: str) -> str:
+        if not tok:
+            return ""
+        if self.pending is not None:
+            self.done = True
+            tok, self.pending = self._cut(self.pending), None
+            return tok
+        if self.used + len(tok) >= self.length:
+            self.pending = tok
+            return ""
+        self.used += len(tok)
+        return tok
+
+    def end(self) -> str:
+        tok, self.pending = self.pending, None
+        if tok is None:
+            return ""
+        return tok if self.used + len(tok) <= self.length else self._cut(tok)
+
+
+def _clamp(tokens: Iterable[str], length: int) -> Iterator[str]:
+    clamp = _Clamp(length)
+    for tok in tokens:
+        out = clamp.feed(tok)
+        if out:
+            yield out
+        if clamp.done:
+            return
+    tail = clamp.end()
+    if tail:
+        yield tail
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+class TemplateBackend:
+    """Plantilla determinista por cuenta (el generador original)."""
+
+    key: Hashable = ("template",)
+    parallel = False  # CPU breve: en línea es más rápido que repartir en hilos
+
+    def complete(self, spec: GenerationSpec, field: str) -> Any:
+        if field == "text":
+            base = f"{spec.topic} ({spec.style})."
+            detail = " " + ", ".join(spec.keywords) if spec.keywords else ""
+            copy = (
+                f"{base} {detail}"
+                if len(base) + len(detail) <= spec.length
+                else (base + detail)[: spec.length - 1] + "…"
+            )
+            return copy.strip()
+        if field == "hashtags":
+            tags = [f"#{k.replace(' ', '').capitalize()}" for k in spec.keywords]
+            return (tags + ACCOUNT_HASHTAGS.get(spec.account, []))[:MAX_HASHTAGS]
+        return (
+            f"Arte conceptual del tema '{spec.topic}', estilo coherente con "
+            f"{spec.account or 'la marca'}, {spec.style}, composición limpia, "
+            "color balanceado, formato cuadrado 1:1."
+        )
+
+    def stream(self, spec: GenerationSpec) -> Iterator[str]:
+        yield from _TOKEN.findall(self.complete(spec, "text"))
+
+    async def acomplete(self, spec: GenerationSpec, field: str) -> Any:
+        return self.complete(spec, field)
+
+    async def astream(self, spec: GenerationSpec) -> AsyncIterator[str]:
+        for tok in self.stream(spec):
+            yield tok
+
+
+_SYSTEM = (
+    "Eres el redactor de redes sociales de la marca. Escribes en español, sin "
+    "preámbulos ni comillas: respondes sólo con lo que se pide."
+)
+
+
+class OpenAICompatBackend:
+    """`POST {base_url}/chat/completions`: una llamada por campo, `stream` para el copy."""
+
+    parallel = True
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: Optional[str] = None,
+        timeout_s: float = 30.0,
+        temperature: float = 0.7,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.timeout_s = timeout_s
+        self.temperature = temperature
+        self.key = ("openai", self.base_url, model, temperature)
+        self.limiter = RateLimiter(
+            "generation", rpm=env_int("GENERATION_RPM", 0), tpm=env_int("GENERATION_TPM", 0)
+        )
+        self._client: Any = None
+        self._aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def _http(self) -> Any:
+        import httpx
+
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=self.base_url, headers=self._headers(), timeout=self.timeout_s
+                )
+            return self._client
+
+    def _ahttp(self) -> Any:
+        """`httpx.AsyncClient` por event loop (su pool queda atado al loop)."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._aclients.get(loop)
+        if client is None:
+            client = self._aclients[loop] = httpx.AsyncClient(
+                base_url=self.base_url, headers=self._headers(), timeout=self.timeout_s
+            )
+        return client
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def _body(self, spec: GenerationSpec, field: str, stream: bool = False) -> Dict[str, Any]:
+        context = f"Cuenta: {spec.account or 'la marca'} ({spec.style}). Tema: {spec.topic}."
+        if spec.keywords:
+            context += f" Palabras clave: {', '.join(spec.keywords)}."
+        ask, max_tokens = {
+            "text": (
+                f"Escribe el copy del post, máximo {spec.length} caracteres, sin hashtags.",
+                spec.length // 3 + 32,
+            ),
+            "hashtags": (f"Propón hasta {MAX_HASHTAGS} hashtags separados por espacios.", 64),
+            "visual_prompt": (
+                "Escribe en una frase el prompt para generar la imagen del post, "
+                "formato cuadrado 1:1.",
+                120,
+            ),
+        }[field]
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _SYSTEM},
+                {"role": "user", "content": f"{context}\n{ask}"},
+            ],
+            "temperature": self.temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
+    def _tokens(self, body: Dict[str, Any]) -> int:
+        return estimate_tokens([m["content"] for m in body["messages"]]) + int(body["max_tokens"])
+
+    @staticmethod
+    def _content(data: Dict[str, Any]) -> str:
+        return str(data["choices"][0]["message"]["content"] or "").strip()
+
+    @staticmethod
+    def _delta(line: str) -> Optional[str]:
+        """Línea SSE → texto del chunk (None si no trae contenido)."""
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return None
+        choices = json.loads(data).get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or None
+
+    def _finish(self, spec: GenerationSpec, field: str, raw: str) -> Any:
+        if field == "text":
+            return "".join(_clamp([raw], spec.length))
+        if field == "hashtags":
+            tags = parse_hashtags(raw)
+            if not tags:
+                raise ValueError(f"respuesta sin hashtags: {raw[:80]!r}")
+            return tags
+        return raw
+
+    def complete(self, spec: GenerationSpec, field: str) -> Any:
+        body = self._body(spec, field)
+        self.limiter.acquire(tokens=self._tokens(body))
+        r = self._http().post("/chat/completions", json=body)
+        r.raise_for_status()
+        return self._finish(spec, field, self._content(r.json()))
+
+    def stream(self, spec: GenerationSpec) -> Iterator[str]:
+        body = self._body(spec, "text", stream=True)
+        self.limiter.acquire(tokens=self._tokens(body))
+
+        def deltas() -> Iterator[str]:
+            with self._http().stream("POST", "/chat/completions", json=body) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    delta = self._delta(line)
+                    if delta:
+                        yield delta
+
+        yield from _clamp(deltas(), spec.length)
+
+    async def acomplete(self, spec: GenerationSpec, field: str) -> Any:
+        body = self._body(spec, field)
+        await self.limiter.aacquire(tokens=self._tokens(body))
+        r = await self._ahttp().post("/chat/completions", json=body)
+        r.raise_for_status()
+        return self._finish(spec, field, self._content(r.json()))
+
+    async def astream(self, spec: GenerationSpec) -> AsyncIterator[str]:
+        body = self._body(spec, "text", stream=True)
+        await self.limiter.aacquire(tokens=self._tokens(body))
+        clamp = _Clamp(spec.length)
+        async with self._ahttp().stream("POST", "/chat/completions", json=body) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                out = clamp.feed(self._delta(line) or "")
+                if out:
+                    yield out
+                if clamp.done:
+                    return
+        tail = clamp.end()
+        if tail:
+            yield tail
+
+
+Backend = Union[TemplateBackend, OpenAICompatBackend]
+
+_TEMPLATE = TemplateBackend()
+_backend: Optional[Backend] = None
+_backend_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_backend() -> Backend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if (env_str("GENERATION_BACKEND", "template") or "").lower() == "openai":
+                _backend = OpenAICompatBackend(
+                    base_url=env_str("GENERATION_BASE_URL", "https://api.openai.com/v1") or "",
+                    model=env_str("GENERATION_MODEL", "gpt-4o-mini") or "gpt-4o-mini",
+                    api_key=env_str("GENERATION_API_KEY") or env_str("OPENAI_API_KEY"),
+                    timeout_s=env_float("GENERATION_TIMEOUT_S", 30.0),
+                    temperature=env_float("GENERATION_TEMPERATURE", 0.7),
+                )
+            else:
+                _backend = _TEMPLATE
+        return _backend
+
+
+def reset_backend() -> None:
+    """Relee `GENERATION_*` en la próxima llamada y vacía la cache (tests, cambio de modelo)."""
+    global _backend
+    with _backend_lock:
+        backend, _backend = _backend, None
+    if isinstance(backend, OpenAICompatBackend):
+        backend.close()
+    _CACHE.invalidate()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _backend_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                env_int("GENERATION_CONCURRENCY", 8), thread_name_prefix="generation"
+            )
+        return _pool
+
+
+# ---------------------------------------------------------------------------
+# Generación
+# ---------------------------------------------------------------------------
+
+_CACHE = TTLCache(
+    ttl=lambda: env_float("GENERATION_CACHE_TTL_S", 3600.0),
+    maxsize=env_int("GENERATION_CACHE_SIZE", 512),
+)
+_FLIGHT = SingleFlight("generation", ttl=0)
+
+
+def _fallback(spec: GenerationSpec, field: str, error: Exception) -> Tuple[Any, bool]:
+    metrics.inc("generation.fallback")
+    print(f"[generation] warning: {field} → plantilla:", error)
+    return _TEMPLATE.complete(spec, field), False
+
+
+def _field(backend: Backend, spec: GenerationSpec, field: str) -> Tuple[Any, bool]:
+    """(valor, ok); ok=False si hubo que caer a la plantilla."""
+    t0 = time.perf_counter()
+    try:
+        return backend.complete(spec, field), True
+    except Exception as e:
+        return _fallback(spec, field, e)
+    finally:
+        metrics.observe(f"generation.{field}.latency_ms", (time.perf_counter() - t0) * 1000)
+
+
+async def _afield(backend: Backend, spec: GenerationSpec, field: str) -> Tuple[Any, bool]:
+    t0 = time.perf_counter()
+    try:
+        return await backend.acomplete(spec, field), True
+    except Exception as e:
+        return _fallback(spec, field, e)
+    finally:
+        metrics.observe(f"generation.{field}.latency_ms", (time.perf_counter() - t0) * 1000)
+
+
+def _cached(key: Hashable) -> Optional[GeneratorResponse]:
+    hit: Optional[GeneratorResponse] = _CACHE.get(key)
+    metrics.inc("generation.cache.hits" if hit is not None else "generation.cache.misses")
+    return hit
+
+
+def _done(key: Hashable, results: Dict[str, Tuple[Any, bool]], t0: float) -> GeneratorResponse:
+    resp = GeneratorResponse(**{f: value for f, (value, _) in results.items()})
+    if all(ok for _, ok in results.values()):
+        _CACHE.set(key, resp)
+    metrics.observe("generation.latency_ms", (time.perf_counter() - t0) * 1000)
+    return resp
+
+
+def generate(payload: GeneratorRequest) -> GeneratorResponse:
+    spec = GenerationSpec.from_request(payload)
+    backend = get_backend()
+    key = (backend.key, spec)
+    hit = _cached(key)
+    if hit is not None:
+        return hit
+
+    def run() -> GeneratorResponse:
+        t0 = time.perf_counter()
+        if backend.parallel:
+            futures = {f: _executor().submit(_field, backend, spec, f) for f in FIELDS}
+            return _done(key, {f: fut.result() for f, fut in futures.items()}, t0)
+        return _done(key, {f: _field(backend, spec, f) for f in FIELDS}, t0)
+
+    result: GeneratorResponse = _FLIGHT.do(key, run)
+    return result
+
+
+async def agenerate(payload: GeneratorRequest) -> GeneratorResponse:
+    spec = GenerationSpec.from_request(payload)
+    backend = get_backend()
+    key = (backend.key, spec)
+    hit = _cached(key)
+    if hit is not None:
+        return hit
+
+    async def run() -> GeneratorResponse:
+        t0 = time.perf_counter()
+        values = await asyncio.gather(*(_afield(backend, spec, f) for f in FIELDS))
+        return _done(key, dict(zip(FIELDS, values)), t0)
+
+    result: GeneratorResponse = await _FLIGHT.ado(key, run)
+    return result
+
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+def _replay(resp: GeneratorResponse) -> Iterator[Event]:
+    yield "token", {"delta": resp.text}
+    for f in FIELDS[1:]:
+        yield "field", {"field": f, "value": getattr(resp, f)}
+    yield "done", {"data": resp.model_dump(mode="json"), "cached": True}
+
+
+def stream_post(payload: GeneratorRequest) -> Iterator[Event]:
+    """Eventos `token` (copy a medida que llega), `field` (hashtags, prompt visual) y `done`.
+
+    Hashtags y prompt visual se generan en paralelo mientras se emite el copy.
+    """
+    spec = GenerationSpec.from_request(payload)
+    backend = get_backend()
+    key = (backend.key, spec)
+    hit = _cached(key)
+    if hit is not None:
+        yield from _replay(hit)
+        return
+
+    t0 = time.perf_counter()
+    futures = {
+        f: _executor().submit(_field, backend, spec, f) for f in FIELDS[1:] if backend.parallel
+    }
+    parts: List[str] = []
+    ok = True
+    try:
+        for delta in backend.stream(spec):
+            if not parts:
+                metrics.observe("generation.stream.ttft_ms", (time.perf_counter() - t0) * 1000)
+            parts.append(delta)
+            yield "token", {"delta": delta}
+    except Exception as e:
+        ok = False
+        if not parts:  # nada emitido todavía: se entrega la plantilla
+            text, _ = _fallback(spec, "text", e)
+            parts.append(text)
+            yield "token", {"delta": text}
+        else:
+            print("[generation] warning: stream cortado:", e)
+    results = {"text": ("".join(parts).strip(), ok)}
+    for f in FIELDS[1:]:
+        results[f] = futures[f].result() if f in futures else _field(backend, spec, f)
+        yield "field", {"field": f, "value": results[f][0]}
+    resp = _done(key, results, t0)
+    yield "done", {"data": resp.model_dump(mode="json"), "cached": False}
+
+
+async def astream_post(payload: GeneratorRequest) -> AsyncIterator[Event]:
+    """Como `stream_post`, en el event loop (hashtags y prompt visual como tasks)."""
+    spec = GenerationSpec.from_request(payload)
+    backend = get_backend()
+    key = (backend.key, spec)
+    hit = _cached(key)
+    if hit is not None:
+        for event in _replay(hit):
+            yield event
+        return
+
+    t0 = time.perf_counter()
+    tasks = {f: asyncio.ensure_future(_afield(backend, spec, f)) for f in FIELDS[1:]}
+    try:
+        parts: List[str] = []
+        ok = True
+        try:
+            async for delta in backend.astream(spec):
+                if not parts:
+                    metrics.observe("generation.stream.ttft_ms", (time.perf_counter() - t0) * 1000)
+                parts.append(delta)
+                yield "token", {"delta": delta}
+        except Exception as e:
+            ok = False
+            if not parts:
+                text, _ = _fallback(spec, "text", e)
+                parts.append(text)
+                yield "token", {"delta": text}
+            else:
+                print("[generation] warning: stream cortado:", e)
+        results = {"text": ("".join(parts).strip(), ok)}
+        for f, task in tasks.items():
+            results[f] = await task
+            yield "field", {"field": f, "value": results[f][0]}
+        resp = _done(key, results, t0)
+        yield "done", {"data": resp.model_dump(mode="json"), "cached": False}
+    finally:
+        for task in tasks.values():
+            task.cancel()  # cliente desconectado a mitad del stream
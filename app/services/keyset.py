@@ -0,0 +1,234 @@
+"""Lectura en streaming de tablas de Supabase por keyset (sin OFFSET).
+
+    scan = KeysetScan(supabase, "posts_feedback", columns="account,posted_at",
+                      key=("posted_at", "id"), desc=True,
+                      where=lambda q: q.in_("account", accounts))
+    for row in scan.rows(): ...
+
+Cada página se pide con `key > último` (o `<` en orden descendente); con
+clave compuesta se usa `or=(a.gt.X,and(a.eq.X,b.gt.Y))`, así filas con el
+mismo valor de la primera columna (inserts en bulk) nunca se pierden entre
+páginas. La clave debe ser única (agregar `id` como desempate); la primera
+columna puede tener NULL (orden de Postgres: al final en `asc`, al principio
+en `desc`).
+
+Apenas llega una página se pide la siguiente en un hilo del pool
+(`KEYSET_PREFETCH_THREADS`) mientras el caller procesa la actual: en memoria
+hay a lo sumo dos páginas. `pages()` cede listas de filas, `rows()` filas
+sueltas y `chunks()` bloques columnares `{columna: [valores]}`. `cursor`
+guarda la clave de la última fila cedida (checkpoints).
+
+Con el cliente async (`get_async_client()`) se usan `apages()`/`arows()`:
+la página siguiente es una task del event loop en vez de un hilo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from ..config import env_int
+from .metrics import metrics
+
+Row = Dict[str, Any]
+Where = Callable[[Any], Any]
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, env_int("KEYSET_PREFETCH_THREADS", 4)),
+                thread_name_prefix="keyset",
+            )
+        return _pool
+
+
+def _literal(value: Any) -> str:
+    """Valor para un filtro `or=(...)` de PostgREST (comillas si trae reservados)."""
+    text = str(value)
+    if any(ch in text for ch in ',.:()"\\ '):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+class KeysetScan:
+    def __init__(
+        self,
+        supabase: Any,
+        table: str,
+        columns: Union[str, Sequence[str]] = "*",
+        key: Union[str, Sequence[str]] = "id",
+        desc: bool = False,
+        page_size: Optional[int] = None,
+        where: Optional[Where] = None,
+        after: Optional[Sequence[Any]] = None,
+        max_rows: Optional[int] = None,
+        prefetch: bool = True,
+    ) -> None:
+        self.supabase = supabase
+        self.table = table
+        self.key: Tuple[str, ...] = (key,) if isinstance(key, str) else tuple(key)
+        if not self.key or len(self.key) > 2:
+            raise ValueError("la clave keyset admite una o dos columnas")
+        cols = columns if isinstance(columns, str) else ",".join(columns)
+        if cols.strip() != "*":
+            present = {c.strip() for c in cols.split(",")}
+            cols = ",".join([cols, *[k for k in self.key if k not in present]])
+        self.columns = cols
+        self.desc = desc
+        self.page_size = max(1, page_size or env_int("KEYSET_PAGE_SIZE", 1000))
+        self.where = where
+        self.cursor: Optional[Tuple[Any, ...]] = tuple(after) if after is not None else None
+        self.max_rows = max_rows
+        self.prefetch = prefetch
+
+    def _build(self, after: Optional[Tuple[Any, ...]], limit: int) -> Any:
+        q = self.supabase.table(self.table).select(self.columns)
+        if self.where is not None:
+            q = self.where(q)
+        if after is not None:
+            op = "lt" if self.desc else "gt"
+            if len(self.key) == 1:
+                q = getattr(q, op)(self.key[0], after[0])
+            else:
+                q = q.or_(self._after(op, *after))
+        for col in self.key:
+            q = q.order(col, desc=self.desc)
+        return q.limit(limit)
+
+    def _after(self, op: str, va: Any, vb: Any) -> str:
+        """Filtro `or=(...)` de las filas posteriores a `(va, vb)` con clave compuesta.
+
+        Sigue el orden por defecto de Postgres: NULL al final en ascendente y al
+        principio en descendente. Tras un cursor NULL siguen los NULL con `b`
+        posterior (y en descendente todas las filas con valor); tras un valor,
+        en ascendente quedan además los NULL. `b` (el desempate) nunca es NULL.
+        """
+        a, b = self.key
+        tie = f"{b}.{op}.{_literal(vb)}"
+        if va is None:
+            nulls = f"and({a}.is.null,{tie})"
+            return f"{a}.not.is.null,{nulls}" if self.desc else nulls
+        expr = f"{a}.{op}.{_literal(va)},and({a}.eq.{_literal(va)},{tie})"
+        return expr if self.desc else f"{expr},{a}.is.null"
+
+    def _query(self, after: Optional[Tuple[Any, ...]], limit: int) -> List[Row]:
+        rows: List[Row] = self._build(after, limit).execute().data or []
+        metrics.inc(f"keyset.{self.table}.pages")
+        return rows
+
+    async def _aquery(self, after: Optional[Tuple[Any, ...]], limit: int) -> List[Row]:
+        rows: List[Row] = (await self._build(after, limit).execute()).data or []
+        metrics.inc(f"keyset.{self.table}.pages")
+        return rows
+
+    def _limit(self, remaining: Optional[int]) -> int:
+        return self.page_size if remaining is None else min(self.page_size, remaining)
+
+    def pages(self) -> Iterator[List[Row]]:
+        remaining = self.max_rows
+        after = self.cursor
+        pending: Optional[Future] = None
+
+        def fetch(after: Optional[Tuple[Any, ...]], limit: int) -> List[Row]:
+            return self._query(after, limit)
+
+        def submit(after: Optional[Tuple[Any, ...]]) -> Optional[Future]:
+            limit = self._limit(remaining)
+            if limit <= 0:
+                return None
+            if self.prefetch:
+                return _executor().submit(fetch, after, limit)
+            done: Future = Future()
+            done.set_result(fetch(after, limit))
+            return done
+
+        try:
+            pending = submit(after)
+            while pending is not None:
+                rows = pending.result()
+                pending = None
+                if not rows:
+                    return
+                requested = self._limit(remaining)
+                if remaining is not None:
+                    remaining -= len(rows)
+                after = tuple(rows[-1].get(k) for k in self.key)
+                if len(rows) == requested:
+                    # La siguiente página viaja mientras el caller procesa ésta
+                    pending = submit(after)
+                self.cursor = after
+                yield rows
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def apages(self) -> AsyncGenerator[List[Row], None]:
+        """`pages()` sobre el cliente async: el prefetch es una task, no un hilo."""
+        remaining = self.max_rows
+        after = self.cursor
+        pending: Optional[Union[asyncio.Future, Coroutine[Any, Any, List[Row]]]] = None
+
+        def submit(
+            after: Optional[Tuple[Any, ...]],
+        ) -> Optional[Union[asyncio.Future, Coroutine[Any, Any, List[Row]]]]:
+            limit = self._limit(remaining)
+            if limit <= 0:
+                return None
+            coro = self._aquery(after, limit)
+            return asyncio.ensure_future(coro) if self.prefetch else coro
+
+        try:
+            pending = submit(after)
+            while pending is not None:
+                rows = await pending
+                pending = None
+                if not rows:
+                    return
+                requested = self._limit(remaining)
+                if remaining is not None:
+                    remaining -= len(rows)
+                after = tuple(rows[-1].get(k) for k in self.key)
+                if len(rows) == requested:
+                    pending = submit(after)
+                self.cursor = after
+                yield rows
+        finally:
+            if isinstance(pending, asyncio.Future):
+                pending.cancel()
+            elif pending is not None:
+                pending.close()
+
+    def rows(self) -> Iterator[Row]:
+        for page in self.pages():
+            yield from page
+
+    async def arows(self) -> AsyncIterator[Row]:
+        async for page in self.apages():
+            for row in page:
+                yield row
+
+    def chunks(self) -> Iterator[Dict[str, List[Any]]]:
+        for page in self.pages():
+            names = list(page[0])
+            yield {name: [row.get(name) for row in page] for name in names}
@@ -0,0 +1,49 @@
+"""Import diferido de dependencias pesadas.
+
+`LazyModule("numpy")` se comporta como el módulo real, pero sólo lo importa
+en el primer acceso a un atributo. Así `import app.main` no paga numpy,
+supabase ni openai hasta que un endpoint realmente los usa (cold start).
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from typing import Any, Optional
+
+
+class LazyModule:
+    """Proxy que resuelve `importlib.import_module(name)` en el primer uso.
+
+    Si el import falla y se indicó `fallback`, se usa ese objeto en su lugar
+    (mismo contrato que el antiguo `try: import numpy except: ...`).
+    """
+
+    def __init__(self, name: str, fallback: Any = None) -> None:
+        self._name = name
+        self._fallback = fallback
+        self._module: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Any:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except Exception:
+                        if self._fallback is None:
+                            raise
+                        self._module = self._fallback
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "pending"
+        return f"<LazyModule {self._name!r} ({state})>"
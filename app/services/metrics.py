@@ -0,0 +1,73 @@
+"""Métricas en memoria del proceso (contadores, gauges y resúmenes).
+
+Se exponen en JSON por `GET /metrics`. Los nombres usan puntos como
+separador de dominio: `embed_queue.enqueued`, `supabase.breaker.opened`...
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauge_fns: Dict[str, Callable[[], float]] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def gauge_fn(self, name: str, fn: Callable[[], float]) -> None:
+        """Gauge calculado al leer (p. ej. profundidad de una cola)."""
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def observe(self, name: str, value: float) -> None:
+        """Agrega una observación (latencia, tamaño de lote...) al resumen `name`."""
+        with self._lock:
+            s = self._summaries.get(name)
+            if s is None:
+                self._summaries[name] = {"count": 1, "sum": value, "min": value, "max": value}
+                return
+            s["count"] += 1
+            s["sum"] += value
+            s["min"] = min(s["min"], value)
+            s["max"] = max(s["max"], value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            gauges = dict(self._gauges)
+            fns = dict(self._gauge_fns)
+            counters = dict(self._counters)
+            summaries = {
+                k: {**v, "avg": v["sum"] / v["count"] if v["count"] else 0.0}
+                for k, v in self._summaries.items()
+            }
+        for name, fn in fns.items():
+            try:
+                gauges[name] = float(fn())
+            except Exception:
+                continue
+        return {"counters": counters, "gauges": gauges, "summaries": summaries}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+metrics = Metrics()
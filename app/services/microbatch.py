@@ -0,0 +1,143 @@
+"""Micro-batching: pedidos concurrentes sueltos → una sola llamada en lote.
+
+    batcher = MicroBatcher("embed_batch", embed_many, window_s=0.01, max_size=64)
+    vec = batcher.submit(key, text).result()                    # desde hilos
+    vec = await asyncio.wrap_future(batcher.submit(key, text))  # desde el event loop
+
+Un hilo colector toma el primer pedido y espera hasta `window_s` más (o hasta
+juntar `max_size`); agrupa por `key` (p. ej. modelo + dimensión) y despacha
+cada grupo a `fn(key, items)` en un pool de `concurrency` hilos, así un lote
+lento no frena la recolección del siguiente. `fn` devuelve un resultado por
+item, en orden; un resultado que es una excepción se entrega sólo a ese
+caller, y si `fn` lanza, todos los callers del lote reciben el error.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .metrics import metrics
+
+BatchFn = Callable[[Hashable, List[Any]], Sequence[Any]]
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        fn: BatchFn,
+        window_s: float = 0.01,
+        max_size: int = 64,
+        concurrency: int = 4,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.window_s = max(0.0, window_s)
+        self.max_size = max(1, max_size)
+        self.concurrency = max(1, concurrency)
+        self._pending: Deque[Tuple[Hashable, Any, Future]] = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, key: Hashable, item: Any) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            if not self._running:
+                self._start()
+            self._pending.append((key, item, fut))
+            self._cond.notify()
+        return fut
+
+    def _start(self) -> None:
+        self._running = True
+        self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix=f"{self.name}-call")
+        self._thread = threading.Thread(target=self._collect, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_s: float = 5.0) -> None:
+        """Despacha lo pendiente y detiene el colector y el pool.
+
+        Si el colector no termina dentro de `timeout_s`, lo que no llegó a
+        despachar falla con `RuntimeError`: ningún caller queda esperando.
+        """
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+            thread, pool = self._thread, self._pool
+            self._thread = self._pool = None
+        if thread is not None:
+            thread.join(timeout=timeout_s)
+        if pool is not None:
+            pool.shutdown(wait=True)
+        with self._cond:
+            # Un submit posterior pudo arrancar otro colector: lo pendiente es suyo
+            leftover = [] if self._running else list(self._pending)
+            if leftover:
+                self._pending.clear()
+        self._fail(
+            [(item, fut) for _, item, fut in leftover], RuntimeError(f"{self.name}: detenido")
+        )
+
+    def _fail(self, entries: List[Tuple[Any, Future]], error: BaseException) -> None:
+        for _, fut in entries:
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(error)
+
+    def _collect(self) -> None:
+        pool = self._pool
+        assert pool is not None
+        me = threading.current_thread()
+        while True:
+            with self._cond:
+                while self._running and self._thread is me and not self._pending:
+                    self._cond.wait()
+                # Tras un stop que no esperó, un submit pudo arrancar otro colector
+                if not self._pending or self._thread not in (me, None):
+                    return
+                # Ventana desde el primer pedido: latencia extra acotada a `window_s`
+                deadline = time.monotonic() + self.window_s
+                while self._running and len(self._pending) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                n = min(self.max_size, len(self._pending))
+                batch = [self._pending.popleft() for _ in range(n)]
+            groups: Dict[Hashable, List[Tuple[Any, Future]]] = {}
+            for key, item, fut in batch:
+                groups.setdefault(key, []).append((item, fut))
+            for key, entries in groups.items():
+                try:
+                    pool.submit(self._run, key, entries)
+                except RuntimeError as e:  # pool cerrado por un stop que no esperó
+                    self._fail(entries, e)
+
+    def _run(self, key: Hashable, entries: List[Tuple[Any, Future]]) -> None:
+        # Callers que ya se fueron (cancelados) no viajan en el lote
+        entries = [(item, fut) for item, fut in entries if fut.set_running_or_notify_cancel()]
+        if not entries:
+            return
+        metrics.inc(f"{self.name}.calls")
+        metrics.observe(f"{self.name}.size", len(entries))
+        try:
+            results = list(self.fn(key, [item for item, _ in entries]))
+            if len(results) != len(entries):
+                raise RuntimeError(f"{self.name}: {len(results)} resultados para {len(entries)}")
+        except BaseException as e:
+            metrics.inc(f"{self.name}.errors")
+            for _, fut in entries:
+                fut.set_exception(e)
+            return
+        for (_, fut), result in zip(entries, results):
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
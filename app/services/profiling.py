@@ -0,0 +1,321 @@
+"""Perfilado bajo demanda de una request puntual (opt-in, sólo admin).
+
+    PROFILING_ENABLED=true
+    curl -H "X-Profile: 1" -H "X-Admin-Token: $ADMIN_TOKEN" ".../scheduler/next_post?account=acc"
+    → header `X-Profile-Id`; `GET /debug/profiles/<id>` descarga el `.prof`
+
+Dos modos (header `X-Profile: sample|cprofile`; `1` usa `PROFILING_MODE`):
+
+- `sample` (default): un hilo toma cada `PROFILING_INTERVAL_MS` la pila de
+  cada hilo ocupado del proceso. Los endpoints sync corren en el threadpool
+  de anyio, fuera del alcance de un cProfile activado en el event loop; el
+  muestreo sí los ve. Otras requests en curso también aparecen.
+- `cprofile`: determinista, sólo el hilo del event loop; sirve con los
+  routers async (`ASYNC_ROUTERS`), donde la request entera corre ahí.
+
+Ambos se guardan en formato pstats (`python -m pstats`, snakeviz) en un anillo
+de `PROFILING_KEEP` archivos bajo `PROFILING_DIR`. En `sample`, `ncalls`
+cuenta muestras y los tiempos son muestras × intervalo. Se perfila una
+request a la vez; el resto pasa sin perfilar.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import marshal
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+from ..config import env_bool, env_float, env_int, env_str
+from .auth import admin_ok
+from .metrics import metrics
+
+Frame = Tuple[str, int, str]  # (archivo, línea, función), la clave de pstats
+Stats = Dict[Frame, Tuple[int, int, float, float, Dict[Frame, Tuple[int, int, float, float]]]]
+Message = MutableMapping[str, Any]
+ASGIApp = Callable[
+    [Message, Callable[[], Awaitable[Message]], Callable[[Message], Awaitable[None]]],
+    Awaitable[None],
+]
+
+MODES = ("sample", "cprofile")
+_NAME = re.compile(r"^[0-9T]{15}-[0-9a-f]{8}$")
+_STDLIB = sysconfig.get_paths()["stdlib"]
+# Hojas de pila de un hilo bloqueado esperando trabajo (pool, cola, selector)
+_IDLE = {"wait", "select", "poll", "control", "get", "acquire", "_worker"}
+
+
+def profiling_enabled() -> bool:
+    return env_bool("PROFILING_ENABLED", False)
+
+
+# ---------------------------------------------------------------------------
+# Profilers
+# ---------------------------------------------------------------------------
+
+
+def _stack(frame: Optional[FrameType]) -> Tuple[Frame, ...]:
+    out: List[Frame] = []
+    while frame is not None:
+        code = frame.f_code
+        out.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    out.reverse()
+    return tuple(out)
+
+
+def _idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return code.co_name in _IDLE and code.co_filename.startswith(_STDLIB)
+
+
+def samples_to_stats(samples: Dict[Tuple[Frame, ...], int], interval_s: float) -> Stats:
+    """Pilas muestreadas (raíz → hoja) → dict pstats con callers."""
+    acc: Dict[Frame, List[Any]] = {}
+    for stack, n in samples.items():
+        t = n * interval_s
+        seen = set()
+        for i, fn in enumerate(stack):
+            entry = acc.setdefault(fn, [0, 0, 0.0, 0.0, {}])
+            leaf = i == len(stack) - 1
+            if fn not in seen:  # recursión: el acumulado cuenta una vez por muestra
+                seen.add(fn)
+                entry[0] += n
+                entry[1] += n
+                entry[3] += t
+            if leaf:
+                entry[2] += t
+            if i:
+                cc, nc, tt, ct = entry[4].get(stack[i - 1], (0, 0, 0.0, 0.0))
+                entry[4][stack[i - 1]] = (cc + n, nc + n, tt + (t if leaf else 0.0), ct + t)
+    return {fn: (e[0], e[1], e[2], e[3], e[4]) for fn, e in acc.items()}
+
+
+class Sampler:
+    """Muestrea `sys._current_frames()` cada `interval_s` hasta `stop()`."""
+
+    def __init__(self, interval_s: float = 0.005) -> None:
+        self.interval_s = max(0.0005, interval_s)
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            for tid, frame in sys._current_frames().items():
+                if tid != me and not _idle(frame):
+                    self.samples[_stack(frame)] += 1
+
+    def stats(self) -> Stats:
+        self._thread.join()
+        return samples_to_stats(self.samples, self.interval_s)
+
+
+class CProfiler:
+    """cProfile del hilo que llama a `start()` (el event loop en el middleware)."""
+
+    def __init__(self) -> None:
+        import cProfile
+
+        self._prof = cProfile.Profile()
+
+    def start(self) -> None:
+        self._prof.enable()
+
+    def stop(self) -> None:
+        self._prof.disable()
+
+    def stats(self) -> Stats:
+        self._prof.create_stats()
+        return cast(Stats, self._prof.stats)
+
+
+def make_profiler(mode: str) -> Union[Sampler, CProfiler]:
+    if mode == "cprofile":
+        return CProfiler()
+    return Sampler(env_float("PROFILING_INTERVAL_MS", 5.0) / 1000)
+
+
+# ---------------------------------------------------------------------------
+# Anillo en disco
+# ---------------------------------------------------------------------------
+
+
+class ProfileStore:
+    """`<id>.prof` (pstats) + `<id>.json` (metadatos); conserva los `keep` más nuevos."""
+
+    def __init__(self, root: Union[str, Path], keep: int = 20) -> None:
+        self.root = Path(root)
+        self.keep = max(1, keep)
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id: str, stats: Stats, meta: Dict[str, Any]) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / f"{profile_id}.prof"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            marshal.dump(stats, f)
+        os.replace(tmp, path)
+        (self.root / f"{profile_id}.json").write_text(json.dumps(meta), encoding="utf-8")
+        self._trim()
+        return path
+
+    def _files(self) -> List[Path]:
+        def mtime(p: Path) -> float:
+            try:
+                return p.stat().st_mtime
+            except OSError:  # borrado por otro worker
+                return 0.0
+
+        files = [p for p in self.root.glob("*.prof") if _NAME.match(p.stem)]
+        return sorted(files, key=lambda p: (mtime(p), p.name), reverse=True)
+
+    def _trim(self) -> None:
+        for old in self._files()[self.keep :]:
+            for p in (old, old.with_suffix(".json")):
+                p.unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        out = []
+        for p in self._files():
+            try:
+                meta = json.loads(p.with_suffix(".json").read_text(encoding="utf-8"))
+                size = p.stat().st_size
+            except (OSError, ValueError):
+                continue
+            out.append({"id": p.stem, "bytes": size, **meta})
+        return out
+
+    def path(self, profile_id: str) -> Optional[Path]:
+        """Ruta del perfil o None (id inválido o ya rotado); nunca sale de `root`."""
+        if not _NAME.match(profile_id):
+            return None
+        path = self.root / f"{profile_id}.prof"
+        return path if path.is_file() else None
+
+
+def profile_store() -> ProfileStore:
+    root = env_str("PROFILING_DIR", ".profiles") or ".profiles"
+    return ProfileStore(root, keep=env_int("PROFILING_KEEP", 20))
+
+
+# ---------------------------------------------------------------------------
+# Middleware ASGI
+# ---------------------------------------------------------------------------
+
+_busy = threading.Lock()
+
+
+def _requested_mode(value: str) -> str:
+    value = value.strip().lower()
+    if value in MODES:
+        return value
+    mode = (env_str("PROFILING_MODE", "sample") or "sample").lower()
+    return mode if mode in MODES else "sample"
+
+
+class ProfilingMiddleware:
+    """Perfila la request si trae `X-Profile` y un `X-Admin-Token` válido.
+
+    ASGI puro (sin BaseHTTPMiddleware): sin el header el costo es buscarlo en
+    la lista de headers; con streaming el perfil cubre hasta el último chunk.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self,
+        scope: Message,
+        receive: Callable[[], Awaitable[Message]],
+        send: Callable[[Message], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        wanted = headers.get(b"x-profile")
+        if not wanted or not profiling_enabled():
+            await self.app(scope, receive, send)
+            return
+        if not admin_ok(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            metrics.inc("profiling.denied")
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            metrics.inc("profiling.busy")
+            await self.app(scope, receive, send)
+            return
+
+        mode = _requested_mode(wanted.decode("latin-1"))
+        profile_id = ProfileStore.new_id()
+        status = 0
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                extra = [(b"x-profile-id", profile_id.encode())]
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        profiler = make_profiler(mode)
+        t0 = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            meta = {
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "mode": mode,
+                "duration_ms": round(elapsed_ms, 2),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+            try:
+                await asyncio.to_thread(_save, profiler, profile_id, meta)
+                metrics.inc("profiling.captured")
+                metrics.observe("profiling.duration_ms", elapsed_ms)
+            except Exception as e:
+                print("[profiling] warning:", e)
+            finally:
+                _busy.release()
+
+
+def _save(profiler: Union[Sampler, CProfiler], profile_id: str, meta: Dict[str, Any]) -> None:
+    profile_store().save(profile_id, profiler.stats(), meta)
@@ -0,0 +1,101 @@
+"""Token buckets para respetar los límites del proveedor (RPM y TPM).
+
+    limiter = openai_limiter()
+    limiter.acquire(tokens=estimate_tokens(texts))          # hilos
+    await limiter.aacquire(tokens=estimate_tokens(texts))   # event loop
+
+Cada bucket se rellena a `rate` unidades por segundo hasta `capacity`
+(un minuto de cupo). `reserve()` descuenta siempre y devuelve cuánto hay
+que esperar si el bucket quedó en negativo: las llamadas concurrentes se
+encolan de forma justa sin un lock retenido durante la espera.
+
+`OPENAI_RPM` / `OPENAI_TPM` (0 = sin límite) deben coincidir con el tier de
+la cuenta de OpenAI; los defaults son los de tier 1 para embeddings.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Optional, Sequence
+
+from ..config import env_int
+from .metrics import metrics
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, capacity: float) -> None:
+        self.rate = max(1e-9, rate_per_s)
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Descuenta `amount`; devuelve los segundos a esperar antes de usarlo."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Límite combinado de requests y tokens por minuto (None = sin ese límite)."""
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0) -> None:
+        self.name = name
+        self.requests = TokenBucket(rpm / 60.0, rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm / 60.0, tpm) if tpm > 0 else None
+
+    def reserve(self, tokens: int = 0) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens > 0:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            metrics.inc(f"ratelimit.{self.name}.throttled")
+            metrics.observe(f"ratelimit.{self.name}.wait_ms", wait * 1000)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def estimate_tokens(texts: Sequence[str]) -> int:
+    """Aproximación sin tokenizer: ~4 caracteres por token (+1 por input)."""
+    return sum(len(t) // 4 + 1 for t in texts)
+
+
+_openai: Optional[RateLimiter] = None
+_openai_lock = threading.Lock()
+
+
+def openai_limiter() -> RateLimiter:
+    """Limiter compartido por todas las llamadas a OpenAI del proceso."""
+    global _openai
+    with _openai_lock:
+        if _openai is None:
+            _openai = RateLimiter(
+                "openai", rpm=env_int("OPENAI_RPM", 3000), tpm=env_int("OPENAI_TPM", 1_000_000)
+            )
+        return _openai
+
+
+def reset_openai_limiter() -> None:
+    """Relee `OPENAI_RPM`/`OPENAI_TPM` en la próxima llamada (tests, cambio de tier)."""
+    global _openai
+    with _openai_lock:
+        _openai = None
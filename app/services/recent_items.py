@@ -0,0 +1,62 @@
+"""Ventana de items recientes compartida por el scheduler.
+
+`next_post`, `feedback` y la relevancia temática leen los mismos últimos
+items de `public.items`. Se consultan una vez y se cachean unos segundos;
+las inserciones hechas por este proceso invalidan la ventana.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from ..config import env_float
+from . import versions
+from .cache import TTLCache
+from .singleflight import invalidate_tag
+
+RECENT_WINDOW = 20
+
+_window = TTLCache(ttl=lambda: env_float("RECENT_ITEMS_TTL_S", 60.0), maxsize=1)
+
+
+def _query(supabase: Any) -> Any:
+    return (
+        supabase.table("items")
+        .select("id,title,summary,created_at")
+        .order("created_at", desc=True)
+        .limit(RECENT_WINDOW)
+    )
+
+
+def get_recent_items(supabase: Any, limit: int = RECENT_WINDOW) -> List[Dict[str, Any]]:
+    """Devuelve los últimos items (más nuevo primero). Propaga errores de consulta."""
+    rows: Optional[List[Dict[str, Any]]] = _window.get("items")
+    if rows is None:
+        rows = list(_query(supabase).execute().data or [])
+        _window.set("items", rows)
+    return rows[:limit]
+
+
+async def aget_recent_items(client: Any, limit: int = RECENT_WINDOW) -> List[Dict[str, Any]]:
+    """`get_recent_items` con el cliente async (misma ventana cacheada)."""
+    rows: Optional[List[Dict[str, Any]]] = _window.get("items")
+    if rows is None:
+        rows = list((await _query(client).execute()).data or [])
+        _window.set("items", rows)
+    return rows[:limit]
+
+
+def latest_title(supabase: Any) -> Optional[str]:
+    """Título del item más reciente, o None si no hay datos."""
+    rows = get_recent_items(supabase, limit=1)
+    if not rows:
+        return None
+    return (rows[0].get("title") or "").strip() or None
+
+
+def invalidate_recent_items() -> None:
+    """Se llama tras cada inserción en `items`: descarta la ventana, los resultados
+    single-flight derivados y sube la versión usada por los ETags."""
+    _window.invalidate()
+    invalidate_tag("items")
+    versions.bump("items")
@@ -0,0 +1,702 @@
+"""Planificación y aprendizaje del scheduler, compartidos por los routers sync y async.
+
+`routers/scheduler_ai` y `routers/scheduler_async` sólo resuelven el cliente
+de Supabase y llaman a estas funciones: la lógica (heurística de respaldo,
+prioridad vectorizada, plan diario, paso de gradiente de los pesos) está
+una sola vez. Como en `daily_plan` y `engagement_matrix`, cada lectura o
+escritura arma la consulta en un helper común y tiene dos adaptadores
+finos: `get_*` ejecuta con el cliente sync y `aget_*` la espera con el async.
+
+Los pesos por cuenta `(w_engagement, w_relevance, learning_rate)` se
+cachean `MODEL_PARAMS_TTL_S` segundos (write-through en cada actualización)
+para las lecturas del plan. El aprendizaje lee la fila con `fresh=True`: es
+un read-modify-write y partir de pesos cacheados pisaría lo que otro proceso
+(u otro worker) escribió mientras tanto.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import configured_accounts, env_float
+from ..models.schemas import FeedbackRequest, NextPostResponse
+from . import daily_plan, versions
+from .cache import TTLCache
+from .daily_runs import local_run_date
+from .engagement_matrix import aget_matrices, get_matrices, record_feedback
+from .fastjson import supabase_row
+from .lazy import LazyModule
+from .recent_items import aget_recent_items, get_recent_items
+from .singleflight import invalidate_tag
+
+# numpy se importa en el primer uso para no penalizar el cold start
+np: Any = LazyModule("numpy")
+
+Params = Tuple[float, float, float]  # (w_engagement, w_relevance, learning_rate)
+
+DEFAULT_TOPIC = "Innovación humana y colaboración IA"
+DEFAULT_PARAMS: Params = (0.6, 0.4, 0.05)
+PARAMS_TABLE = "scheduler_model_params"
+
+# Pesos por cuenta: cambian sólo vía feedback o update manual (write-through)
+_params = TTLCache(ttl=lambda: env_float("MODEL_PARAMS_TTL_S", 300.0))
+
+
+# --------------------------
+# Heurística de respaldo
+# --------------------------
+
+
+@functools.lru_cache(maxsize=256)
+def _stable_choice(options: Tuple[str, ...], seed: int) -> str:
+    rng = np.random.default_rng(seed)
+    idx = int(rng.integers(0, len(options)))
+    return options[idx]
+
+
+@functools.lru_cache(maxsize=256)
+def _stable_time(seed: int) -> str:
+    """Devuelve una hora HH:MM estable para el día, basada en seed."""
+    rng = np.random.default_rng(seed)
+    hour = int(rng.integers(17, 21))  # ventana 17-20 hs
+    minute = int(rng.integers(0, 2)) * 30  # 00 o 30
+    return f"{hour:02d}:{minute:02d}"
+
+
+def heuristic_next_post(account: str, topic_hint: Optional[str] = None) -> NextPostResponse:
+    """Recomendación estable para el día cuando no hay datos (o Supabase falla)."""
+    now = datetime.now().astimezone()
+    seed = int(now.strftime("%Y%j"))  # año+día_juliano
+    weekday = now.weekday()
+
+    # Formatos candidatos
+    formats = ("reel", "carousel", "post", "story")
+    content_type = _stable_choice(formats, seed + weekday)
+
+    # Horas sugeridas por día (semilla + patrón base)
+    recommended_time = _stable_time(seed + 3 * weekday)
+
+    topic = topic_hint or DEFAULT_TOPIC
+    priority = float(np.clip(0.75 + (weekday * 0.01), 0.75, 0.9))
+
+    return NextPostResponse(
+        account=account,
+        recommended_time=recommended_time,
+        content_type=content_type,
+        topic=topic,
+        priority=round(priority, 2),
+    )
+
+
+def _heuristic_day(
+    account: str, topic_hint: Optional[str], generated_at: str
+) -> List[NextPostResponse]:
+    rec = heuristic_next_post(account, topic_hint).model_copy(update={"generated_at": generated_at})
+    return [rec] * 24
+
+
+# --------------------------
+# Señales
+# --------------------------
+
+
+def engagement_score(row: Dict[str, Any]) -> float:
+    likes = float(row.get("likes", 0))
+    comments = float(row.get("comments", 0))
+    saves = float(row.get("saves", 0))
+    followers = float(row.get("followers", 0) or 0)
+    if followers <= 0:
+        return 0.0
+    return float((likes + 2 * comments + 0.5 * saves) / followers)
+
+
+def _simple_relevance(text: str, context: str) -> float:
+    """Replica una métrica de relevancia simple estilo /semantic/score."""
+    tset = set(text.lower().split())
+    cset = set(context.lower().split()) if context else set()
+    overlap = len(tset & cset)
+    return float(min(1.0, (overlap / (len(tset) + 1e-6)) * 2))
+
+
+def items_relevance(rows: List[Dict[str, Any]], topic: str) -> float:
+    """Solapamiento de `topic` con títulos/resúmenes de `rows` (0.5 sin contexto).
+
+    Proxy por tokens contra la ventana de items recientes; en el futuro puede
+    sustituirse por embeddings y similitudes promedio.
+    """
+    ctx_list = []
+    for r in rows:
+        title = (r.get("title") or "").strip()
+        summary = (r.get("summary") or "").strip()
+        if title:
+            ctx_list.append(title)
+        if summary:
+            ctx_list.append(summary)
+    context = " \n ".join(ctx_list)
+    if not context:
+        return 0.5
+    return min(1.0, max(0.0, _simple_relevance(topic, context)))
+
+
+def _latest_title(rows: List[Dict[str, Any]]) -> Optional[str]:
+    if not rows:
+        return None
+    return (rows[0].get("title") or "").strip() or None
+
+
+def _recent_items(supabase: Any) -> List[Dict[str, Any]]:
+    try:
+        return get_recent_items(supabase)
+    except Exception:
+        return []
+
+
+async def _arecent_items(client: Any) -> List[Dict[str, Any]]:
+    try:
+        return await aget_recent_items(client)
+    except Exception:
+        return []
+
+
+# --------------------------
+# Pesos por cuenta
+# --------------------------
+
+
+def _params_from_row(row: Dict[str, Any]) -> Params:
+    return (
+        float(row.get("w_engagement", 0.6)),
+        float(row.get("w_relevance", 0.4)),
+        float(row.get("learning_rate", 0.05)),
+    )
+
+
+def cached_params(account: str) -> Optional[Params]:
+    params: Optional[Params] = _params.get(account)
+    return params
+
+
+def forget_params(account: Optional[str] = None) -> None:
+    _params.invalidate(account)
+
+
+def _cached(accounts: List[str], fresh: bool) -> Tuple[Dict[str, Params], List[str]]:
+    out = {acc: DEFAULT_PARAMS for acc in accounts}
+    missing = []
+    for acc in dict.fromkeys(accounts):
+        cached = None if fresh else cached_params(acc)
+        if cached is not None:
+            out[acc] = cached
+        else:
+            missing.append(acc)
+    return out, missing
+
+
+def _select_params(supabase: Any, accounts: List[str]) -> Any:
+    return (
+        supabase.table(PARAMS_TABLE)
+        .select("account,w_engagement,w_relevance,learning_rate")
+        .in_("account", accounts)
+    )
+
+
+def _found(data: List[Dict[str, Any]]) -> Dict[str, Params]:
+    found = {row["account"]: _params_from_row(row) for row in data}
+    for acc, params in found.items():
+        _params.set(acc, params)
+    return found
+
+
+def _insert_defaults(supabase: Any, accounts: List[str]) -> Any:
+    w_e, w_r, lr = DEFAULT_PARAMS
+    return supabase.table(PARAMS_TABLE).insert(
+        [
+            {"account": acc, "w_engagement": w_e, "w_relevance": w_r, "learning_rate": lr}
+            for acc in accounts
+        ]
+    )
+
+
+def load_model_params(supabase: Any, accounts: List[str]) -> Dict[str, Params]:
+    """Lee los pesos de varias cuentas con una sola consulta `in_` y los cachea."""
+    return _found(_select_params(supabase, accounts).execute().data or [])
+
+
+def get_model_params_many(
+    supabase: Any, accounts: List[str], fresh: bool = False
+) -> Dict[str, Params]:
+    """Pesos de varias cuentas: cache + una consulta `in_` para las faltantes.
+
+    `fresh=True` ignora la cache y lee todas (el resultado igual se cachea).
+    Las cuentas sin registro se crean con defaults en un único insert
+    (best-effort). Ante cualquier error devuelve los defaults.
+    """
+    out, missing = _cached(accounts, fresh)
+    if not supabase or not missing:
+        return out
+    try:
+        found = load_model_params(supabase, missing)
+    except Exception:
+        return out
+    out.update(found)
+    new = [acc for acc in missing if acc not in found]
+    if new:
+        try:
+            _insert_defaults(supabase, new).execute()
+            for acc in new:
+                _params.set(acc, DEFAULT_PARAMS)
+        except Exception:
+            pass
+    return out
+
+
+async def aget_model_params_many(
+    client: Any, accounts: List[str], fresh: bool = False
+) -> Dict[str, Params]:
+    """`get_model_params_many` con el cliente async (misma cache)."""
+    out, missing = _cached(accounts, fresh)
+    if not client or not missing:
+        return out
+    try:
+        found = _found((await _select_params(client, missing).execute()).data or [])
+    except Exception:
+        return out
+    out.update(found)
+    new = [acc for acc in missing if acc not in found]
+    if new:
+        try:
+            await _insert_defaults(client, new).execute()
+            for acc in new:
+                _params.set(acc, DEFAULT_PARAMS)
+        except Exception:
+            pass
+    return out
+
+
+def get_model_params(supabase: Any, account: str, fresh: bool = False) -> Params:
+    """(w_engagement, w_relevance, learning_rate) de una cuenta.
+
+    Si no existe registro, intenta crearlo con defaults. Ante cualquier
+    error devuelve los defaults. `fresh=True` lee la tabla aunque haya cache.
+    """
+    try:
+        if not supabase:
+            return DEFAULT_PARAMS
+        cached = None if fresh else cached_params(account)
+        if cached is not None:
+            return cached
+        res = (
+            supabase.table(PARAMS_TABLE)
+            .select("w_engagement,w_relevance,learning_rate")
+            .eq("account", account)
+            .limit(1)
+            .execute()
+        )
+        row = (res.data or [None])[0]
+        if not row:
+            _insert_defaults(supabase, [account]).execute()
+            _params.set(account, DEFAULT_PARAMS)
+            return DEFAULT_PARAMS
+        params = _params_from_row(row)
+        _params.set(account, params)
+        return params
+    except Exception:
+        return DEFAULT_PARAMS
+
+
+def _upsert_params(supabase: Any, account: str, params: Params) -> Any:
+    w_e, w_r, lr = params
+    return supabase.table(PARAMS_TABLE).upsert(
+        {
+            "account": account,
+            "w_engagement": w_e,
+            "w_relevance": w_r,
+            "learning_rate": lr,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+def _params_changed(account: str) -> None:
+    versions.bump(f"model_params:{account}")
+    invalidate_tag("model_params")
+
+
+def update_model_params(
+    supabase: Any, account: str, w_e: float, w_r: float, learning_rate: float
+) -> None:
+    """Upsert de los pesos de una cuenta. Falla de forma silenciosa."""
+    params = (w_e, w_r, learning_rate)
+    try:
+        if not supabase:
+            return
+        _upsert_params(supabase, account, params).execute()
+        _params.set(account, params)
+    except Exception:
+        # Silencioso: no romper endpoint por fallos de tabla/conexión
+        _params.invalidate(account)
+    finally:
+        _params_changed(account)
+
+
+async def aupdate_model_params(
+    client: Any, account: str, w_e: float, w_r: float, learning_rate: float
+) -> None:
+    """`update_model_params` con el cliente async."""
+    params = (w_e, w_r, learning_rate)
+    try:
+        if not client:
+            return
+        await _upsert_params(client, account, params).execute()
+        _params.set(account, params)
+    except Exception:
+        _params.invalidate(account)
+    finally:
+        _params_changed(account)
+
+
+# --------------------------
+# Plan del día
+# --------------------------
+
+
+def _day_picks(matrices: Dict[str, Any], weekday: int) -> Dict[str, List[Tuple[str, int, float]]]:
+    """Mejor (formato, hora, valor) para cada hora del día; sólo cuentas con historial."""
+    picks: Dict[str, List[Tuple[str, int, float]]] = {}
+    for acc, m in matrices.items():
+        if m.observations:
+            hours = [best for h in range(24) if (best := m.best(weekday, h)) is not None]
+            if len(hours) == 24:
+                picks[acc] = hours
+    return picks
+
+
+def _with_history(matrices: Dict[str, Any]) -> List[str]:
+    return [acc for acc, m in matrices.items() if m.observations]
+
+
+def _compose_day(
+    picks: Dict[str, List[Tuple[str, int, float]]],
+    topic: str,
+    top_rel: float,
+    params: Dict[str, Params],
+    generated_at: str,
+) -> Dict[str, List[NextPostResponse]]:
+    """Prioridad vectorizada (cuentas × horas) y las 24 recomendaciones por cuenta."""
+    out: Dict[str, List[NextPostResponse]] = {}
+    names = list(picks)
+    engagement = np.clip(np.array([[p[2] for p in picks[a]] for a in names], dtype=float), 0.0, 1.0)
+    weights = np.array([params[a][:2] for a in names], dtype=float)
+    priority = weights[:, :1] * engagement + weights[:, 1:2] * top_rel
+
+    for acc, row in zip(names, priority):
+        out[acc] = [
+            NextPostResponse(
+                account=acc,
+                recommended_time=f"{hour:02d}:00",
+                content_type=str(content_type),
+                topic=topic,
+                priority=round(float(prio), 2),
+                generated_at=generated_at,
+            )
+            for (content_type, hour, _value), prio in zip(picks[acc], row)
+        ]
+    return out
+
+
+def _build_day(
+    accounts: List[str],
+    recent: List[Dict[str, Any]],
+    matrices: Dict[str, Any],
+    params: Dict[str, Params],
+    now: datetime,
+) -> Dict[str, List[NextPostResponse]]:
+    """Heurística para las cuentas sin historial y prioridad para el resto.
+
+    Topic (título más reciente) y relevancia temática son comunes a todas
+    las cuentas y se calculan una vez sobre la ventana de items:
+    priority = w_engagement * engagement + w_relevance * topical_relevance
+    """
+    generated_at = now.isoformat(timespec="seconds")
+    topic_hint = _latest_title(recent)
+    out = {acc: _heuristic_day(acc, topic_hint, generated_at) for acc in accounts}
+    picks = _day_picks(matrices, now.weekday())
+    if not picks:
+        return out
+    topic = topic_hint or DEFAULT_TOPIC
+    out.update(_compose_day(picks, topic, items_relevance(recent, topic), params, generated_at))
+    return out
+
+
+def recommend_day(
+    supabase: Any, accounts: List[str], now: datetime
+) -> Dict[str, List[NextPostResponse]]:
+    """Plan del día de varias cuentas: 24 recomendaciones por cuenta (una por hora).
+
+    La de la hora `h` elige el mejor slot desde `h` en adelante. Matrices y
+    pesos se leen con `in_`; los pesos sólo de las cuentas con historial.
+    Propaga errores de Supabase; el caller decide el fallback.
+    """
+    accounts = list(dict.fromkeys(accounts))
+    if not supabase:
+        generated_at = now.isoformat(timespec="seconds")
+        return {acc: _heuristic_day(acc, None, generated_at) for acc in accounts}
+    recent = _recent_items(supabase)
+    matrices = get_matrices(supabase, accounts, engagement_score)
+    params = get_model_params_many(supabase, _with_history(matrices))
+    return _build_day(accounts, recent, matrices, params, now)
+
+
+async def arecommend_day(
+    client: Any, accounts: List[str], now: datetime
+) -> Dict[str, List[NextPostResponse]]:
+    """`recommend_day` con las tres lecturas en paralelo.
+
+    Los pesos se piden para todas las cuentas (no sólo las con historial):
+    así la consulta no espera a las matrices. Propaga errores de las matrices.
+    """
+    accounts = list(dict.fromkeys(accounts))
+    recent, matrices, params = await asyncio.gather(
+        _arecent_items(client),
+        aget_matrices(client, accounts, engagement_score),
+        aget_model_params_many(client, accounts),
+    )
+    return _build_day(accounts, recent, matrices, params, now)
+
+
+def _plan_sources(account: str) -> Tuple[str, ...]:
+    return "items", f"model_params:{account}", f"feedback:{account}"
+
+
+def _plan_stamp(account: str) -> Tuple[int, ...]:
+    """Versiones de las fuentes del plan de una cuenta (items, pesos y feedback)."""
+    return tuple(versions.current(name) for name in _plan_sources(account))
+
+
+def _not_before(accounts: List[str]) -> Dict[str, float]:
+    """Último cambio local de las fuentes de cada cuenta: un plan persistido anterior
+    no las refleja (el lookup en memoria lo descarta por stamp; éste, por hora)."""
+    return {acc: max(versions.changed_at(name) for name in _plan_sources(acc)) for acc in accounts}
+
+
+def _in_memory(
+    accounts: List[str], plan_date: str, hour: int, refresh: bool
+) -> Dict[str, NextPostResponse]:
+    out: Dict[str, NextPostResponse] = {}
+    if not refresh:
+        for acc in accounts:
+            hit = daily_plan.plan.lookup(acc, plan_date, hour, _plan_stamp(acc))
+            if hit is not None:
+                out[acc] = hit
+    return out
+
+
+def _adopt(
+    loaded: Dict[str, Tuple[List[Dict[str, Any]], str, float]],
+    plan_date: str,
+    hour: int,
+    out: Dict[str, NextPostResponse],
+) -> None:
+    """Carga en memoria los planes persistidos por otro proceso y resuelve la hora actual."""
+    for acc, (hours, built_at, age) in loaded.items():
+        try:
+            entries = [NextPostResponse.model_validate(h) for h in hours]
+        except Exception:
+            continue  # plan de otra versión: reconstruir
+        daily_plan.plan.put(plan_date, acc, entries, built_at, _plan_stamp(acc), age)
+        out[acc] = entries[hour]
+
+
+def _plan_targets(
+    plan_date: str, missing: List[str], out: Dict[str, NextPostResponse]
+) -> List[str]:
+    targets = list(missing)
+    if daily_plan.plan.is_empty(plan_date):
+        # Cambio de día (o arranque): plan completo de las cuentas configuradas
+        targets += [acc for acc in configured_accounts() if acc not in out and acc not in targets]
+    return targets
+
+
+def _materialize(
+    plan_date: str, now: datetime, days: Dict[str, List[NextPostResponse]]
+) -> Dict[str, Tuple[List[Dict[str, Any]], str]]:
+    """Guarda los planes en memoria; devuelve las filas a persistir."""
+    # Con microsegundos: se compara contra `versions.changed_at` al cargarlo
+    built_at = now.isoformat()
+    rows = {}
+    for acc, entries in days.items():
+        daily_plan.plan.put(plan_date, acc, entries, built_at, _plan_stamp(acc))
+        rows[acc] = ([e.model_dump(mode="json") for e in entries], built_at)
+    return rows
+
+
+def _fallback(out: Dict[str, NextPostResponse], missing: List[str]) -> Dict[str, NextPostResponse]:
+    # Sin materializar: al volver Supabase debe recalcularse
+    out.update({acc: heuristic_next_post(acc) for acc in missing})
+    return out
+
+
+def planned(
+    supabase: Any, accounts: List[str], refresh: bool = False
+) -> Dict[str, NextPostResponse]:
+    """Recomendación vigente de cada cuenta, servida desde el plan diario.
+
+    Lookup O(1) en memoria; si falta (o `refresh`), se intenta el plan
+    persistido por otro proceso y si no, se construye. En el primer acceso
+    del día el plan se construye para todas las cuentas configuradas.
+    """
+    accounts = list(dict.fromkeys(accounts))
+    now = datetime.now().astimezone()
+    plan_date, hour = local_run_date(now), now.hour
+
+    out = _in_memory(accounts, plan_date, hour, refresh)
+    missing = [acc for acc in accounts if acc not in out]
+    if not missing:
+        return out
+    if not supabase:
+        return _fallback(out, missing)
+
+    if not refresh:
+        loaded = daily_plan.load(supabase, plan_date, missing, _not_before(missing))
+        _adopt(loaded, plan_date, hour, out)
+        missing = [acc for acc in missing if acc not in out]
+        if not missing:
+            return out
+
+    try:
+        days = recommend_day(supabase, _plan_targets(plan_date, missing, out), now)
+    except Exception as e:
+        print("[scheduler.next_post] warning:", e)
+        return _fallback(out, missing)
+
+    daily_plan.persist(supabase, plan_date, _materialize(plan_date, now, days))
+    out.update({acc: days[acc][hour] for acc in missing})
+    return out
+
+
+async def aplanned(
+    client: Any, accounts: List[str], refresh: bool = False
+) -> Dict[str, NextPostResponse]:
+    """`planned` con el cliente async."""
+    accounts = list(dict.fromkeys(accounts))
+    now = datetime.now().astimezone()
+    plan_date, hour = local_run_date(now), now.hour
+
+    out = _in_memory(accounts, plan_date, hour, refresh)
+    missing = [acc for acc in accounts if acc not in out]
+    if not missing:
+        return out
+    if not client:
+        return _fallback(out, missing)
+
+    if not refresh:
+        loaded = await daily_plan.aload(client, plan_date, missing, _not_before(missing))
+        _adopt(loaded, plan_date, hour, out)
+        missing = [acc for acc in missing if acc not in out]
+        if not missing:
+            return out
+
+    try:
+        days = await arecommend_day(client, _plan_targets(plan_date, missing, out), now)
+    except Exception as e:
+        print("[scheduler.next_post] warning:", e)
+        return _fallback(out, missing)
+
+    await daily_plan.apersist(client, plan_date, _materialize(plan_date, now, days))
+    out.update({acc: days[acc][hour] for acc in missing})
+    return out
+
+
+# --------------------------
+# Feedback y aprendizaje
+# --------------------------
+
+
+def _feedback_row(payload: FeedbackRequest, engagement: float) -> Dict[str, Any]:
+    return {
+        "account": payload.account,
+        "post_id": payload.post_id,
+        "content_type": payload.content_type,
+        "likes": payload.likes,
+        "comments": payload.comments,
+        "saves": payload.saves,
+        "reach": payload.reach,
+        "followers": payload.followers,
+        "engagement_score": engagement,
+        "posted_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _feedback_stored(payload: FeedbackRequest, engagement: float, posted_at: str) -> None:
+    # Actualización incremental de la matriz cacheada (sin releer posts_feedback)
+    record_feedback(payload.account, payload.content_type, posted_at, engagement)
+    versions.bump(f"feedback:{payload.account}")
+    invalidate_tag("feedback")
+    daily_plan.plan.forget(payload.account)
+
+
+def save_feedback(supabase: Any, payload: FeedbackRequest, engagement: float) -> bool:
+    """Inserta el feedback en `posts_feedback`; False si no se pudo guardar."""
+    row = _feedback_row(payload, engagement)
+    try:
+        supabase.table("posts_feedback").insert(supabase_row(row)).execute()
+    except Exception:
+        return False
+    _feedback_stored(payload, engagement, row["posted_at"])
+    return True
+
+
+async def asave_feedback(client: Any, payload: FeedbackRequest, engagement: float) -> bool:
+    """`save_feedback` con el cliente async."""
+    row = _feedback_row(payload, engagement)
+    try:
+        await client.table("posts_feedback").insert(supabase_row(row)).execute()
+    except Exception:
+        return False
+    _feedback_stored(payload, engagement, row["posted_at"])
+    return True
+
+
+def learned_weights(
+    w_e: float, w_r: float, lr: float, engagement: float, top_rel: float
+) -> Tuple[float, float]:
+    """Un paso de gradiente sobre (engagement, relevancia), renormalizado a suma 1."""
+    weights = np.array([w_e, w_r], dtype=float)
+    feats = np.array([engagement, top_rel], dtype=float)
+    pred = float(weights.dot(feats))
+    err = float(engagement - pred)
+    weights = weights + lr * err * feats
+    s = float(weights.sum()) or 1.0
+    weights = np.clip(weights / s, 0.0, 1.0)
+    return float(weights[0]), float(weights[1])
+
+
+def _step(params: Params, recent: List[Dict[str, Any]], engagement: float) -> Params:
+    # Para topical_relevance se usa el topic más reciente como proxy
+    w_e, w_r, lr = params
+    topic = _latest_title(recent) or DEFAULT_TOPIC
+    w_e, w_r = learned_weights(w_e, w_r, lr, engagement, items_relevance(recent, topic))
+    return w_e, w_r, lr
+
+
+def learn(supabase: Any, account: str, engagement: float) -> None:
+    """Mini gradient descent: ajusta y persiste los pesos de la cuenta. No propaga errores."""
+    try:
+        params = get_model_params(supabase, account, fresh=True)
+        update_model_params(supabase, account, *_step(params, _recent_items(supabase), engagement))
+    except Exception as e:
+        print("[scheduler.learning] warning:", e)
+
+
+async def alearn(client: Any, account: str, engagement: float) -> None:
+    """`learn` con el cliente async; pesos e items se leen en paralelo."""
+    try:
+        params, recent = await asyncio.gather(
+            aget_model_params_many(client, [account], fresh=True), _arecent_items(client)
+        )
+        await aupdate_model_params(client, account, *_step(params[account], recent, engagement))
+    except Exception as e:
+        print("[scheduler.learning] warning:", e)
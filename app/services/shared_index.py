@@ -0,0 +1,402 @@
+"""Índice de embeddings compartido entre workers de uvicorn (memoria compartida).
+
+Con varios workers, cada proceso cargaría su propia copia de la matriz de
+embeddings. Aquí un solo proceso (el que toma el lock `<nombre>.lock`) la
+carga y la publica en `multiprocessing.shared_memory`; el resto la mapea en
+sólo lectura, sin copia.
+
+Segmentos:
+- `<nombre>-ctl`: 4 × uint64 `[seq, epoch, n, dim]`, escrito con seqlock
+  (`seq` impar = escritura en curso).
+- `<nombre>-<epoch>`: ids int64 ordenados (n) + matriz float32 (n × dim)
+  con filas normalizadas (coseno = producto punto).
+
+Un índice reconstruido se escribe completo en un segmento nuevo y recién
+entonces se sube `epoch` (swap atómico); el segmento anterior se desvincula.
+Los lectores que ya lo tenían mapeado lo conservan hasta su próxima consulta.
+Al cerrar, el publicador deja `epoch = 0` en el control antes de desvincularlo:
+los lectores vuelven a mapear `<nombre>-ctl` y siguen al próximo publicador.
+
+Se activa con `EMBED_INDEX_ENABLED=1` (nombre: `EMBED_INDEX_NAME`, leído en
+`start_index()`); `EMBED_INDEX_REFRESH_S` controla
+cada cuánto el publicador lo reconstruye desde `item_embeddings` (o desde el
+vector store local si hay `VECTOR_STORE_DIR`, ver `vector_store.py`).
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, List, Optional, Tuple
+
+from ..config import env_bool, env_float, env_int, env_str
+from .embedding_codec import decode_embedding_row
+from .embeddings import DEFAULT_EMBEDDING_MODEL
+from .lazy import LazyModule
+from .metrics import metrics
+from .vector_store import get_store
+
+np: Any = LazyModule("numpy")
+
+_CTL_SIZE = 4 * 8
+
+
+class IndexView:
+    """Vista de sólo lectura de una época del índice."""
+
+    __slots__ = ("epoch", "ids", "matrix", "_shm")
+
+    def __init__(self, epoch: int, ids: Any, matrix: Any, shm: Any = None) -> None:
+        self.epoch = epoch
+        self.ids = ids
+        self.matrix = matrix
+        self._shm = shm  # mantiene vivo el mapeo mientras exista la vista
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    def row_of(self, item_id: int) -> Optional[int]:
+        pos = int(np.searchsorted(self.ids, item_id))
+        if pos < self.ids.size and int(self.ids[pos]) == item_id:
+            return pos
+        return None
+
+    def neighbors(self, item_id: int, k: int = 5) -> Optional[List[Tuple[int, float]]]:
+        """Top-k items más similares (coseno) a `item_id`; None si no está indexado."""
+        row = self.row_of(item_id)
+        if row is None:
+            return None
+        scores = self.matrix @ self.matrix[row]
+        scores[row] = -np.inf
+        k = max(0, min(k, scores.size - 1))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(self.ids[i]), round(float(scores[i]), 4)) for i in top]
+
+
+def _attach(name: str) -> Any:
+    """Mapea un segmento existente sin registrarlo en el resource_tracker.
+
+    Sin esto, el tracker de cada worker lo desvincularía al salir el proceso.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    except Exception:
+        pass
+    return shm
+
+
+def _unlink_quiet(name: str) -> None:
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _ctl_array(shm: Any) -> Any:
+    return np.ndarray((4,), dtype=np.uint64, buffer=shm.buf)
+
+
+def _views(buf: Any, n: int, dim: int) -> Tuple[Any, Any]:
+    ids = np.ndarray((n,), dtype=np.int64, buffer=buf)
+    matrix = np.ndarray((n, dim), dtype=np.float32, buffer=buf, offset=n * 8)
+    return ids, matrix
+
+
+class SharedEmbeddingIndex:
+    def __init__(self, name: str = "wav-embed") -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._ctl: Any = None
+        self._view: Optional[IndexView] = None
+        self._retired: List[Any] = []
+
+    @property
+    def is_publisher(self) -> bool:
+        return self._lock_fd is not None
+
+    # ---- publicador ----
+
+    def try_become_publisher(self) -> bool:
+        """Toma el lock de publicador (uno por host y nombre). Se libera al morir el proceso."""
+        if self._lock_fd is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:  # pragma: no cover - sin flock (Windows): índice por proceso
+            return False
+        path = os.path.join(tempfile.gettempdir(), f"{self.name}.lock")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        try:
+            self._ctl = shared_memory.SharedMemory(
+                name=f"{self.name}-ctl", create=True, size=_CTL_SIZE
+            )
+            self._ctl.buf[:_CTL_SIZE] = bytes(_CTL_SIZE)
+        except FileExistsError:
+            # Control de un publicador anterior caído: se reutiliza y la época sigue subiendo
+            self._ctl = shared_memory.SharedMemory(name=f"{self.name}-ctl")
+        self._lock_fd = fd
+        return True
+
+    def publish(self, ids: Any, matrix: Any) -> int:
+        """Publica una nueva época con `ids` (n) y `matrix` (n × dim). Devuelve la época."""
+        if not self.is_publisher:
+            raise RuntimeError("sólo el publicador puede escribir el índice")
+        ids = np.asarray(ids, dtype=np.int64)
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != ids.size:
+            raise ValueError("ids y matriz no coinciden")
+        n, dim = matrix.shape
+        order = np.argsort(ids, kind="stable")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        with self._lock:
+            ctl = _ctl_array(self._ctl)
+            epoch = int(ctl[1]) + 1
+            name = f"{self.name}-{epoch}"
+            _unlink_quiet(name)  # resto de un publicador caído
+            shm = shared_memory.SharedMemory(
+                name=name, create=True, size=max(1, n * 8 + n * dim * 4)
+            )
+            seg_ids, seg_matrix = _views(shm.buf, n, dim)
+            seg_ids[:] = ids[order]
+            np.divide(matrix[order], norms[order], out=seg_matrix)
+
+            # Swap atómico: los lectores ven la época vieja o la nueva completa
+            ctl[0] += 1
+            ctl[1], ctl[2], ctl[3] = epoch, n, dim
+            ctl[0] += 1
+            del ctl
+
+            old, self._view = self._view, IndexView(epoch, seg_ids, seg_matrix, shm)
+            if old is not None and old._shm is not None:
+                old._shm.unlink()
+                self._retire(old)
+        metrics.inc("embed_index.published")
+        return epoch
+
+    # ---- lectores ----
+
+    def _read_ctl(self) -> Optional[Tuple[int, int, int]]:
+        if self._ctl is None:
+            try:
+                self._ctl = _attach(f"{self.name}-ctl")
+            except FileNotFoundError:
+                return None
+        ctl = _ctl_array(self._ctl)
+        for _ in range(1000):
+            seq = int(ctl[0])
+            if seq % 2 == 0:
+                epoch, n, dim = int(ctl[1]), int(ctl[2]), int(ctl[3])
+                if int(ctl[0]) == seq:
+                    return epoch, n, dim
+            time.sleep(0)
+        return None
+
+    def view(self) -> Optional[IndexView]:
+        """Época vigente del índice, o None si todavía no se publicó ninguna."""
+        if self.is_publisher:
+            return self._view
+        reattached = False
+        for _ in range(3):
+            state = self._read_ctl()
+            if state is None:
+                return None
+            epoch, n, dim = state
+            if epoch == 0:
+                # Sin publicar todavía, o control huérfano de un publicador que cerró
+                if reattached or not self._detach():
+                    return None
+                reattached = True
+                continue
+            current = self._view
+            if current is not None and current.epoch == epoch:
+                return current
+            try:
+                shm = _attach(f"{self.name}-{epoch}")
+            except FileNotFoundError:
+                # Reemplazada entre lecturas (releer basta) o control huérfano de
+                # un publicador reiniciado: se vuelve a mapear el control por nombre
+                if not reattached:
+                    self._detach()
+                    reattached = True
+                continue
+            ids, matrix = _views(shm.buf, n, dim)
+            ids.flags.writeable = False
+            matrix.flags.writeable = False
+            with self._lock:
+                old, self._view = self._view, IndexView(epoch, ids, matrix, shm)
+                if old is not None:
+                    self._retire(old)
+            metrics.inc("embed_index.swapped")
+            return self._view
+        return None
+
+    def _detach(self) -> bool:
+        """Lector: suelta control y vista para volver a mapearlos. False si no había control."""
+        with self._lock:
+            ctl, self._ctl = self._ctl, None
+            view, self._view = self._view, None
+            if view is not None and view._shm is not None:
+                self._retire(view)
+        if ctl is None:
+            return False
+        try:
+            ctl.close()
+        except BufferError:
+            pass
+        return True
+
+    def _retire(self, old: IndexView) -> None:
+        # El mapeo se cierra cuando ya no quedan vistas numpy sobre él
+        self._retired.append(old._shm)
+        old._shm = None
+        still: List[Any] = []
+        for shm in self._retired:
+            try:
+                shm.close()
+            except BufferError:
+                still.append(shm)
+        self._retired = still
+
+    def close(self) -> None:
+        """Suelta los mapeos; el publicador además desvincula los segmentos."""
+        with self._lock:
+            view, self._view = self._view, None
+            if view is not None and view._shm is not None:
+                if self.is_publisher:
+                    view._shm.unlink()
+                self._retire(view)
+            if self._ctl is not None:
+                if self.is_publisher:
+                    # epoch 0 avisa a los lectores que este control quedó huérfano
+                    ctl = _ctl_array(self._ctl)
+                    ctl[0] += 1
+                    ctl[1] = ctl[2] = ctl[3] = 0
+                    ctl[0] += 1
+                    del ctl
+                    self._ctl.unlink()
+                try:
+                    self._ctl.close()
+                except BufferError:
+                    pass
+                self._ctl = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+
+def load_from_supabase(
+    supabase: Any, model: str = DEFAULT_EMBEDDING_MODEL, limit: Optional[int] = None
+) -> Tuple[Any, Any]:
+    """Lee los embeddings más recientes de `model` como (ids int64, matriz float32).
+
+    Filas de otra dimensión que la mayoritaria (migraciones a medias) se descartan.
+    """
+    limit = limit or env_int("EMBED_INDEX_ROWS", 5000)
+    res = (
+        supabase.table("item_embeddings")
+        .select("*")
+        .eq("model", model)
+        .order("item_id", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    ids: List[int] = []
+    vectors: List[Any] = []
+    for row in res.data or []:
+        try:
+            vec = decode_embedding_row(row)
+            ids.append(int(row["item_id"]))
+            vectors.append(vec)
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not vectors:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    dims = [v.size for v in vectors]
+    dim = max(set(dims), key=dims.count)
+    keep = [i for i, d in enumerate(dims) if d == dim]
+    return (
+        np.array([ids[i] for i in keep], dtype=np.int64),
+        np.stack([vectors[i] for i in keep]).astype(np.float32, copy=False),
+    )
+
+
+# El nombre se fija en `start_index()`: este módulo se importa antes de cargar `.env`
+index = SharedEmbeddingIndex()
+metrics.gauge_fn("embed_index.rows", lambda: float(len(index._view or ())))
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _load(supabase: Any) -> Tuple[Any, Any]:
+    """Con `VECTOR_STORE_DIR`, mapea el store local y sólo baja filas nuevas."""
+    store = get_store(DEFAULT_EMBEDDING_MODEL)
+    if store is None:
+        return load_from_supabase(supabase)
+    try:
+        store.sync(supabase)
+    except Exception as e:
+        # Supabase caído: se publica lo que ya hay en disco
+        print("[embed_index] warning:", e)
+    return store.arrays()
+
+
+def _publish_loop() -> None:
+    from .supabase_client import get_client
+
+    while True:
+        try:
+            ids, matrix = _load(get_client())
+            index.publish(ids, matrix)
+        except Exception as e:
+            print("[embed_index] warning:", e)
+        refresh = env_float("EMBED_INDEX_REFRESH_S", 600.0)
+        if refresh <= 0 or _stop.wait(refresh):
+            return
+
+
+def start_index() -> bool:
+    """Si está habilitado, intenta ser el publicador y carga el índice en segundo plano.
+
+    Devuelve True si este proceso publica; los demás sólo lo mapean al consultarlo.
+    """
+    global _thread
+    name = env_str("EMBED_INDEX_NAME", "wav-embed") or "wav-embed"
+    if name != index.name and not index.is_publisher:
+        index._detach()
+        index.name = name
+    if not env_bool("EMBED_INDEX_ENABLED", False):
+        return False
+    if not index.try_become_publisher():
+        return False
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_publish_loop, name="embed-index", daemon=True)
+        _thread.start()
+    return True
+
+
+def stop_index() -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
+    index.close()
@@ -0,0 +1,197 @@
+"""Single-flight: llamadas idénticas concurrentes comparten un solo cómputo.
+
+    @single_flight("scheduler.trends", tags=("items",))
+    def trends(limit: int = 6) -> List[TrendItem]: ...
+
+La primera llamada con una clave (nombre + argumentos) ejecuta la función;
+las que llegan mientras está en vuelo esperan y reciben el mismo resultado
+(o la misma excepción). El resultado se conserva además `ttl` segundos
+(`SINGLEFLIGHT_TTL_S`, 0 = sólo coalescing en vuelo). Los resultados se
+comparten entre llamadas: no deben mutarse.
+
+Sobre una corrutina (`async def`) los seguidores esperan la task del líder
+sin bloquear el event loop; resultados y tags se comparten igual.
+
+`invalidate_tag("items")` descarta los resultados de todos los grupos que
+dependen de esa fuente (ej. tras insertar un item). Cada vuelo guarda la
+generación del grupo al arrancar: si una invalidación llega mientras está en
+vuelo, su resultado se entrega a quienes ya esperaban pero no se cachea, y
+las llamadas siguientes arrancan un vuelo nuevo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from ..config import env_float
+from .cache import TTLCache
+from .metrics import metrics
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, ttl: Optional[float] = None) -> None:
+        self.name = name
+        ttl_fn: Callable[[], float] = (
+            (lambda: float(ttl))
+            if ttl is not None
+            else (lambda: env_float("SINGLEFLIGHT_TTL_S", 0.0))
+        )
+        self._results = TTLCache(ttl=ttl_fn, maxsize=512)
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        hit = self._results.get(key, _MISS)
+        if hit is not _MISS:
+            metrics.inc(f"singleflight.{self.name}.cached")
+            return hit
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if call is None:
+                call = self._inflight[key] = _Call()
+            generation = self._generation
+        if not leader:
+            metrics.inc(f"singleflight.{self.name}.collapsed")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.inc(f"singleflight.{self.name}.executed")
+        try:
+            call.result = fn()
+            self._store(key, call.result, generation)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Como `do` para corrutinas; las tasks en vuelo son por event loop."""
+        hit = self._results.get(key, _MISS)
+        if hit is not _MISS:
+            metrics.inc(f"singleflight.{self.name}.cached")
+            return hit
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is not None:
+            metrics.inc(f"singleflight.{self.name}.collapsed")
+            return await asyncio.shield(task)
+
+        metrics.inc(f"singleflight.{self.name}.executed")
+        generation = self._generation
+        task = self._tasks[task_key] = asyncio.ensure_future(fn())
+
+        def done(t: asyncio.Future) -> None:
+            if self._tasks.get(task_key) is t:
+                del self._tasks[task_key]
+            if not t.cancelled() and t.exception() is None:
+                self._store(key, t.result(), generation)
+
+        task.add_done_callback(done)
+        # shield: si el líder se cancela (cliente desconectado) los seguidores siguen
+        return await asyncio.shield(task)
+
+    def _store(self, key: Hashable, result: Any, generation: int) -> None:
+        # Bajo el lock: una invalidación no puede colarse entre el chequeo y el set
+        with self._lock:
+            if generation == self._generation:
+                self._results.set(key, result)
+
+    def invalidate(self) -> None:
+        """Descarta el cache y desengancha los vuelos en curso (no se cachean)."""
+        with self._lock:
+            self._generation += 1
+            self._inflight.clear()
+            self._tasks.clear()
+            self._results.invalidate()
+
+
+_MISS = object()
+_groups: Dict[str, SingleFlight] = {}
+_tags: Dict[str, set] = {}
+
+
+def _key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+    def norm(value: Any) -> Any:
+        dump = getattr(value, "model_dump_json", None)  # modelos pydantic (payloads)
+        return dump() if callable(dump) else value
+
+    key = (tuple(norm(a) for a in args), tuple(sorted((k, norm(v)) for k, v in kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return repr(key)
+
+
+def single_flight(
+    name: Optional[str] = None, ttl: Optional[float] = None, tags: Iterable[str] = ()
+) -> Callable[[F], F]:
+    """Decorador: coalesce llamadas concurrentes idénticas y cachea `ttl` segundos."""
+
+    def decorator(fn: F) -> F:
+        group = _groups[name or fn.__qualname__] = SingleFlight(name or fn.__qualname__, ttl)
+        for tag in tags:
+            _tags.setdefault(tag, set()).add(group.name)
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                return await group.ado(_key(args, kwargs), lambda: fn(*args, **kwargs))
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return group.do(_key(args, kwargs), lambda: fn(*args, **kwargs))
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def invalidate(name: Optional[str] = None) -> None:
+    """Descarta los resultados cacheados de un grupo, o de todos si `name` es None."""
+    for group_name, group in list(_groups.items()):
+        if name is None or group_name == name:
+            group.invalidate()
+
+
+def invalidate_tag(tag: str) -> None:
+    for name in _tags.get(tag, ()):
+        invalidate(name)
@@ -1,33 +1,180 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from typing import Optional
+import weakref
+from typing import TYPE_CHECKING, Any, Optional, cast
 
-from dotenv import load_dotenv
-from supabase import Client, create_client
+from ..config import env_float, env_int, load_env
+from .circuit_breaker import CircuitBreaker
 
-_client: Optional[Client] = None
+if TYPE_CHECKING:  # pragma: no cover - sólo para tipado
+    from supabase import Client
 
+_client: Any = None  # _GuardedClient sobre supabase.Client
+# _AsyncGuardedClient por event loop (el pool de httpx queda atado al loop que lo creó)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
 
-def get_client() -> Client:
-    """Singleton del cliente de Supabase, inicializado con variables de entorno.
+# Un único breaker para todas las consultas PostgREST del proceso. Umbrales
+# leídos en cada uso: este módulo se importa antes de que main cargue `.env`.
+breaker = CircuitBreaker(
+    "supabase",
+    failure_threshold=lambda: env_int("SUPABASE_BREAKER_FAILURES", 5),
+    recovery_s=lambda: env_float("SUPABASE_BREAKER_RECOVERY_S", 30.0),
+    half_open_max=lambda: env_int("SUPABASE_BREAKER_HALF_OPEN_MAX", 1),
+)
+
+
+def _is_outage(error: Exception) -> bool:
+    """True si el error indica indisponibilidad (red, timeout, 5xx), no un error de la consulta.
 
-    Requiere SUPABASE_URL y SUPABASE_KEY en el entorno.
+    Los errores de PostgREST traen el SQLSTATE en `code`: las clases 5x
+    (recursos, timeout de statement, error de sistema) cuentan como caída;
+    el resto (columna inexistente, unique violation...) no abre el circuito.
     """
-    global _client
-    if _client is not None:
-        return _client
+    code = getattr(error, "code", None)
+    if code is None:
+        return True
+    return str(code).startswith("5")
+
+
+class _GuardedQuery:
+    """Envuelve un query builder: `execute()` pasa por el circuit breaker."""
+
+    __slots__ = ("_builder",)
+
+    def __init__(self, builder: Any) -> None:
+        self._builder = builder
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # Propiedades encadenables (ej. `.not_`) también devuelven builders
+            return type(self)(attr) if hasattr(attr, "execute") else attr
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            result = attr(*args, **kwargs)
+            # Los builders de postgrest son encadenables: seguir envolviendo
+            return type(self)(result) if hasattr(result, "execute") else result
+
+        return call
+
+    def execute(self) -> Any:
+        breaker.before_call()
+        try:
+            result = self._builder.execute()
+        except Exception as e:
+            if _is_outage(e):
+                breaker.record_failure(e)
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+
+class _AsyncGuardedQuery(_GuardedQuery):
+    """Igual que `_GuardedQuery` para los builders del cliente async: `await q.execute()`."""
+
+    __slots__ = ()
+
+    async def execute(self) -> Any:
+        breaker.before_call()
+        try:
+            result = await self._builder.execute()
+        except Exception as e:
+            if _is_outage(e):
+                breaker.record_failure(e)
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+
+class _GuardedClient:
+    """Proxy del cliente: `table()`/`from_()`/`rpc()` devuelven builders protegidos."""
+
+    _query = _GuardedQuery
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    def table(self, name: str) -> _GuardedQuery:
+        return self._query(self._client.table(name))
 
-    # Asegura carga de .env si es ejecución local
-    load_dotenv()
+    def from_(self, name: str) -> _GuardedQuery:
+        return self._query(self._client.from_(name))
+
+    def rpc(self, fn: str, params: Optional[dict] = None, **kwargs: Any) -> _GuardedQuery:
+        return self._query(self._client.rpc(fn, params or {}, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class _AsyncGuardedClient(_GuardedClient):
+    _query = _AsyncGuardedQuery
+
+
+def _credentials() -> tuple[str, str]:
+    # Asegura carga de .env si es ejecución local (no-op si ya se cargó)
+    load_env()
 
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     if not url or not key:
         raise RuntimeError("SUPABASE_URL o SUPABASE_KEY no configurados en el entorno")
+    return url, key
+
+
+def get_client() -> "Client":
+    """Singleton del cliente de Supabase, inicializado con variables de entorno.
+
+    Requiere SUPABASE_URL y SUPABASE_KEY en el entorno. El paquete `supabase`
+    se importa en la primera llamada para no penalizar el import de la app.
+    Con el circuito abierto lanza `CircuitOpenError` sin tocar la red.
+    """
+    global _client
+    if breaker.state == "open":
+        breaker.before_call()  # lanza CircuitOpenError y cuenta el rechazo
+    if _client is not None:
+        return cast("Client", _client)
 
+    url, key = _credentials()
     try:
-        _client = create_client(url, key)
-        return _client
+        from supabase import ClientOptions, create_client
+
+        options = ClientOptions(postgrest_client_timeout=env_float("SUPABASE_TIMEOUT_S", 10.0))
+        _client = _GuardedClient(create_client(url, key, options))
+        return cast("Client", _client)
     except Exception as e:
         raise RuntimeError(f"No se pudo inicializar el cliente de Supabase: {e}")
+
+
+async def get_async_client() -> Any:
+    """Cliente async de Supabase (`AsyncClient`) para el event loop actual.
+
+    Mismas variables de entorno, timeout y circuit breaker que `get_client()`,
+    pero `execute()` se espera con `await`: las consultas no ocupan hilos del
+    threadpool. Se crea uno por event loop.
+    """
+    if breaker.state == "open":
+        breaker.before_call()
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+
+    url, key = _credentials()
+    try:
+        from supabase import AsyncClientOptions, acreate_client
+
+        options = AsyncClientOptions(postgrest_client_timeout=env_float("SUPABASE_TIMEOUT_S", 10.0))
+        client = _AsyncGuardedClient(await acreate_client(url, key, options))
+    except Exception as e:
+        raise RuntimeError(f"No se pudo inicializar el cliente async de Supabase: {e}")
+    _async_clients[loop] = client
+    return client
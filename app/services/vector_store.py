@@ -0,0 +1,281 @@
+"""Vector store local en disco (memmap) para no re-descargar `item_embeddings`.
+
+Por modelo, en `VECTOR_STORE_DIR`:
+- `<modelo>.f32`  → matriz float32 cruda (n × dim), sólo se agrega al final
+- `<modelo>.ids`  → ids int64 (sidecar, misma posición que la fila)
+- `<modelo>.json` → `dim`, `count` y la marca de agua `(created_at, item_id)`
+
+Al arrancar, los archivos se mapean al instante (`numpy.memmap`) y `sync`
+sólo trae las filas posteriores a la marca de agua, paginando por keyset
+`(created_at, item_id)` (los inserts en bulk comparten `created_at`; ver
+`keyset.py`).
+`count` en el JSON es la fuente de verdad: bytes de más por un append
+interrumpido se truncan al abrir.
+
+Un item re-embebido se agrega de nuevo y gana la última fila. `check`
+compara los ids locales con Supabase y `compact` reescribe los archivos
+sin filas de items borrados ni duplicadas.
+
+El servidor (publicador del índice) y el CLI (`app.jobs.vector_store`) pueden
+abrir el mismo directorio: lecturas, appends y compactación toman un `flock`
+sobre `<modelo>.lock` y releen el JSON al entrar.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from ..config import env_int, env_str
+from .embedding_codec import decode_embedding_row
+from .embeddings import DEFAULT_EMBEDDING_MODEL
+from .keyset import KeysetScan
+from .lazy import LazyModule
+
+np: Any = LazyModule("numpy")
+
+
+def _empty() -> Tuple[Any, Any]:
+    return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+
+
+def _flock(path: Path) -> Optional[int]:
+    """fd con `flock` exclusivo sobre `path` (bloquea); None sin fcntl."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - sin flock (Windows): sólo el lock del proceso
+        return None
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+class LocalVectorStore:
+    def __init__(self, root: str | Path, model: str = DEFAULT_EMBEDDING_MODEL) -> None:
+        self.root = Path(root)
+        self.model = model
+        stem = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.vectors_path = self.root / f"{stem}.f32"
+        self.ids_path = self.root / f"{stem}.ids"
+        self.meta_path = self.root / f"{stem}.json"
+        self.lock_path = self.root / f"{stem}.lock"
+        self._lock = threading.RLock()
+        self._held = False  # flock tomado por este objeto (reentrante con el RLock)
+        self.meta: Dict[str, Any] = {"dim": 0, "count": 0, "watermark": None}
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.open()
+
+    # ---- archivos ----
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Lock del proceso + `flock` entre procesos; al entrar relee el JSON."""
+        with self._lock:
+            if self._held:
+                yield
+                return
+            fd = _flock(self.lock_path)
+            self._held = True
+            try:
+                self._load()
+                yield
+            finally:
+                self._held = False
+                if fd is not None:
+                    os.close(fd)  # libera el flock
+
+    def open(self) -> None:
+        """Lee el JSON y descarta bytes de un append interrumpido."""
+        with self._locked():
+            pass  # `_locked` ya releyó el JSON
+
+    def _load(self) -> None:
+        try:
+            meta = json.loads(self.meta_path.read_text())
+            if isinstance(meta, dict):
+                self.meta = {**self.meta, **meta}
+        except (OSError, ValueError):
+            pass
+        count, dim = int(self.meta["count"]), int(self.meta["dim"])
+        for path, size in ((self.ids_path, count * 8), (self.vectors_path, count * dim * 4)):
+            if path.exists() and path.stat().st_size > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+            elif size and (not path.exists() or path.stat().st_size < size):
+                # Archivos perdidos o cortados: se reconstruye desde cero
+                self._reset()
+                return
+
+    def _reset(self) -> None:
+        for path in (self.ids_path, self.vectors_path):
+            path.unlink(missing_ok=True)
+        self.meta = {"dim": 0, "count": 0, "watermark": None}
+        self._save_meta()
+
+    def _save_meta(self) -> None:
+        tmp = self.meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({**self.meta, "model": self.model}))
+        os.replace(tmp, self.meta_path)
+
+    @property
+    def count(self) -> int:
+        return int(self.meta["count"])
+
+    @property
+    def watermark(self) -> Optional[Tuple[str, int]]:
+        wm = self.meta.get("watermark")
+        return (str(wm[0]), int(wm[1])) if wm else None
+
+    def append(self, ids: Iterable[int], matrix: Any, watermark: Tuple[str, int]) -> int:
+        """Agrega filas al final y avanza la marca de agua (durable antes del JSON)."""
+        id_arr = np.asarray(list(ids), dtype=np.int64)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != id_arr.size:
+            raise ValueError("ids y matriz no coinciden")
+        with self._locked():
+            dim = int(self.meta["dim"]) or (int(matrix.shape[1]) if id_arr.size else 0)
+            if id_arr.size and matrix.shape[1] != dim:
+                raise ValueError(f"dimensión {matrix.shape[1]} distinta de la del store ({dim})")
+            for path, data in ((self.vectors_path, matrix), (self.ids_path, id_arr)):
+                with open(path, "ab") as f:
+                    f.write(data.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.meta.update(
+                dim=dim, count=self.count + int(id_arr.size), watermark=list(watermark)
+            )
+            self._save_meta()
+        return int(id_arr.size)
+
+    def arrays(self) -> Tuple[Any, Any]:
+        """(ids, matriz) mapeados en sólo lectura; con duplicados gana la última fila."""
+        with self._locked():
+            count, dim = self.count, int(self.meta["dim"])
+            if not count:
+                return _empty()
+            ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(count,))
+            matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+        _, last = np.unique(ids[::-1], return_index=True)
+        if last.size == count:
+            return ids, matrix
+        keep = np.sort(count - 1 - last)
+        return ids[keep], matrix[keep]
+
+    # ---- Supabase ----
+
+    def sync(self, supabase: Any, page_size: Optional[int] = None) -> int:
+        """Trae de Supabase sólo las filas posteriores a la marca de agua.
+
+        Toma el lock todo el recorrido: un `compact` concurrente espera.
+        """
+        page_size = page_size or env_int("VECTOR_STORE_PAGE_SIZE", 500)
+        with self._locked():
+            return self._sync(supabase, page_size)
+
+    def _sync(self, supabase: Any, page_size: int) -> int:
+        added = 0
+        scan = KeysetScan(
+            supabase,
+            "item_embeddings",
+            key=("created_at", "item_id"),
+            page_size=page_size,
+            where=lambda q: q.eq("model", self.model),
+            after=self.watermark,
+        )
+        for rows in scan.pages():
+            ids, vectors = [], []
+            dim = int(self.meta["dim"])
+            for row in rows:
+                try:
+                    vec = decode_embedding_row(row)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if dim and vec.size != dim:
+                    continue  # fila de otra dimensión (migración a medias)
+                dim = dim or int(vec.size)
+                ids.append(int(row["item_id"]))
+                vectors.append(vec)
+            last = (str(rows[-1]["created_at"]), int(rows[-1]["item_id"]))
+            matrix = np.stack(vectors) if vectors else np.zeros((0, dim or 1), np.float32)
+            added += self.append(ids, matrix, last)
+        return added
+
+    def remote_ids(self, supabase: Any, page_size: int = 1000) -> Set[int]:
+        # item_id puede repetirse (re-embebidos): saltarlos entre páginas no cambia el set
+        scan = KeysetScan(
+            supabase,
+            "item_embeddings",
+            columns="item_id",
+            key="item_id",
+            page_size=page_size,
+            where=lambda q: q.eq("model", self.model),
+        )
+        return {int(r["item_id"]) for r in scan.rows()}
+
+    def check(self, supabase: Any) -> Dict[str, Any]:
+        """Compara los ids locales con Supabase (items borrados o faltantes)."""
+        ids, _ = self.arrays()
+        local = {int(i) for i in ids}
+        remote = self.remote_ids(supabase)
+        missing, stale = sorted(remote - local), sorted(local - remote)
+        return {
+            "model": self.model,
+            "rows": self.count,
+            "local": len(local),
+            "remote": len(remote),
+            "missing": len(missing),
+            "stale": len(stale),
+            "duplicates": self.count - len(local),
+            "sample_missing": missing[:10],
+            "sample_stale": stale[:10],
+            "consistent": not missing and not stale,
+        }
+
+    def compact(self, supabase: Any = None) -> int:
+        """Reescribe los archivos sin duplicados y, con `supabase`, sin items borrados allá.
+
+        Los ids remotos se leen con el lock tomado: un `sync` concurrente no
+        puede agregar filas posteriores al snapshot (que se perderían, con la
+        marca de agua ya pasada) hasta que termine. Devuelve filas quitadas.
+        """
+        with self._locked():
+            keep = self.remote_ids(supabase) if supabase is not None else None
+            before = self.count
+            ids, matrix = self.arrays()
+            if keep is not None:
+                mask = np.isin(ids, np.fromiter(keep, dtype=np.int64, count=len(keep)))
+                ids, matrix = ids[mask], matrix[mask]
+            ids, matrix = np.array(ids), np.array(matrix)  # suelta el memmap antes de reemplazar
+            for path, data in ((self.vectors_path, matrix), (self.ids_path, ids)):
+                tmp = path.with_suffix(path.suffix + ".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(data.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+            self.meta["count"] = int(ids.size)
+            self._save_meta()
+            return before - int(ids.size)
+
+
+_stores: Dict[str, LocalVectorStore] = {}
+
+
+def get_store(model: str = DEFAULT_EMBEDDING_MODEL) -> Optional[LocalVectorStore]:
+    """Store del modelo si `VECTOR_STORE_DIR` está configurado; None si no."""
+    root = env_str("VECTOR_STORE_DIR")
+    if not root:
+        return None
+    store = _stores.get(model)
+    if store is None or store.root != Path(root):
+        store = _stores[model] = LocalVectorStore(root, model)
+    return store
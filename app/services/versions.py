@@ -0,0 +1,81 @@
+"""Versiones de datos en memoria para GET condicionales (ETag / 304).
+
+Cada fuente tiene un contador que se incrementa cuando este proceso la
+modifica (`bump("items")` al insertar, `bump("model_params:<cuenta>")` al
+actualizar pesos). El ETag combina:
+
+- un id de arranque (otro proceso o un reinicio nunca reutiliza un ETag),
+- las versiones de las fuentes,
+- los parámetros del request,
+- una ventana de `ETAG_MAX_STALENESS_S` segundos, que acota cuánto puede
+  quedar oculto un cambio hecho por otro proceso (cron, otra réplica).
+
+Así un `If-None-Match` vigente se responde con 304 sin consultar Supabase.
+`changed_at` da la hora (epoch) del último `bump`: el plan diario lo usa para
+descartar planes persistidos construidos antes de un cambio local.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+import uuid
+from typing import Dict
+
+from fastapi import Request
+
+from ..config import env_float
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_changed: Dict[str, float] = {}
+
+
+def bump(name: str) -> int:
+    with _lock:
+        _versions[name] = _versions.get(name, 0) + 1
+        _changed[name] = time.time()
+        return _versions[name]
+
+
+def current(name: str) -> int:
+    return _versions.get(name, 0)
+
+
+def changed_at(name: str) -> float:
+    """Epoch del último `bump(name)` en este proceso (0.0 si nunca cambió)."""
+    return _changed.get(name, 0.0)
+
+
+def etag_for(*names: str, params: str = "") -> str:
+    window = env_float("ETAG_MAX_STALENESS_S", 60.0)
+    bucket = int(time.time() // window) if window > 0 else 0
+    state = ".".join(f"{n}={current(n)}" for n in names)
+    digest = hashlib.blake2b(f"{state}|{params}|{bucket}".encode(), digest_size=8).hexdigest()
+    return f'W/"{BOOT_ID}-{digest}"'
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    max_age = int(env_float("HTTP_CACHE_MAX_AGE_S", 5.0))
+    return {"ETag": etag, "Cache-Control": f"private, max-age={max_age}, must-revalidate"}
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """True si `If-None-Match` incluye `etag` (comparación débil, RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in header.split(","))
+
+
+def reset() -> None:
+    """Vuelve los contadores a cero (tests)."""
+    with _lock:
+        _versions.clear()
+        _changed.clear()
@@ -0,0 +1,100 @@
+"""Pre-calentamiento del proceso y estado de readiness.
+
+Al arrancar, la app construye el cliente de Supabase (handshake TLS incluido)
+y luego ejecuta en paralelo los pasos registrados con `@warmup_step`
+(pesos por cuenta, ventana de items, índices en memoria...). `/ready` sólo
+responde 200 cuando la secuencia terminó, con o sin errores parciales: un
+Supabase caído no debe dejar la instancia fuera del balanceador, porque
+los endpoints ya tienen fallbacks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import env_float
+from .supabase_client import get_client
+
+# (nombre, fn(supabase)) en orden de registro
+WarmupFn = Callable[[Any], Any]
+_steps: List[Tuple[str, WarmupFn]] = []
+
+
+class WarmupState:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.ready = False
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": dict(self.steps),
+        }
+
+
+state = WarmupState()
+
+
+def warmup_step(name: str) -> Callable[[WarmupFn], WarmupFn]:
+    """Registra `fn(supabase)` como paso de warm-up (se ejecuta en un thread).
+
+    `supabase` es None si el cliente no pudo construirse; el paso decide si
+    tiene algo útil que hacer sin él.
+    """
+
+    def decorator(fn: WarmupFn) -> WarmupFn:
+        _steps[:] = [(n, f) for n, f in _steps if n != name] + [(name, fn)]
+        return fn
+
+    return decorator
+
+
+async def _run_step(name: str, fn: Callable[[], Any]) -> Any:
+    t0 = time.perf_counter()
+    try:
+        result = await asyncio.to_thread(fn)
+        state.steps[name] = {"status": "ok", "ms": round((time.perf_counter() - t0) * 1000, 1)}
+        return result
+    except Exception as e:
+        state.steps[name] = {
+            "status": "error",
+            "ms": round((time.perf_counter() - t0) * 1000, 1),
+            "detail": str(e),
+        }
+        return None
+
+
+async def run_warmup() -> None:
+    """Ejecuta el warm-up completo y marca el proceso como listo al terminar."""
+    state.started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        await asyncio.wait_for(_run_all(), timeout=env_float("WARMUP_TIMEOUT_S", 20.0))
+    except asyncio.TimeoutError:
+        state.steps["timeout"] = {"status": "error", "detail": "warm-up excedió WARMUP_TIMEOUT_S"}
+    finally:
+        state.finished_at = datetime.now(timezone.utc).isoformat()
+        state.ready = True
+
+
+async def _run_all() -> None:
+    supabase = await _run_step("supabase_client", get_client)
+    await asyncio.gather(*(_run_step(name, _bind(fn, supabase)) for name, fn in _steps))
+
+
+def _bind(fn: WarmupFn, supabase: Any) -> Callable[[], Any]:
+    return lambda: fn(supabase)
+
+
+def reset() -> None:
+    """Vuelve al estado inicial (tests)."""
+    state.reset()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Prueba de carga: routers sync (threadpool) vs async (`ASYNC_ROUTERS`).
+
+Uso:
+    python benchmarks/async_concurrency.py [--requests 400] [--latency-ms 100]
+
+Lanza N peticiones concurrentes a `GET /semantic/embed_status/{id}` vía
+`httpx.ASGITransport` (sin red), con un Supabase simulado cuya consulta tarda
+`latency-ms`. Los endpoints sync quedan acotados por el threadpool de anyio
+(40 hilos): a lo sumo 40 consultas en vuelo. Los async no tienen ese techo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, FastAPI  # noqa: E402
+
+
+class _SlowSupabase:
+    def __init__(self, latency_s: float, sync: bool) -> None:
+        self.latency_s = latency_s
+        self.sync = sync
+        self.inflight = self.peak = 0
+        self._lock = threading.Lock()
+
+    def _track(self, delta: int) -> None:
+        with self._lock:
+            self.inflight += delta
+            self.peak = max(self.peak, self.inflight)
+
+    def table(self, name: str) -> Any:
+        db = self
+
+        class Query:
+            def __getattr__(self, _: str) -> Callable[..., "Query"]:
+                return lambda *a, **k: self
+
+            def execute(self) -> Any:
+                result = type("R", (), {"data": [{"item_id": "1", "model": "m"}]})
+                if not db.sync:
+                    return self._aexecute(result)
+                db._track(1)
+                time.sleep(db.latency_s)
+                db._track(-1)
+                return result
+
+            async def _aexecute(self, result: Any) -> Any:
+                db._track(1)
+                await asyncio.sleep(db.latency_s)
+                db._track(-1)
+                return result
+
+        return Query()
+
+
+async def _burst(router: APIRouter, n: int) -> float:
+    app = FastAPI()
+    app.include_router(router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get(f"/semantic/embed_status/{i}") for i in range(n))
+        )
+        elapsed = time.perf_counter() - t0
+    assert all(r.status_code == 200 for r in responses)
+    return elapsed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--latency-ms", type=float, default=100.0)
+    args = ap.parse_args()
+
+    import app.routers.semantic as semantic
+    import app.routers.semantic_async as semantic_async
+
+    semantic.get_queue = lambda: None  # type: ignore[assignment]
+    semantic_async.get_queue = lambda: None  # type: ignore[assignment]
+
+    latency = args.latency_ms / 1000
+    rows: List[Dict[str, Any]] = []
+    for name, router, sync in (
+        ("sync (threadpool)", semantic.router, True),
+        ("async", semantic_async.router, False),
+    ):
+        fake = _SlowSupabase(latency, sync)
+
+        async def async_client(fake: _SlowSupabase = fake) -> _SlowSupabase:
+            return fake
+
+        semantic.get_client = lambda fake=fake: fake  # type: ignore[assignment]
+        semantic_async.get_async_client = async_client  # type: ignore[assignment]
+        elapsed = asyncio.run(_burst(router, args.requests))
+        rows.append({"name": name, "elapsed": elapsed, "peak": fake.peak})
+
+    print(f"requests={args.requests} latency={args.latency_ms:.0f}ms\n")
+    print("| router            | en vuelo (máx) | total (s) |  req/s |")
+    print("|-------------------|---------------:|----------:|-------:|")
+    for row in rows:
+        rps = args.requests / row["elapsed"]
+        print(f"| {row['name']:<17} | {row['peak']:>14} | {row['elapsed']:>9.2f} | {rps:>6.0f} |")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Reporte recall vs memoria para float32, float16 e int8.
+
+Uso:
+    python benchmarks/embedding_recall.py [--n 5000] [--dims 1536] [--queries 200] [--k 10]
+
+Genera un corpus sintético con clusters (similar en estructura a embeddings
+reales de temas cercanos), calcula el top-k exacto en float32 y mide cuánto
+se recupera usando cada representación compacta de `app.services.embedding_codec`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.embedding_codec import (  # noqa: E402
+    dequantize_int8,
+    quantize_int8,
+    to_pgvector_literal,
+)
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return (m / np.linalg.norm(m, axis=1, keepdims=True)).astype(np.float32)
+
+
+def sample_corpus(n: int, dims: int, queries: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((max(8, n // 100), dims)).astype(np.float32)
+    labels = rng.integers(0, len(centroids), n)
+    corpus = _normalize(centroids[labels] + 0.6 * rng.standard_normal((n, dims)))
+    q_labels = rng.integers(0, len(centroids), queries)
+    qs = _normalize(centroids[q_labels] + 0.6 * rng.standard_normal((queries, dims)))
+    return corpus, qs
+
+
+def top_k(corpus: np.ndarray, qs: np.ndarray, k: int) -> np.ndarray:
+    scores = qs @ corpus.T
+    idx = np.argpartition(-scores, k, axis=1)[:, :k]
+    return idx
+
+
+def recall(exact: np.ndarray, approx: np.ndarray) -> float:
+    hits = sum(len(set(a) & set(b)) for a, b in zip(exact, approx))
+    return hits / exact.size
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=5000)
+    ap.add_argument("--dims", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    corpus, qs = sample_corpus(args.n, args.dims, args.queries, args.seed)
+    exact = top_k(corpus, qs, args.k)
+
+    half = corpus.astype(np.float16).astype(np.float32)
+    quant = [quantize_int8(v) for v in corpus]
+    int8 = np.stack([dequantize_int8(q, s) for q, s in quant])
+
+    # Lista de floats de Python: objeto float (24 B) + puntero en la lista (8 B)
+    py_list_bytes = args.dims * (24 + 8) + 56
+    rows = [
+        ("list[float]", py_list_bytes, 1.0, len(str(corpus[0].tolist()))),
+        ("float32", 4 * args.dims, 1.0, len(to_pgvector_literal(corpus[0]))),
+        (
+            "float16",
+            2 * args.dims,
+            recall(exact, top_k(half, qs, args.k)),
+            len(to_pgvector_literal(half[0])),
+        ),
+        (
+            "int8",
+            args.dims + 4,
+            recall(exact, top_k(int8, qs, args.k)),
+            len(quant[0][0].tobytes().hex()) + 2,
+        ),
+    ]
+
+    print(f"corpus={args.n} dims={args.dims} queries={args.queries} k={args.k}\n")
+    print(f"| formato     | bytes/vector | MB corpus | recall@{args.k} | payload (chars) |")
+    print("|-------------|-------------:|----------:|----------:|----------------:|")
+    for name, nbytes, rec, payload in rows:
+        mb = nbytes * args.n / 1e6
+        print(f"| {name:<11} | {nbytes:>12} | {mb:>9.1f} | {rec:>9.3f} | {payload:>15} |")
+
+    t0 = time.perf_counter()
+    for v in corpus[:1000]:
+        to_pgvector_literal(v)
+    per = (time.perf_counter() - t0) / min(1000, len(corpus)) * 1e6
+    print(f"\nserialización to_pgvector_literal: {per:.1f} µs/vector")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
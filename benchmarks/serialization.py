@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark antes/después del camino JSON rápido (`FAST_JSON`).
+
+Uso:
+    python benchmarks/serialization.py [--accounts 50] [--iterations 30]
+
+Mide, con un Supabase simulado en memoria (sin red):
+- `POST /scheduler/run_daily` con N cuentas (respuesta anidada grande).
+- `POST /semantic/embed_item` (payload de 1536 floats hacia PostgREST).
+- Serialización aislada de un embedding: `json.dumps(list)` vs literal orjson.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.daily_runs import forget_runs  # noqa: E402
+from app.services.embedding_codec import to_pgvector_literal  # noqa: E402
+
+
+class _MemorySupabase:
+    def table(self, name: str) -> Any:
+        class Query:
+            def __getattr__(self, _: str) -> Callable[..., "Query"]:
+                return lambda *a, **k: self
+
+            def insert(self, row: Dict[str, Any], **_: Any) -> "Query":
+                json.dumps(row)  # el encoder de httpx/postgrest es el stdlib
+                return self
+
+            def execute(self) -> Any:
+                return type("R", (), {"data": [{"id": 1}] if name == "items" else []})
+
+        return Query()
+
+
+def _timeit(fn: Callable[[], Any], iterations: int) -> float:
+    fn()  # warm-up
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--accounts", type=int, default=50)
+    ap.add_argument("--iterations", type=int, default=30)
+    args = ap.parse_args()
+
+    import app.routers.scheduler_ai as scheduler_ai
+    import app.routers.semantic as semantic
+
+    fake = _MemorySupabase()
+    scheduler_ai.get_client = lambda: fake  # type: ignore[assignment]
+    semantic.get_client = lambda: fake  # type: ignore[assignment]
+    os.environ.pop("OPENAI_API_KEY", None)
+
+    client = TestClient(app)
+    run_payload = {"accounts": [f"acc{i}" for i in range(args.accounts)], "force": True}
+    embed_payload = {"title": "IA generativa en marketing", "summary": "resumen " * 40}
+
+    def run_daily() -> None:
+        forget_runs()
+        assert client.post("/scheduler/run_daily", json=run_payload).status_code == 200
+
+    def embed_item() -> None:
+        assert client.post("/semantic/embed_item", json=embed_payload).status_code == 200
+
+    rows: List[tuple[str, float, float]] = []
+    for name, fn in (("run_daily", run_daily), ("embed_item", embed_item)):
+        os.environ["FAST_JSON"] = "0"
+        before = _timeit(fn, args.iterations)
+        os.environ["FAST_JSON"] = "1"
+        after = _timeit(fn, args.iterations)
+        rows.append((name, before, after))
+
+    vec = np.random.default_rng(0).standard_normal(1536).astype(np.float32)
+    as_list = vec.tolist()
+    n = 2000
+    rows.append(
+        (
+            "embedding payload x2000",
+            _timeit(lambda: [json.dumps(as_list) for _ in range(n)], 3),
+            _timeit(lambda: [to_pgvector_literal(vec) for _ in range(n)], 3),
+        )
+    )
+
+    print(f"accounts={args.accounts} iterations={args.iterations} (mediana, ms)\n")
+    print("| caso                     | stdlib / validación | FAST_JSON | speedup |")
+    print("|--------------------------|--------------------:|----------:|--------:|")
+    for name, before, after in rows:
+        print(f"| {name:<24} | {before:>19.2f} | {after:>9.2f} | {before / after:>6.2f}x |")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,8 @@ create table if not exists public.items (
 
 -- 3) Embeddings por item
 -- Ajusta el tamaño del vector si usas otro modelo (ej: 1536 para text-embedding-3-small)
+-- o si configuras EMBEDDING_DIMENSIONS (ej: 512); para tablas existentes usa
+-- src/sql/ops/migrate_embedding_dimensions.sql.
 create table if not exists public.item_embeddings (
   item_id bigint not null references public.items(id) on delete cascade,
   embedding vector(1536) not null,
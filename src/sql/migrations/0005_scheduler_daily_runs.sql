@@ -0,0 +1,10 @@
+-- WAV Automata: registro idempotente de run_daily por (cuenta, fecha local)
+
+create table if not exists public.scheduler_daily_runs (
+  account text not null,
+  run_date date not null,
+  item_id text,
+  result jsonb not null,
+  created_at timestamptz default now(),
+  primary key (account, run_date)
+);
@@ -0,0 +1,28 @@
+-- WAV Automata: almacenamiento compacto de embeddings (requiere pgvector >= 0.7)
+-- Se elige en la app con EMBEDDING_STORAGE=vector|halfvec|int8.
+
+-- 1) La columna float32 original deja de ser obligatoria
+alter table public.item_embeddings alter column embedding drop not null;
+
+-- 2) float16: mitad de espacio, indexable por pgvector
+--    (1536 = EMBEDDING_DIMENSIONS; ver ops/migrate_embedding_dimensions.sql)
+alter table public.item_embeddings add column if not exists embedding_half halfvec(1536);
+
+-- 3) int8 cuantizado por vector (x ≈ q * scale); sólo almacenamiento / re-ranking local
+alter table public.item_embeddings add column if not exists embedding_q bytea;
+alter table public.item_embeddings add column if not exists embedding_scale real;
+
+-- Cada fila debe traer al menos una representación
+alter table public.item_embeddings drop constraint if exists item_embeddings_has_vector;
+alter table public.item_embeddings add constraint item_embeddings_has_vector
+  check (embedding is not null or embedding_half is not null or embedding_q is not null);
+
+-- 4) Índice HNSW sobre halfvec (similitud coseno)
+create index if not exists item_embeddings_embedding_half_hnsw
+  on public.item_embeddings using hnsw (embedding_half halfvec_cosine_ops);
+
+-- 5) (Opcional) Migrar filas existentes a halfvec y liberar la columna float32
+-- update public.item_embeddings
+--   set embedding_half = embedding::halfvec(1536)
+--   where embedding_half is null and embedding is not null;
+-- update public.item_embeddings set embedding = null where embedding_half is not null;
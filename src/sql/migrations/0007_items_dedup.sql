@@ -0,0 +1,10 @@
+-- WAV Automata: enlace de casi duplicados al item canónico (DEDUP_POLICY=link)
+
+alter table public.items
+  add column if not exists canonical_item_id bigint
+  references public.items(id) on delete set null;
+
+-- Sólo los duplicados tienen valor: índice parcial, liviano
+create index if not exists items_canonical_item_id_idx
+  on public.items (canonical_item_id)
+  where canonical_item_id is not null;
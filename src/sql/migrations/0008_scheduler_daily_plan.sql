@@ -0,0 +1,10 @@
+-- WAV Automata: plan diario materializado de next_post por (cuenta, fecha local)
+-- hours: 24 recomendaciones (índice = hora local desde la que se busca el slot)
+
+create table if not exists public.scheduler_daily_plan (
+  account text not null,
+  plan_date date not null,
+  hours jsonb not null,
+  built_at timestamptz not null default now(),
+  primary key (account, plan_date)
+);
@@ -0,0 +1,30 @@
+-- WAV Automata: índices para las consultas calientes de los routers
+-- (verificables con `python3 verify_supabase.py --plans` contra un Postgres local).
+-- En tablas grandes ya pobladas, cada `create index` puede correrse a mano con
+-- `concurrently` (fuera de una transacción) para no bloquear escrituras.
+
+-- items: ventana de recientes, trends y reconstrucción de dedup recorren
+-- `order by created_at desc, id desc` (keyset compuesto)
+create index if not exists items_created_at_id_idx
+  on public.items (created_at desc, id desc);
+
+-- posts_feedback: matriz de engagement de next_post / heatmap por cuenta, en keyset
+-- (posted_at desc, id desc). INCLUDE con las columnas que lee la matriz → index-only scan
+create index if not exists posts_feedback_account_posted_at_idx
+  on public.posts_feedback (account, posted_at desc, id desc)
+  include (likes, comments, saves, followers, content_type);
+
+-- El índice sólo por account queda cubierto por el prefijo del compuesto
+drop index if exists public.posts_feedback_account_idx;
+
+-- item_embeddings no tiene PK: embed_status y backfill buscan por item_id
+-- (también acelera el `on delete cascade` desde items)
+create index if not exists item_embeddings_item_id_idx
+  on public.item_embeddings (item_id);
+
+-- Índice compartido (`model = ? order by item_id desc`) y sync incremental del
+-- vector store (`model = ? order by created_at, item_id`)
+create index if not exists item_embeddings_model_item_id_idx
+  on public.item_embeddings (model, item_id);
+create index if not exists item_embeddings_model_created_at_idx
+  on public.item_embeddings (model, created_at, item_id);
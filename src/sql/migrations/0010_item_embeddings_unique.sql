@@ -0,0 +1,18 @@
+-- WAV Automata: un embedding por (item, modelo).
+-- La cola, el backfill y /insert_item escriben con
+-- `upsert(on_conflict="item_id,model", ignore_duplicates=True)`, que necesita
+-- una restricción única para resolver el conflicto.
+
+-- Duplicados previos (carreras cola/backfill): queda la fila más antigua,
+-- la que el vector store ya sincronizó
+delete from public.item_embeddings a
+  using public.item_embeddings b
+  where a.item_id = b.item_id
+    and a.model = b.model
+    and (a.created_at, a.ctid) > (b.created_at, b.ctid);
+
+create unique index if not exists item_embeddings_item_id_model_key
+  on public.item_embeddings (item_id, model);
+
+-- El índice sólo por item_id queda cubierto por el prefijo del único
+drop index if exists public.item_embeddings_item_id_idx;
@@ -0,0 +1,53 @@
+-- WAV Automata: migra item_embeddings a embeddings de dimensión reducida
+-- Script manual, fuera de migrations/: depende de la dimensión elegida por despliegue.
+-- (requiere pgvector >= 0.7 por subvector / l2_normalize).
+--
+-- 1) Configura la app: EMBEDDING_DIMENSIONS=512 (o EMBEDDING_DIMENSIONS_BY_MODEL).
+-- 2) Reemplaza 512 abajo por la misma dimensión y ejecuta el script.
+--
+-- Las filas existentes se truncan al prefijo y se renormalizan (L2), que es
+-- exactamente lo que hace text-embedding-3-* con el parámetro `dimensions`:
+-- no hace falta volver a llamar al proveedor.
+
+begin;
+
+-- Los índices vectoriales dependen del tipo de la columna
+drop index if exists public.item_embeddings_embedding_ivfflat;
+drop index if exists public.item_embeddings_embedding_hnsw;
+drop index if exists public.item_embeddings_embedding_half_hnsw;
+
+alter table public.item_embeddings
+  alter column embedding type vector(512)
+  using case
+    when embedding is null then null
+    else l2_normalize(subvector(embedding, 1, 512))::vector(512)
+  end;
+
+do $$
+begin
+  -- halfvec / int8 (sólo si se aplicó migrations/0006_schema_embeddings_compact.sql)
+  if exists (
+    select 1 from information_schema.columns
+    where table_schema = 'public' and table_name = 'item_embeddings'
+      and column_name = 'embedding_half'
+  ) then
+    alter table public.item_embeddings
+      alter column embedding_half type halfvec(512)
+      using case
+        when embedding_half is null then null
+        else l2_normalize(subvector(embedding_half, 1, 512))::halfvec(512)
+      end;
+    -- int8: el prefijo cuantizado conserva la escala; coseno es invariante a la norma
+    update public.item_embeddings
+      set embedding_q = substring(embedding_q from 1 for 512)
+      where embedding_q is not null and length(embedding_q) > 512;
+    create index if not exists item_embeddings_embedding_half_hnsw
+      on public.item_embeddings using hnsw (embedding_half halfvec_cosine_ops);
+  end if;
+end $$;
+
+-- HNSW no necesita re-entrenar `lists` al crecer la tabla (a diferencia de IVFFLAT)
+create index if not exists item_embeddings_embedding_hnsw
+  on public.item_embeddings using hnsw (embedding vector_cosine_ops);
+
+commit;
@@ -0,0 +1,371 @@
+"""Supabase en memoria compartido por los tests.
+
+    def test_x(supabase: Any) -> None:
+        db = supabase({"items": [{"id": 1, "title": "IA"}]})   # parchea `get_client`
+        ...
+        assert db.reads["items"] == 1
+
+`FakeSupabase` implementa el subconjunto del query builder de postgrest-py
+que usa la app (`select/eq/in_/gt/gte/lt/lte/or_/order/limit/insert/upsert/
+update/delete/execute`) sobre listas de dicts por tabla, y registra lecturas,
+escrituras y páginas para que los tests verifiquen cuántas consultas hubo, y la
+forma de cada select (`selects`: tabla, columnas filtradas, `order`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+import pytest
+
+from app.services import supabase_client
+
+# Clave de `upsert` sin `on_conflict` (primary key en src/sql/migrations); con `id`
+# los inserts sin id reciben el siguiente
+PRIMARY_KEYS: Dict[str, Tuple[str, ...]] = {
+    "scheduler_model_params": ("account",),
+    "scheduler_daily_runs": ("account", "run_date"),
+    "scheduler_daily_plan": ("account", "plan_date"),
+    "item_embeddings": ("item_id", "model"),
+}
+_OR_TERM = re.compile(r'(\w+)\.(not\.)?(eq|neq|gt|gte|lt|lte|is)\.("(?:[^"]*)"|[^,()]*)$')
+_OR_COLUMN = re.compile(r"(\w+)\.(?:not\.)?(?:eq|neq|gt|gte|lt|lte|is)\.")
+
+Row = Dict[str, Any]
+Filter = Callable[[Row], bool]
+
+
+class Select(NamedTuple):
+    """Forma de una lectura: tabla, columnas filtradas y `order` (columna, desc)."""
+
+    table: str
+    filters: FrozenSet[str]
+    order: Tuple[Tuple[str, bool], ...]
+
+
+def _comparable(value: Any, other: Any) -> Tuple[Any, Any]:
+    """`item_id` llega como str desde el path y como int en la fila: compara como str."""
+    if type(value) is not type(other) and (isinstance(value, str) or isinstance(other, str)):
+        return str(value), str(other)
+    return value, other
+
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def _where(col: str, op: str, val: Any) -> Filter:
+    def match(row: Row) -> bool:
+        cell = row.get(col)
+        if cell is None:
+            return False
+        return _OPS[op](*_comparable(cell, val))
+
+    return match
+
+
+def _split(expr: str) -> List[str]:
+    """Separa `a,and(b,c),d` por las comas de primer nivel."""
+    out, depth, cur = [], 0, ""
+    for ch in expr:
+        if ch == "," and depth == 0:
+            out.append(cur)
+            cur = ""
+            continue
+        depth += (ch == "(") - (ch == ")")
+        cur += ch
+    return out + [cur]
+
+
+def _parse_or(expr: str) -> Filter:
+    """Filtro de `or_("a.lt.X,and(a.eq.X,b.lt.Y)")` (el keyset compuesto de KeysetScan)."""
+
+    def term(t: str) -> Filter:
+        if t.startswith(("and(", "or(")):
+            inner = [term(x) for x in _split(t[t.index("(") + 1 : -1])]
+            combine = all if t.startswith("and(") else any
+            return lambda r: combine(f(r) for f in inner)
+        m = _OR_TERM.match(t)
+        assert m, f"filtro or_ no soportado: {t}"
+        col, negate, op, raw = m.groups()
+        raw = raw[1:-1] if raw.startswith('"') else raw
+        if op == "is":
+            assert raw == "null", f"filtro or_ no soportado: {t}"
+            return lambda r: (r.get(col) is None) != bool(negate)
+        assert not negate, f"filtro or_ no soportado: {t}"
+        return lambda r: (
+            r.get(col) is not None
+            and _OPS[op](r[col], type(r[col])(raw) if isinstance(r[col], (int, float)) else raw)
+        )
+
+    parts = [term(t) for t in _split(expr)]
+    return lambda r: any(f(r) for f in parts)
+
+
+class Result:
+    def __init__(self, data: List[Row], count: Optional[int] = None) -> None:
+        self.data = data
+        self.count = count
+
+
+class Query:
+    def __init__(self, db: "FakeSupabase", name: str) -> None:
+        self.db = db
+        self.name = name
+        self._op = "select"
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        self._filters: List[Filter] = []
+        self._filter_cols: List[str] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._offset = 0
+        self._limit: Optional[int] = None
+        self._count = False
+
+    # --- lectura -----------------------------------------------------------
+
+    def select(self, *_: Any, count: Optional[str] = None, **__: Any) -> "Query":
+        self._count = count is not None
+        return self
+
+    def eq(self, col: str, val: Any) -> "Query":
+        return self._add(_where(col, "eq", val), col)
+
+    def neq(self, col: str, val: Any) -> "Query":
+        return self._add(_where(col, "neq", val), col)
+
+    def gt(self, col: str, val: Any) -> "Query":
+        return self._add(_where(col, "gt", val), col)
+
+    def gte(self, col: str, val: Any) -> "Query":
+        return self._add(_where(col, "gte", val), col)
+
+    def lt(self, col: str, val: Any) -> "Query":
+        return self._add(_where(col, "lt", val), col)
+
+    def lte(self, col: str, val: Any) -> "Query":
+        return self._add(_where(col, "lte", val), col)
+
+    def in_(self, col: str, vals: Sequence[Any]) -> "Query":
+        return self._add(lambda r: any(_where(col, "eq", v)(r) for v in vals), col)
+
+    def or_(self, expr: str) -> "Query":
+        return self._add(_parse_or(expr), *_OR_COLUMN.findall(expr))
+
+    def order(self, col: str, desc: bool = False, **_: Any) -> "Query":
+        self._order.append((col, desc))
+        return self
+
+    def limit(self, n: int, **_: Any) -> "Query":
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int) -> "Query":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def _add(self, f: Filter, *cols: str) -> "Query":
+        self._filters.append(f)
+        self._filter_cols.extend(cols)
+        return self
+
+    # --- escritura ---------------------------------------------------------
+
+    def insert(self, rows: Any, **_: Any) -> "Query":
+        return self._write("insert", rows)
+
+    def upsert(
+        self, rows: Any, on_conflict: str = "", ignore_duplicates: bool = False, **_: Any
+    ) -> "Query":
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self._write("upsert", rows)
+
+    def update(self, values: Row, **_: Any) -> "Query":
+        return self._write("update", values)
+
+    def delete(self, **_: Any) -> "Query":
+        return self._write("delete", None)
+
+    def _write(self, op: str, payload: Any) -> "Query":
+        self._op, self._payload = op, payload
+        return self
+
+    # --- ejecución ---------------------------------------------------------
+
+    def execute(self) -> Any:
+        if self.db.asynchronous:
+            return self._aexecute()
+        self.db._enter()
+        try:
+            if self.db.delay:
+                time.sleep(self.db.delay)
+        finally:
+            self.db._leave()
+        return self._run()
+
+    async def _aexecute(self) -> Result:
+        self.db._enter()
+        try:
+            if self.db.delay:
+                await asyncio.sleep(self.db.delay)
+        finally:
+            self.db._leave()
+        return self._run()
+
+    def _run(self) -> Result:
+        db, name = self.db, self.name
+        with db.lock:
+            db.calls.append(f"{self._op}:{name}")
+            if db.error is not None:
+                raise db.error
+            if self._op == "select":
+                return self._select()
+            db.writes[name] = db.writes.get(name, 0) + 1
+            table = db.tables.setdefault(name, [])
+            if self._op in ("update", "delete"):
+                hit = [r for r in table if all(f(r) for f in self._filters)]
+                if self._op == "delete":
+                    table[:] = [r for r in table if not any(r is h for h in hit)]
+                else:
+                    for r in hit:
+                        r.update(self._payload)
+                return Result(hit)
+            rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            rows = [dict(r) for r in rows]
+            if db.on_write is not None:
+                db.on_write(name, rows)
+            if self._op == "upsert":
+                return Result([self._upsert(table, r) for r in rows])
+            key = PRIMARY_KEYS.get(name, ("id",))
+            for r in rows:
+                if key == ("id",) and "id" not in r:
+                    r["id"] = max((int(x.get("id") or 0) for x in table), default=0) + 1
+                table.append(r)
+            return Result(rows)
+
+    def _upsert(self, table: List[Row], row: Row) -> Row:
+        key = tuple(self._on_conflict.split(",")) if self._on_conflict else None
+        key = key or PRIMARY_KEYS.get(self.name, ("id",))
+        for existing in table:
+            if all(existing.get(k) == row.get(k) for k in key):
+                if not self._ignore_duplicates:
+                    existing.update(row)
+                return existing
+        table.append(row)
+        return row
+
+    def _select(self) -> Result:
+        db = self.db
+        rows = [r for r in db.tables.get(self.name, []) if all(f(r) for f in self._filters)]
+        for col, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        total = len(rows)
+        end = None if self._limit is None else self._offset + self._limit
+        rows = rows[self._offset : end]
+        db.reads[self.name] = db.reads.get(self.name, 0) + 1
+        db.pages.append(len(rows))
+        db.selects.append(Select(self.name, frozenset(self._filter_cols), tuple(self._order)))
+        return Result([dict(r) for r in rows], total if self._count else None)
+
+
+class FakeSupabase:
+    """Tablas en memoria (`tables`) con contadores de lecturas/escrituras.
+
+    `delay` simula latencia por consulta; con `asynchronous=True` `execute()`
+    devuelve una corrutina (cliente async) y `peak` mide consultas en vuelo.
+    `error` hace fallar toda consulta; `on_write(tabla, filas)` puede lanzar
+    para rechazar una escritura puntual.
+    """
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Row]]] = None,
+        delay: float = 0.0,
+        asynchronous: bool = False,
+    ) -> None:
+        self.tables: Dict[str, List[Row]] = tables if tables is not None else {}
+        self.delay = delay
+        self.asynchronous = asynchronous
+        self.error: Optional[BaseException] = None
+        self.on_write: Optional[Callable[[str, List[Row]], None]] = None
+        self.reads: Dict[str, int] = {}
+        self.writes: Dict[str, int] = {}
+        self.calls: List[str] = []
+        self.pages: List[int] = []  # filas devueltas por cada lectura
+        self.selects: List[Select] = []  # forma de cada lectura, en orden
+        self.inflight = self.peak = 0
+        self.lock = threading.RLock()
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    @property
+    def queries(self) -> int:
+        return sum(self.reads.values())
+
+    def _enter(self) -> None:
+        with self.lock:
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+
+    def _leave(self) -> None:
+        with self.lock:
+            self.inflight -= 1
+
+
+def _app_modules(attr: str, original: Any) -> List[Any]:
+    return [
+        mod
+        for name, mod in list(sys.modules.items())
+        if name.startswith("app.") and getattr(mod, attr, None) is original
+    ]
+
+
+@pytest.fixture
+def supabase(monkeypatch: pytest.MonkeyPatch) -> Callable[..., FakeSupabase]:
+    """Fábrica de `FakeSupabase` que la instala como `get_client` (o `get_async_client`).
+
+    Parchea todos los módulos de `app` que importaron la función; otro `supabase(...)`
+    en el mismo test reemplaza al anterior. `patch=False` sólo crea el cliente.
+    """
+    get_client = supabase_client.get_client
+    get_async_client = supabase_client.get_async_client
+    sync_mods = _app_modules("get_client", get_client)
+    async_mods = _app_modules("get_async_client", get_async_client)
+
+    def install(
+        tables: Optional[Dict[str, List[Row]]] = None,
+        delay: float = 0.0,
+        asynchronous: bool = False,
+        patch: bool = True,
+    ) -> FakeSupabase:
+        db = FakeSupabase(tables, delay=delay, asynchronous=asynchronous)
+        if not patch:
+            return db
+        if asynchronous:
+
+            async def client() -> FakeSupabase:
+                return db
+
+            for mod in async_mods:
+                monkeypatch.setattr(mod, "get_async_client", client)
+        else:
+            for mod in sync_mods:
+                monkeypatch.setattr(mod, "get_client", lambda: db)
+        return db
+
+    return install
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+import app.routers.scheduler_ai as scheduler_ai
+import app.routers.scheduler_async as scheduler_async
+import app.routers.semantic as semantic
+import app.routers.semantic_async as semantic_async
+from app.services import scheduler_core
+from app.services.daily_plan import plan
+from app.services.engagement_matrix import forget_matrices
+from app.services.recent_items import invalidate_recent_items
+
+THREADPOOL_LIMIT = 40  # tokens por defecto del threadpool de anyio/Starlette
+
+
+def _app(*routers: APIRouter) -> FastAPI:
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router)
+    return app
+
+
+def _feedback(account: str, content_type: str, likes: int) -> Dict[str, Any]:
+    posted = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+    return {
+        "account": account,
+        "likes": likes,
+        "comments": 0,
+        "saves": 0,
+        "followers": 100,
+        "content_type": content_type,
+        "posted_at": posted.isoformat(),
+    }
+
+
+def _tables(accounts: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    return {
+        "posts_feedback": [
+            _feedback(a, "carousel" if i % 2 else "story", 10 + 10 * i)
+            for i, a in enumerate(accounts)
+        ],
+        "scheduler_model_params": [
+            {"account": "acc1", "w_engagement": 1.0, "w_relevance": 0.0, "learning_rate": 0.05}
+        ],
+        "items": [{"id": 1, "title": "IA aplicada a marketing", "summary": "agentes"}],
+    }
+
+
+def _reset() -> None:
+    for reset in (forget_matrices, invalidate_recent_items, plan.forget):
+        reset()
+    scheduler_core.forget_params()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches(monkeypatch: Any) -> Any:
+    monkeypatch.setattr(semantic, "get_queue", lambda: None)
+    monkeypatch.setattr(semantic_async, "get_queue", lambda: None)
+    _reset()
+    yield
+    _reset()
+
+
+async def _burst(app: FastAPI, paths: List[str]) -> Tuple[List[httpx.Response], float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        t0 = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(p) for p in paths))
+        return list(responses), time.perf_counter() - t0
+
+
+def test_async_router_serves_past_threadpool_limit(supabase: Any) -> None:
+    rows = [{"item_id": str(i), "model": "m"} for i in range(3 * THREADPOOL_LIMIT)]
+    paths = [f"/semantic/embed_status/{r['item_id']}" for r in rows]
+
+    sync_db = supabase({"item_embeddings": rows}, delay=0.2)
+    responses, sync_elapsed = asyncio.run(_burst(_app(semantic.router), paths))
+    assert all(r.json()["state"] == "done" for r in responses)
+    assert sync_db.peak <= THREADPOOL_LIMIT  # el resto espera un hilo libre
+
+    async_db = supabase({"item_embeddings": rows}, delay=0.2, asynchronous=True)
+    responses, async_elapsed = asyncio.run(_burst(_app(semantic_async.router), paths))
+    assert all(r.json()["state"] == "done" for r in responses)
+    assert async_db.peak > THREADPOOL_LIMIT
+    assert async_elapsed < sync_elapsed
+
+
+def test_next_post_batch_gathers_independent_reads_and_matches_sync(supabase: Any) -> None:
+    accounts = [f"acc{i}" for i in range(6)]
+    body = {"accounts": accounts + ["nuevo"]}
+
+    supabase(_tables(accounts))
+    expected = TestClient(_app(scheduler_ai.router)).post("/scheduler/next_post_batch", json=body)
+    _reset()
+
+    db = supabase(_tables(accounts), delay=0.05, asynchronous=True)
+    r = TestClient(_app(scheduler_async.router)).post("/scheduler/next_post_batch", json=body)
+    assert r.status_code == 200
+
+    def strip(results: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            a: {k: v for k, v in rec.items() if k != "generated_at"} for a, rec in results.items()
+        }
+
+    assert strip(r.json()["results"]) == strip(expected.json()["results"])
+    assert r.json()["results"]["acc1"]["priority"] == pytest.approx(0.2)
+    assert db.reads == {
+        "items": 1,
+        "posts_feedback": 1,
+        "scheduler_model_params": 1,
+        "scheduler_daily_plan": 1,
+    }
+    assert db.peak >= 3  # items, posts_feedback y pesos en paralelo
+    persisted = {row["account"] for row in db.tables["scheduler_daily_plan"]}
+    assert persisted >= set(body["accounts"])  # + cuentas configuradas (primer plan del día)
+
+
+def test_feedback_stores_and_learns_with_concurrent_io(supabase: Any) -> None:
+    db = supabase(_tables(["vibecodinglatam"]), delay=0.05, asynchronous=True)
+    plan.put("2026-01-01", "vibecodinglatam", [None] * 24, "2026-01-01T00:00:00")
+
+    r = TestClient(_app(scheduler_async.router)).post(
+        "/scheduler/feedback",
+        json={
+            "account": "vibecodinglatam",
+            "post_id": "p1",
+            "likes": 10,
+            "comments": 2,
+            "saves": 1,
+            "reach": 1000,
+            "followers": 1000,
+        },
+    )
+    assert r.json()["status"] == "ok" and r.json()["stored"] is True
+    assert db.tables["posts_feedback"][-1]["post_id"] == "p1"
+    assert db.peak >= 3  # insert, pesos e items a la vez
+    assert plan.snapshot()["accounts"] == {}
+    learned = scheduler_core.cached_params("vibecodinglatam")
+    assert learned is not None and learned != scheduler_core.DEFAULT_PARAMS
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_feedback_learns_from_current_row_not_cached_params(
+    supabase: Any, asynchronous: bool
+) -> None:
+    db = supabase(_tables(["acc1"]), asynchronous=asynchronous)
+    router = scheduler_async.router if asynchronous else scheduler_ai.router
+    client = TestClient(_app(router))
+    client.post("/scheduler/next_post_batch", json={"accounts": ["acc1"]})
+    assert scheduler_core.cached_params("acc1") == (1.0, 0.0, 0.05)
+    # Otro worker ajusta los pesos: esta cache queda vieja
+    db.tables["scheduler_model_params"][0].update(w_engagement=0.2, w_relevance=0.8)
+    reads = db.reads["scheduler_model_params"]
+
+    body = {"account": "acc1", "post_id": "p1", "likes": 10, "comments": 0, "saves": 0}
+    client.post("/scheduler/feedback", json={**body, "reach": 100, "followers": 100})
+
+    assert db.reads["scheduler_model_params"] == reads + 1
+    w_e, w_r, _ = scheduler_core.cached_params("acc1") or scheduler_core.DEFAULT_PARAMS
+    assert w_e < 0.3 and w_r > 0.7  # un paso desde 0.2/0.8, no desde 1.0/0.0
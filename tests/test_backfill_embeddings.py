@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from app.jobs import backfill_embeddings
+from app.jobs.backfill_embeddings import run
+
+
+def _tables(n_items: int, embedded: List[int]) -> Dict[str, List[Dict[str, Any]]]:
+    return {
+        "items": [{"id": i, "title": f"item {i}", "summary": None} for i in range(1, n_items + 1)],
+        "item_embeddings": [{"item_id": i} for i in embedded],
+    }
+
+
+def test_backfill_skips_existing_and_bulk_inserts(
+    tmp_path: Path, monkeypatch: Any, supabase: Any
+) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    db = supabase(_tables(25, embedded=[2, 3, 10]))
+    embeddings = db.tables["item_embeddings"]
+    ckpt = tmp_path / "ckpt.json"
+
+    state = run(db, ckpt, page_size=10, batch_size=4, concurrency=2, log=lambda *_: None)
+
+    ids = sorted(r["item_id"] for r in embeddings)
+    assert ids == list(range(1, 26))
+    assert state["embedded"] == 22 and state["last_id"] == 25
+    assert json.loads(ckpt.read_text())["last_id"] == 25
+    assert isinstance(embeddings[-1]["embedding"], str)
+    assert (
+        db.writes["item_embeddings"] == 7
+    )  # páginas con 7, 10 y 5 faltantes en lotes de 4 → 2 + 3 + 2
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path: Path, monkeypatch: Any, supabase: Any) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    db = supabase(_tables(30, embedded=[]))
+    embeddings = db.tables["item_embeddings"]
+    ckpt = tmp_path / "ckpt.json"
+    real = backfill_embeddings.get_embeddings_array
+    calls = {"n": 0}
+
+    def flaky(texts: Any, **kwargs: Any) -> Any:
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise RuntimeError("provider down")
+        return real(texts, **kwargs)
+
+    monkeypatch.setattr(backfill_embeddings, "get_embeddings_array", flaky)
+    with pytest.raises(RuntimeError):
+        run(db, ckpt, page_size=10, batch_size=10, concurrency=1, log=lambda *_: None)
+    assert json.loads(ckpt.read_text())["last_id"] == 10
+
+    state = run(db, ckpt, page_size=10, batch_size=10, concurrency=1, log=lambda *_: None)
+    ids = [r["item_id"] for r in embeddings]
+    assert sorted(ids) == list(range(1, 31)) and len(ids) == len(set(ids))
+    assert state["embedded"] == 30
+
+
+def test_backfill_keeps_rows_written_while_it_embeds(
+    tmp_path: Path, monkeypatch: Any, supabase: Any
+) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    db = supabase(_tables(4, embedded=[]))
+    embeddings = db.tables["item_embeddings"]
+    real = backfill_embeddings.get_embeddings_array
+    model = backfill_embeddings.DEFAULT_EMBEDDING_MODEL
+
+    def racing(texts: Any, **kwargs: Any) -> Any:
+        # La cola guarda el item 2 entre el filtro de faltantes y el bulk
+        embeddings.append({"item_id": 2, "model": model, "embedding": "[0]"})
+        return real(texts, **kwargs)
+
+    monkeypatch.setattr(backfill_embeddings, "get_embeddings_array", racing)
+    run(db, tmp_path / "ckpt.json", page_size=10, batch_size=10, log=lambda *_: None)
+
+    ids = sorted(r["item_id"] for r in embeddings)
+    assert ids == [1, 2, 3, 4]
+    assert next(r for r in embeddings if r["item_id"] == 2)["embedding"] == "[0]"
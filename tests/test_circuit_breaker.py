@@ -0,0 +1,110 @@
+import time
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import supabase_client
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.supabase_client import _GuardedClient, breaker
+
+
+class APIError(Exception):
+    def __init__(self, code: str) -> None:
+        super().__init__(f"postgrest error {code}")
+        self.code = code
+
+
+@pytest.fixture(autouse=True)
+def _closed_breaker(monkeypatch: Any) -> Any:
+    breaker.reset()
+    yield
+    breaker.reset()
+
+
+def test_state_machine_open_half_open_closed() -> None:
+    cb = CircuitBreaker("test", failure_threshold=2, recovery_s=0.05)
+    cb.record_failure("timeout")
+    assert cb.state == "closed"
+    cb.record_failure("timeout")
+    assert cb.state == "open"
+    with pytest.raises(CircuitOpenError):
+        cb.before_call()
+
+    time.sleep(0.06)
+    assert cb.state == "half_open"
+    cb.before_call()  # única llamada de prueba
+    with pytest.raises(CircuitOpenError):
+        cb.before_call()
+    cb.record_failure("sigue caído")
+    assert cb.state == "open"
+
+    time.sleep(0.06)
+    cb.before_call()
+    cb.record_success()
+    assert cb.state == "closed" and cb.snapshot()["consecutive_failures"] == 0
+
+
+def test_thresholds_read_from_env_after_import(monkeypatch: Any) -> None:
+    # `.env` se carga en main después de importar supabase_client
+    monkeypatch.setenv("SUPABASE_BREAKER_FAILURES", "2")
+    monkeypatch.setenv("SUPABASE_BREAKER_RECOVERY_S", "0.05")
+    assert breaker.failure_threshold == 2 and breaker.recovery_s == 0.05
+
+    breaker.record_failure("timeout")
+    assert breaker.state == "closed"
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+
+
+def test_outages_open_circuit_but_query_errors_do_not(monkeypatch: Any, supabase: Any) -> None:
+    raw = supabase({"items": [{"id": 1}]}, patch=False)
+    client = _GuardedClient(raw)
+    monkeypatch.setenv("SUPABASE_BREAKER_FAILURES", "3")
+
+    raw.error = APIError("42703")  # columna inexistente: error de la consulta
+    for _ in range(5):
+        with pytest.raises(APIError):
+            client.table("items").select("id").eq("id", 1).execute()
+    assert breaker.state == "closed"
+
+    raw.error = ConnectionError("connection refused")
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            client.table("items").select("id").execute()
+    assert breaker.state == "open"
+
+    calls = len(raw.calls)
+    t0 = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        client.table("items").select("id").execute()
+    assert len(raw.calls) == calls  # no se tocó la red
+    assert time.perf_counter() - t0 < 0.01
+
+
+def test_open_circuit_short_circuits_get_client_and_shows_in_health(
+    monkeypatch: Any, supabase: Any
+) -> None:
+    raw = supabase(patch=False)
+    monkeypatch.setattr(supabase_client, "_client", _GuardedClient(raw))
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(TimeoutError("read timeout"))
+
+    with pytest.raises(CircuitOpenError):
+        supabase_client.get_client()
+
+    client = TestClient(app)
+    health = client.get("/health").json()
+    assert health["status"] == "ok"
+    assert health["supabase"]["state"] == "open"
+    assert health["supabase"]["retry_in_s"] > 0
+
+    metrics = client.get("/metrics").json()
+    assert metrics["gauges"]["supabase.breaker.state"] == 2
+    assert metrics["counters"]["supabase.breaker.rejected"] >= 1
+
+    # Los endpoints caen a su fallback al instante
+    assert client.get("/scheduler/next_post").status_code == 200
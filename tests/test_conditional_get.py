@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.routers.scheduler_ai as scheduler_ai
+from app.main import app
+from app.services import scheduler_core, singleflight, versions
+
+
+def _tables() -> Dict[str, List[Dict[str, Any]]]:
+    now = datetime.now(timezone.utc).isoformat()
+    params = {"account": "acc", "w_engagement": 0.7, "w_relevance": 0.3, "learning_rate": 0.05}
+    return {
+        "items": [{"id": 1, "title": "IA hoy", "created_at": now}],
+        "scheduler_model_params": [params],
+    }
+
+
+@pytest.fixture(autouse=True)
+def _fresh_versions() -> Any:
+    versions.reset()
+    singleflight.invalidate()
+    yield
+    singleflight.invalidate()
+
+
+@pytest.mark.parametrize(
+    "path,params", [("/scheduler/trends", {}), ("/scheduler/weights", {"account": "acc"})]
+)
+def test_etag_roundtrip_skips_supabase(supabase: Any, path: str, params: dict) -> None:
+    db = supabase(_tables())
+    client = TestClient(app)
+
+    first = client.get(path, params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"') and "max-age=" in first.headers["cache-control"]
+    reads = db.queries
+
+    again = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    assert db.queries == reads
+
+
+def test_trends_etag_changes_after_item_insert(supabase: Any) -> None:
+    supabase(_tables())
+    client = TestClient(app)
+
+    etag = client.get("/scheduler/trends").headers["etag"]
+    client.post("/insert_item", json={"source": "rss", "title": "Algo nuevo"})
+    r = client.get("/scheduler/trends", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_weights_etag_changes_after_update_and_errors_are_not_cacheable(
+    monkeypatch: Any, supabase: Any
+) -> None:
+    db = supabase(_tables())
+    client = TestClient(app)
+
+    etag = client.get("/scheduler/weights", params={"account": "acc"}).headers["etag"]
+    other = client.get("/scheduler/weights", params={"account": "otra"}).headers["etag"]
+    assert other != etag
+
+    scheduler_core.update_model_params(db, "acc", 0.5, 0.5, 0.05)
+    r = client.get("/scheduler/weights", params={"account": "acc"}, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+    def down() -> Any:
+        raise RuntimeError("sin supabase")
+
+    monkeypatch.setattr(scheduler_ai, "get_client", down)
+    singleflight.invalidate()
+    r = client.get("/scheduler/weights", params={"account": "x"})
+    assert r.json()["error"] == "supabase_unavailable"
+    assert "etag" not in r.headers and r.headers["cache-control"] == "no-store"
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import scheduler_core, singleflight
+from app.services.daily_plan import plan
+from app.services.daily_runs import local_run_date
+from app.services.engagement_matrix import forget_matrices
+from app.services.recent_items import invalidate_recent_items
+
+
+def _db(supabase: Any) -> Any:
+    posted = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+    feedback = {"likes": 40, "comments": 0, "saves": 0, "followers": 100, "content_type": "reel"}
+    return supabase(
+        {
+            "posts_feedback": [{"account": "acc", **feedback, "posted_at": posted.isoformat()}],
+            "items": [{"id": 1, "title": "IA aplicada", "summary": "agentes"}],
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch: Any) -> Any:
+    monkeypatch.setenv("SCHEDULER_ACCOUNTS", "acc,otra")
+    for reset in (forget_matrices, invalidate_recent_items, plan.forget, singleflight.invalidate):
+        reset()
+    scheduler_core.forget_params()
+    yield
+    for reset in (forget_matrices, invalidate_recent_items, plan.forget, singleflight.invalidate):
+        reset()
+    scheduler_core.forget_params()
+
+
+def test_first_access_builds_day_for_configured_accounts_and_persists(supabase: Any) -> None:
+    db = _db(supabase)
+    client = TestClient(app)
+
+    first = client.get("/scheduler/next_post", params={"account": "acc"}).json()
+    assert first["content_type"] == "reel" and first["generated_at"]
+    assert set(plan.snapshot()["accounts"]) == {"acc", "otra"}
+
+    stored = {r["account"]: r for r in db.tables["scheduler_daily_plan"]}
+    assert set(stored) == {"acc", "otra"}
+    assert stored["acc"]["plan_date"] == local_run_date() and len(stored["acc"]["hours"]) == 24
+
+    # Siguientes accesos (incluida otra cuenta configurada): lookup en memoria, sin consultas
+    reads = dict(db.reads)
+    assert client.get("/scheduler/next_post", params={"account": "acc"}).json() == first
+    assert client.get("/scheduler/next_post", params={"account": "otra"}).status_code == 200
+    assert db.reads == reads
+
+
+def test_refresh_and_feedback_rebuild_the_account_plan(supabase: Any) -> None:
+    db = _db(supabase)
+    client = TestClient(app)
+
+    client.get("/scheduler/next_post", params={"account": "acc"})
+    upserts = db.calls.count("upsert:scheduler_daily_plan")
+    client.get("/scheduler/next_post", params={"account": "acc", "refresh": "true"})
+    assert db.calls.count("upsert:scheduler_daily_plan") == upserts + 1
+
+    fb = {"account": "acc", "post_id": "p1", "likes": 5, "comments": 1, "saves": 0, "reach": 50}
+    assert client.post("/scheduler/feedback", json=fb).status_code == 200
+    assert "acc" not in plan.snapshot()["accounts"]
+    client.get("/scheduler/next_post", params={"account": "acc"})
+    assert "acc" in plan.snapshot()["accounts"]
+
+
+def test_persisted_plan_is_loaded_instead_of_recomputed(supabase: Any) -> None:
+    db = _db(supabase)
+    built_at = datetime.now().astimezone().isoformat()
+    hours = [
+        {
+            "account": "acc",
+            "recommended_time": "21:00",
+            "content_type": "carousel",
+            "topic": "De otro proceso",
+            "priority": 0.5,
+            "generated_at": built_at,
+        }
+    ] * 24
+    db.tables["scheduler_daily_plan"] = [
+        {"account": "acc", "plan_date": local_run_date(), "hours": hours, "built_at": built_at}
+    ]
+
+    r = TestClient(app).get("/scheduler/next_post", params={"account": "acc"}).json()
+    assert r["topic"] == "De otro proceso" and r["generated_at"] == built_at
+    assert "posts_feedback" not in db.reads
+
+
+@pytest.mark.parametrize("change", ["feedback", "items"])
+def test_persisted_plan_older_than_a_local_change_is_rebuilt(supabase: Any, change: str) -> None:
+    db = _db(supabase)
+    client = TestClient(app)
+    client.get("/scheduler/next_post", params={"account": "acc"})
+    for row in db.tables["scheduler_daily_plan"]:
+        row["hours"] = [{**h, "topic": "Plan viejo"} for h in row["hours"]]
+    upserts = db.calls.count("upsert:scheduler_daily_plan")
+
+    if change == "feedback":
+        fb = {"account": "acc", "post_id": "p1", "likes": 5, "comments": 1, "saves": 0}
+        assert client.post("/scheduler/feedback", json={**fb, "reach": 50}).status_code == 200
+    else:
+        db.tables["items"].insert(0, {"id": 2, "title": "Item nuevo", "summary": "x"})
+        invalidate_recent_items()  # lo que hace cada inserción de items
+
+    r = client.get("/scheduler/next_post", params={"account": "acc"}).json()
+    assert r["topic"] != "Plan viejo"
+    assert db.calls.count("upsert:scheduler_daily_plan") == upserts + 1
+
+
+def test_lookup_expires_after_max_age_and_on_source_change(monkeypatch: Any) -> None:
+    today = local_run_date()
+    plan.put(today, "acc", ["x"] * 24, "t", stamp=(0, 0), age_s=10)
+    assert plan.lookup("acc", today, 5, (0, 0)) == "x"
+    assert plan.lookup("acc", today, 5, (1, 0)) is None  # items nuevos
+    tomorrow = (datetime.now() + timedelta(days=1)).date().isoformat()
+    assert plan.lookup("acc", tomorrow, 5, (0, 0)) is None
+    monkeypatch.setenv("DAILY_PLAN_MAX_AGE_S", "5")
+    assert plan.lookup("acc", today, 5, (0, 0)) is None
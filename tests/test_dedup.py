@@ -0,0 +1,93 @@
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import dedup
+from app.services.dedup import MinHashIndex, dedup_text
+
+ARTICLE = (
+    "OpenAI lanza un nuevo modelo de agentes para automatizar flujos de marketing "
+    "y análisis de datos en empresas latinoamericanas"
+)
+
+
+def _reject_canonical_column(table: str, rows: List[Dict[str, Any]]) -> None:
+    if table == "items" and any("canonical_item_id" in r for r in rows):
+        raise RuntimeError("column items.canonical_item_id does not exist")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_index(monkeypatch: Any) -> Any:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    dedup.reset()
+    yield
+    dedup.reset()
+
+
+def test_index_finds_near_duplicates_only() -> None:
+    idx = MinHashIndex(capacity=100)
+    idx.add(1, idx.signature(dedup_text(ARTICLE, None)))
+    idx.add(2, idx.signature(dedup_text("Receta de empanadas chilenas al horno", None)))
+
+    near = idx.signature(dedup_text("OpenAI lanza un NUEVO modelo de agentes, para", ARTICLE[47:]))
+    match = idx.query(near, 0.8)
+    assert match is not None and match.item_id == 1 and match.similarity >= 0.8
+
+    other = idx.signature(dedup_text("Resultados del clásico de fútbol del domingo", None))
+    assert idx.query(other, 0.8) is None
+
+
+def test_ring_buffer_evicts_oldest() -> None:
+    idx = MinHashIndex(capacity=2)
+    texts = [ARTICLE, "Receta de empanadas chilenas", "Clima en Santiago esta semana"]
+    for i, text in enumerate(texts, start=1):
+        idx.add(i, idx.signature(dedup_text(text, None)))
+    assert len(idx) == 2
+    assert idx.query(idx.signature(dedup_text(ARTICLE, None)), 0.8) is None
+    assert idx.query(idx.signature(dedup_text(texts[2], None)), 0.8).item_id == 3  # type: ignore
+
+
+def test_insert_item_links_duplicate_to_canonical(supabase: Any) -> None:
+    db = supabase({"items": []})
+    client = TestClient(app)
+
+    first = client.post("/insert_item", json={"source": "rss", "title": ARTICLE}).json()
+    second = client.post("/insert_item", json={"source": "rss", "title": ARTICLE + "."}).json()
+
+    assert first["canonical_id"] is None
+    assert second["status"] == "ok" and second["canonical_id"] == first["inserted_id"]
+    items = db.tables["items"]
+    assert items[1]["canonical_item_id"] == items[0]["id"]
+
+
+def test_reject_policy_and_missing_column(monkeypatch: Any, supabase: Any) -> None:
+    db = supabase({"items": []})
+    db.on_write = _reject_canonical_column
+    client = TestClient(app)
+
+    client.post("/insert_item", json={"source": "rss", "title": ARTICLE})
+    # link sin la columna en la base: reintenta sin canonical_item_id
+    linked = client.post("/insert_item", json={"source": "rss", "title": ARTICLE}).json()
+    assert linked["status"] == "ok" and len(db.tables["items"]) == 2
+
+    monkeypatch.setenv("DEDUP_POLICY", "reject")
+    r = client.post("/semantic/embed_item", json={"source": "rss", "title": ARTICLE}).json()
+    assert r["status"] == "duplicate" and r["item_id"] == 1
+    assert len(db.tables["items"]) == 2
+
+
+def test_rebuild_keeps_oldest_as_canonical(supabase: Any) -> None:
+    db = supabase(
+        {
+            "items": [
+                {"id": 1, "title": ARTICLE, "summary": None},
+                {"id": 2, "title": "Receta de empanadas chilenas", "summary": None},
+                {"id": 3, "title": ARTICLE + "!", "summary": None},
+            ]
+        }
+    )
+    assert dedup.rebuild(db) == 2
+    match = dedup.find_duplicate(ARTICLE, None)
+    assert match is not None and match.item_id == 1 and match.action == "link"
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, List
+
+import numpy as np
+import pytest
+
+from app.services import embeddings
+from app.services.embeddings import aget_embedding_array, get_embedding_array
+from app.services.microbatch import MicroBatcher
+from app.services.rate_limit import RateLimiter, reset_openai_limiter
+
+DIMS = 64
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture
+def provider(monkeypatch: Any) -> Any:
+    """OpenAI falso: registra los inputs de cada llamada; 'tN' → vector one-hot en N."""
+    calls: List[List[str]] = []
+
+    class FakeOpenAI:
+        def __init__(self, **_: Any) -> None:
+            self.embeddings = self
+
+        def create(self, **kwargs: Any) -> Any:
+            inputs = kwargs["input"]
+            calls.append(list(inputs))
+            if len(inputs) > 1 and "bad" in inputs:
+                raise BadRequest("input inválido")
+            if inputs == ["bad"]:
+                raise BadRequest("input inválido")
+            data = []
+            for i, text in enumerate(inputs):
+                vec = [0.0] * kwargs["dimensions"]
+                vec[int(text[1:])] = 1.0
+                data.append(type("D", (), {"index": i, "embedding": vec}))
+            return type("R", (), {"data": data})
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", str(DIMS))
+    monkeypatch.setenv("EMBED_BATCH_WINDOW_MS", "50")
+    monkeypatch.setattr("openai.OpenAI", FakeOpenAI)
+    embeddings.stop_batcher()
+    reset_openai_limiter()
+    yield calls
+    embeddings.stop_batcher()
+    reset_openai_limiter()
+
+
+def test_concurrent_requests_share_one_provider_call(provider: List[List[str]]) -> None:
+    texts = [f"t{i}" for i in range(16)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        vectors = list(pool.map(get_embedding_array, texts))
+
+    assert sum(len(c) for c in provider) == 16 and len(provider) <= 2
+    assert [int(np.argmax(v)) for v in vectors] == list(range(16))  # cada uno recibe el suyo
+
+
+def test_invalid_input_does_not_poison_the_batch(provider: List[List[str]]) -> None:
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        good, bad, other = pool.map(get_embedding_array, ["t1", "bad", "t2"])
+
+    assert int(np.argmax(good)) == 1 and int(np.argmax(other)) == 2
+    np.testing.assert_allclose(bad, embeddings._pseudo_array("bad", "text-embedding-3-small", DIMS))
+
+
+def test_async_callers_are_batched(provider: List[List[str]]) -> None:
+    async def burst() -> List[Any]:
+        return await asyncio.gather(*(aget_embedding_array(f"t{i}") for i in range(8)))
+
+    vectors = asyncio.run(burst())
+    assert len(provider) == 1 and sorted(provider[0]) == sorted(f"t{i}" for i in range(8))
+    assert [int(np.argmax(v)) for v in vectors] == list(range(8))
+
+
+def test_token_bucket_spaces_calls_by_tpm() -> None:
+    limiter = RateLimiter("test", rpm=0, tpm=600)  # 10 tokens/s, un minuto de ráfaga
+    assert limiter.reserve(600) == 0.0
+    assert limiter.reserve(5) == pytest.approx(0.5, abs=0.02)
+    assert limiter.reserve(5) == pytest.approx(1.0, abs=0.02)  # los que esperan se encolan
+
+
+def test_stop_never_leaves_callers_hanging() -> None:
+    def slow(key: Any, items: List[int]) -> List[int]:
+        time.sleep(0.002)
+        return items
+
+    batcher = MicroBatcher("slow", slow, window_s=0.0, max_size=1, concurrency=1)
+    futures = [batcher.submit("k", i) for i in range(200)]
+    # El join vence con el colector todavía despachando
+    batcher.stop(timeout_s=0)
+
+    _, not_done = wait(futures, timeout=5)
+    assert not not_done
+    for i, f in enumerate(futures):
+        assert isinstance(f.exception(), RuntimeError) or f.result() == i
+
+
+def test_restart_after_hasty_stop_serves_new_callers() -> None:
+    batcher = MicroBatcher("echo", lambda key, items: items, window_s=0.0, max_size=1)
+    first = [batcher.submit("k", i) for i in range(200)]
+    batcher.stop(timeout_s=0)
+    second = [batcher.submit("k", i) for i in range(50)]
+    try:
+        assert [f.result(timeout=5) for f in second] == list(range(50))
+    finally:
+        batcher.stop()
+    wait(first, timeout=5)
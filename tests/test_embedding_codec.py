@@ -0,0 +1,78 @@
+from typing import Any, Dict, List
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.embedding_codec import (
+    decode_embedding_row,
+    embedding_columns,
+    parse_pgvector_literal,
+    quantize_int8,
+    to_pgvector_literal,
+)
+
+client = TestClient(app)
+
+
+def _vec(dims: int = 1536) -> np.ndarray:
+    v = np.random.default_rng(0).standard_normal(dims).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_pgvector_literal_roundtrip_is_exact() -> None:
+    v = _vec()
+    text = to_pgvector_literal(v)
+    assert text.startswith("[") and text.endswith("]")
+    assert np.array_equal(parse_pgvector_literal(text), v)
+
+
+def test_int8_quantization_error_is_bounded() -> None:
+    v = _vec()
+    q, scale = quantize_int8(v)
+    assert q.dtype == np.int8
+    assert np.max(np.abs(q.astype(np.float32) * scale - v)) <= scale / 2 + 1e-7
+
+
+def test_embedding_columns_per_storage() -> None:
+    v = _vec(8)
+    assert set(embedding_columns(v, "vector")) == {"embedding"}
+    assert set(embedding_columns(v, "halfvec")) == {"embedding_half"}
+    cols = embedding_columns(v, "int8")
+    assert set(cols) == {"embedding_q", "embedding_scale"}
+    assert cols["embedding_q"].startswith("\\x") and len(cols["embedding_q"]) == 2 + 2 * 8
+
+    for kind in ("vector", "halfvec", "int8"):
+        decoded = decode_embedding_row(embedding_columns(v, kind))
+        assert decoded.dtype == np.float32
+        assert float(decoded @ v) > 0.99
+
+
+def test_embed_item_sends_compact_payload(monkeypatch: Any) -> None:
+    inserts: List[Dict[str, Any]] = []
+
+    class MockClient:
+        def table(self, name: str) -> Any:
+            class Table:
+                def insert(self, row: Dict[str, Any]) -> "Table":
+                    inserts.append({"table": name, **row})
+                    return self
+
+                def upsert(self, row: Dict[str, Any], **_: Any) -> "Table":
+                    return self.insert(row)
+
+                def execute(self) -> Any:
+                    return type("R", (), {"data": [{"id": 7}]})
+
+            return Table()
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("EMBEDDING_STORAGE", "halfvec")
+    monkeypatch.setattr("app.routers.semantic.get_client", lambda: MockClient())
+
+    r = client.post("/semantic/embed_item", json={"title": "IA y cultura", "summary": "x"})
+    assert r.status_code == 200
+    assert r.json()["embedding_dimensions"] == 1536
+    row = next(i for i in inserts if i["table"] == "item_embeddings")
+    assert row["item_id"] == 7
+    assert isinstance(row["embedding_half"], str) and "embedding" not in row
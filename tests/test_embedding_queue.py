@@ -0,0 +1,111 @@
+import time
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import embedding_queue
+from app.services.embedding_queue import EmbeddingQueue
+from app.services.metrics import metrics
+
+
+def _wait_for(cond: Any, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cond()
+
+
+def test_queue_micro_batches_and_bulk_inserts(monkeypatch: Any, supabase: Any) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    db = supabase({"item_embeddings": []})
+
+    q = EmbeddingQueue(workers=1, batch_size=8, batch_wait_s=0.2)
+    for i in range(1, 9):
+        assert q.enqueue(i, f"item {i}")
+    q.start()
+    embeddings = db.tables["item_embeddings"]
+    _wait_for(lambda: len(embeddings) == 8)
+    q.stop()
+
+    assert db.writes["item_embeddings"] == 1
+    assert sorted(r["item_id"] for r in embeddings) == list(range(1, 9))
+    assert q.status(3)["state"] == "done"  # type: ignore[index]
+
+
+def test_queue_does_not_duplicate_rows_written_by_backfill(monkeypatch: Any, supabase: Any) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    model = embedding_queue.DEFAULT_EMBEDDING_MODEL
+    db = supabase({"item_embeddings": [{"item_id": 1, "model": model, "embedding": "[0]"}]})
+
+    q = EmbeddingQueue(workers=1, batch_size=2, batch_wait_s=0.05)
+    q.enqueue(1, "item 1")
+    q.enqueue(2, "item 2")
+    q.start()
+    _wait_for(lambda: q.status(2)["state"] == "done")  # type: ignore[index]
+    q.stop()
+
+    embeddings = db.tables["item_embeddings"]
+    assert sorted(r["item_id"] for r in embeddings) == [1, 2]
+    assert embeddings[0]["embedding"] == "[0]"
+    assert q.status(1)["state"] == "done"  # type: ignore[index]
+
+
+def test_queue_drop_policies() -> None:
+    q = EmbeddingQueue(maxsize=2, policy="drop_new")
+    assert q.enqueue(1, "a") and q.enqueue(2, "b")
+    assert not q.enqueue(3, "c")
+    assert q.status(3)["state"] == "dropped"  # type: ignore[index]
+
+    q = EmbeddingQueue(maxsize=2, policy="drop_oldest")
+    assert q.enqueue(1, "a") and q.enqueue(2, "b") and q.enqueue(3, "c")
+    assert q.status(1)["state"] == "dropped"  # type: ignore[index]
+    assert [j.item_id for j in q._jobs] == [2, 3]
+
+    q = EmbeddingQueue(maxsize=1, policy="block", block_timeout_s=0.05)
+    assert q.enqueue(1, "a")
+    t0 = time.monotonic()
+    assert not q.enqueue(2, "b")
+    assert time.monotonic() - t0 >= 0.04
+
+
+def test_failed_batch_is_reported(monkeypatch: Any) -> None:
+    def boom(*_: Any, **__: Any) -> Any:
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(embedding_queue, "get_embeddings_array", boom)
+    failed = metrics.counter("embed_queue.failed")
+    q = EmbeddingQueue(workers=1, batch_wait_s=0)
+    q.start()
+    q.enqueue(7, "x")
+    _wait_for(lambda: (q.status(7) or {}).get("state") == "failed")
+    q.stop()
+    assert "provider down" in q.status(7)["error"]  # type: ignore[index]
+    assert metrics.counter("embed_queue.failed") == failed + 1
+
+
+def test_insert_and_embed_item_enqueue_when_queue_running(monkeypatch: Any, supabase: Any) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("EMBED_QUEUE_BATCH_WAIT_MS", "0")
+    db = supabase({"items": [], "item_embeddings": []})
+
+    embedding_queue.start_queue()
+    try:
+        client = TestClient(app)
+        r = client.post("/insert_item", json={"source": "manual", "title": "Hola"})
+        assert r.status_code == 200 and r.json()["embedding"] == "queued"
+
+        r = client.post("/semantic/embed_item", json={"source": "manual", "title": "Chao"})
+        body = r.json()
+        assert body["status"] == "queued" and body["item_id"] == 2
+
+        _wait_for(lambda: len(db.tables["item_embeddings"]) == 2)
+        r = client.get("/semantic/embed_status/2")
+        assert r.json()["state"] == "done"
+        assert client.get("/metrics").json()["counters"]["embed_queue.processed"] >= 2
+    finally:
+        embedding_queue.stop_queue()
+
+    # Sin cola: el estado sale de la tabla
+    assert client.get("/semantic/embed_status/1").json()["state"] == "done"
+    assert client.get("/semantic/embed_status/99").json()["state"] == "unknown"
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.embeddings import (
+    embedding_dimensions,
+    get_embedding,
+    get_embedding_array,
+    truncate_embedding,
+)
+
+
+def test_dimensions_config_priority(monkeypatch: Any) -> None:
+    monkeypatch.delenv("EMBEDDING_DIMENSIONS", raising=False)
+    monkeypatch.delenv("EMBEDDING_DIMENSIONS_BY_MODEL", raising=False)
+    assert embedding_dimensions("text-embedding-3-small") == 1536
+
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "512")
+    assert embedding_dimensions("text-embedding-3-small") == 512
+    assert embedding_dimensions("text-embedding-ada-002") == 1536  # sin parámetro dimensions
+
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS_BY_MODEL", '{"text-embedding-3-small": 256}')
+    assert embedding_dimensions("text-embedding-3-small") == 256
+    assert embedding_dimensions("text-embedding-3-large") == 512
+
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "99999")
+    monkeypatch.delenv("EMBEDDING_DIMENSIONS_BY_MODEL")
+    assert embedding_dimensions("text-embedding-3-small") == 1536
+
+
+def test_pseudo_fallback_is_prefix_renormalized(monkeypatch: Any) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("EMBEDDING_DIMENSIONS_BY_MODEL", raising=False)
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "1536")
+    full = get_embedding_array("hola mundo")
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "256")
+    small = get_embedding_array("hola mundo")
+
+    assert small.shape == (256,) and small.dtype == np.float32
+    # Misma norma L2 en la dimensión nativa y en la reducida
+    assert abs(float(np.linalg.norm(full)) - 1.0) < 1e-5
+    assert abs(float(np.linalg.norm(small)) - 1.0) < 1e-5
+    np.testing.assert_allclose(small, full[:256] / np.linalg.norm(full[:256]), rtol=1e-6)
+    assert len(get_embedding("hola mundo")) == 256
+
+
+def test_provider_receives_dimensions(monkeypatch: Any) -> None:
+    calls: List[Dict[str, Any]] = []
+
+    class FakeOpenAI:
+        def __init__(self, **_: Any) -> None:
+            self.embeddings = self
+
+        def create(self, **kwargs: Any) -> Any:
+            calls.append(kwargs)
+            vec = [0.5] * kwargs.get("dimensions", 1536)
+            return type("R", (), {"data": [type("D", (), {"embedding": vec})]})
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "512")
+    monkeypatch.setattr("openai.OpenAI", FakeOpenAI)
+
+    vec = get_embedding_array("texto")
+    assert vec.shape == (512,)
+    assert calls[-1]["dimensions"] == 512 and calls[-1]["encoding_format"] == "base64"
+
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "1536")
+    get_embedding("texto")
+    assert "dimensions" not in calls[-1]
+
+
+def test_truncate_embedding_noop_when_shorter() -> None:
+    v = np.ones(8, dtype=np.float32)
+    assert truncate_embedding(v, 16).shape == (8,)
@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.engagement_matrix import (
+    EngagementMatrix,
+    abuild_matrices,
+    build_matrices,
+    forget_matrices,
+    local_slot,
+)
+
+
+def _at(weekday: int, hour: int) -> str:
+    """ISO local del próximo `weekday` a la hora `hour`."""
+    now = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+    day = now + timedelta(days=(weekday - now.weekday()) % 7)
+    return day.replace(hour=hour).isoformat()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_matrices() -> Any:
+    forget_matrices()
+    yield
+    forget_matrices()
+
+
+def test_shrinkage_prefers_consistent_cell_over_single_outlier() -> None:
+    m = EngagementMatrix("acc", shrinkage_k=5.0)
+    m.add("reel", 2, 18, 0.9)  # un único post excelente
+    for _ in range(20):
+        m.add("carousel", 2, 20, 0.5)  # muchos posts buenos
+    for _ in range(20):
+        m.add("post", 2, 9, 0.05)
+
+    assert m.best(2, 0) == ("carousel", 20, pytest.approx(0.458, abs=1e-3))
+    values = m.shrunk()
+    assert values.shape == (3, 7, 24)
+    assert values[0, 2, 18] < values[1, 2, 20]
+    # Celdas sin datos quedan en la media de la cuenta
+    assert float(values[0, 0, 0]) == pytest.approx(m.mean())
+
+
+def test_best_falls_back_to_weekly_profile_and_respects_hour() -> None:
+    m = EngagementMatrix("acc")
+    for _ in range(10):
+        m.add("story", 4, 11, 0.6)
+        m.add("reel", 4, 21, 0.3)
+    # Martes sin historial → perfil semanal
+    assert m.best(1, 0)[:2] == ("story", 11)  # type: ignore[index]
+    # Ya pasó el mediodía → sólo quedan horas posteriores con historial
+    assert m.best(4, 12)[:2] == ("reel", 21)  # type: ignore[index]
+    # Nada después de las 22 → mejor hora del perfil semanal completo
+    assert m.best(4, 22)[:2] == ("story", 11)  # type: ignore[index]
+    assert EngagementMatrix("vacía").best(0, 0) is None
+
+
+def test_next_post_and_heatmap_share_cached_matrix(supabase: Any) -> None:
+    now = datetime.now().astimezone()
+    hour = min(now.hour + 1, 23)
+    feedback = [
+        {
+            "account": "acc",
+            "likes": 50,
+            "comments": 10,
+            "saves": 4,
+            "followers": 100,
+            "content_type": "carousel",
+            "posted_at": _at(now.weekday(), hour),
+        }
+    ] * 3
+    db = supabase({"posts_feedback": feedback})
+    client = TestClient(app)
+
+    data = client.get("/scheduler/next_post", params={"account": "acc"}).json()
+    assert data["content_type"] == "carousel"
+    assert data["recommended_time"] == f"{hour:02d}:00"
+
+    heat = client.get("/scheduler/heatmap", params={"account": "acc"}).json()
+    cell = heat["content_types"]["carousel"]
+    assert len(cell["values"]) == 7 and len(cell["values"][0]) == 24
+    assert cell["counts"][now.weekday()][hour] == 3
+    assert db.reads["posts_feedback"] == 1  # la segunda lectura sale del cache
+
+    r = client.post(
+        "/scheduler/feedback",
+        json={
+            "account": "acc",
+            "post_id": "p1",
+            "content_type": "reel",
+            "likes": 1,
+            "comments": 0,
+            "saves": 0,
+            "reach": 10,
+            "followers": 100,
+        },
+    )
+    assert r.status_code == 200
+    heat = client.get("/scheduler/heatmap", params={"account": "acc"}).json()
+    weekday, h = local_slot(datetime.now().astimezone().isoformat())
+    assert heat["observations"] == 4
+    assert heat["content_types"]["reel"]["counts"][weekday][h] == 1
+    assert db.reads["posts_feedback"] == 1
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_row_cap_is_per_account(monkeypatch: Any, supabase: Any, asynchronous: bool) -> None:
+    monkeypatch.setenv("ENGAGEMENT_MATRIX_ROWS", "3")
+    monkeypatch.setenv("KEYSET_PAGE_SIZE", "2")
+    start = datetime(2026, 1, 10, 12, tzinfo=timezone.utc)
+    row = {"likes": 1, "comments": 0, "saves": 0, "followers": 10, "content_type": "reel"}
+    # La cuenta activa tiene todo el feedback reciente; la otra, dos posts viejos
+    feedback = [
+        {**row, "id": i, "account": "busy", "posted_at": (start - timedelta(hours=i)).isoformat()}
+        for i in range(1, 11)
+    ] + [
+        {
+            **row,
+            "id": 100 + i,
+            "account": "quiet",
+            "posted_at": (start - timedelta(days=30 + i)).isoformat(),
+        }
+        for i in range(2)
+    ]
+    db = supabase({"posts_feedback": feedback}, asynchronous=asynchronous)
+    accounts = ["busy", "quiet"]
+
+    if asynchronous:
+        built = asyncio.run(abuild_matrices(db, accounts, lambda r: 1.0))
+    else:
+        built = build_matrices(db, accounts, lambda r: 1.0)
+
+    assert built["busy"].observations == 3
+    assert built["quiet"].observations == 2
+    # Llena la cuenta activa, sigue sólo con la otra: no recorre todo su historial
+    assert sum(db.pages) < len(feedback)
@@ -0,0 +1,118 @@
+import csv
+import gzip
+import io
+import json
+import sys
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.routers.export as export
+from app.main import app
+
+ADMIN = {"X-Admin-Token": "secreto"}
+
+
+@pytest.fixture(autouse=True)
+def _admin_token(monkeypatch: Any) -> None:
+    monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+
+
+def _feedback(n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i,
+            "account": "a" if i % 2 else "b",
+            "post_id": f"p{i}",
+            "content_type": "reel",
+            "likes": i,
+            "comments": 0,
+            "saves": 0,
+            "reach": 10,
+            "followers": 100,
+            "engagement_score": 0.1,
+            "posted_at": f"2026-01-{i:02d}T00:00:00+00:00",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def test_csv_pages_by_keyset_with_filters(supabase: Any) -> None:
+    db = supabase({"posts_feedback": _feedback(20)})
+
+    r = TestClient(app).get(
+        "/export/posts_feedback",
+        params={"account": "a", "since": "2026-01-03T00:00:00+00:00", "page_size": 3},
+        headers=ADMIN,
+    )
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+    assert "attachment" in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [int(x["id"]) for x in rows] == [3, 5, 7, 9, 11, 13, 15, 17, 19]
+    assert max(db.pages) == 3  # nunca más de una página en memoria
+
+
+def test_ndjson_gzip_items(supabase: Any) -> None:
+    items = [
+        {"id": i, "source": "rss", "title": f"t{i}", "url": None, "summary": "s", "created_at": c}
+        for i, c in enumerate(
+            ["2025-12-31T10:00:00", "2026-01-01T10:00:00", "2026-01-02T10:00:00"], 1
+        )
+    ]
+    supabase({"items": items})
+
+    r = TestClient(app).get(
+        "/export/items",
+        params={"format": "ndjson", "until": "2026-01-02", "gzip": "true"},
+        headers=ADMIN,
+    )
+    assert r.headers["content-type"] == "application/gzip"
+    assert r.headers["content-disposition"].endswith('.ndjson.gz"')
+    lines = gzip.decompress(r.content).decode().splitlines()
+    assert [json.loads(x)["id"] for x in lines] == [1, 2]
+
+
+def test_requires_admin_token(supabase: Any, monkeypatch: Any) -> None:
+    db = supabase({"posts_feedback": _feedback(3)})
+    client = TestClient(app)
+
+    assert client.get("/export/posts_feedback").status_code == 422  # sin header
+    bad = {"X-Admin-Token": "otro"}
+    assert client.get("/export/posts_feedback", headers=bad).status_code == 401
+    monkeypatch.delenv("ADMIN_TOKEN")
+    assert client.get("/export/items", headers=ADMIN).status_code == 401
+    assert db.queries == 0
+
+
+def test_parquet_schema_is_fixed_across_pages(supabase: Any) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = _feedback(4)
+    # La primera página no trae ningún `engagement_score`: sin esquema declarado
+    # la columna quedaría `null` y la segunda página no encajaría
+    for r in rows[:2]:
+        r["engagement_score"] = None
+    supabase({"posts_feedback": rows})
+
+    r = TestClient(app).get(
+        "/export/posts_feedback", params={"format": "parquet", "page_size": 2}, headers=ADMIN
+    )
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert str(table.schema.field("engagement_score").type) == "double"
+    assert str(table.schema.field("likes").type) == "int64"
+    assert table.column("engagement_score").to_pylist() == [None, None, 0.1, 0.1]
+
+
+def test_errors(monkeypatch: Any) -> None:
+    client = TestClient(app, headers=ADMIN)
+    assert client.get("/export/items", params={"format": "xml"}).status_code == 422
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)  # pyarrow no instalado
+    assert client.get("/export/items", params={"format": "parquet"}).status_code == 501
+
+    def down() -> Any:
+        raise RuntimeError("sin supabase")
+
+    monkeypatch.setattr(export, "get_client", down)
+    assert client.get("/export/posts_feedback").status_code == 503
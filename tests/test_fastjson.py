@@ -0,0 +1,36 @@
+from typing import Any
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.scheduler_ai import NextPostResponse, next_post
+from app.services.fastjson import dumps, supabase_row
+
+client = TestClient(app)
+
+
+def test_fast_json_matches_standard_path(monkeypatch: Any) -> None:
+    payload = {"accounts": ["vibecodinglatam", "wavwearevision"], "length": 100}
+    monkeypatch.setenv("FAST_JSON", "0")
+    slow = client.post("/scheduler/run_daily", json=payload)
+    monkeypatch.setenv("FAST_JSON", "1")
+    fast = client.post("/scheduler/run_daily", json=payload)
+    assert fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == slow.json()
+
+
+def test_fast_route_keeps_internal_calls_typed(monkeypatch: Any) -> None:
+    monkeypatch.setenv("FAST_JSON", "1")
+    assert isinstance(next_post(account="acc"), NextPostResponse)
+    r = client.get("/scheduler/next_post", params={"account": "acc"})
+    assert r.status_code == 200 and r.json()["account"] == "acc"
+
+
+def test_numpy_payloads() -> None:
+    row = supabase_row(
+        {"embedding": np.array([0.5, -1.0], dtype=np.float32), "score": np.float64(0.25), "n": 3}
+    )
+    assert row == {"embedding": "[0.5,-1.0]", "score": 0.25, "n": 3}
+    assert dumps({"v": np.arange(3, dtype=np.float32)}) == b'{"v":[0.0,1.0,2.0]}'
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.routers.generator as generator
+import app.routers.generator_async as generator_async
+from app.services import generation
+from app.services.metrics import metrics
+
+
+class FakeLLM(ThreadingHTTPServer):
+    """Servidor local compatible con `/chat/completions` (con y sin `stream`)."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay = delay
+        self.fail = False
+        self.calls: List[Dict[str, Any]] = []
+        self.inflight = self.peak = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def answer(self, body: Dict[str, Any]) -> str:
+        prompt = body["messages"][-1]["content"]
+        if "separados por espacios" in prompt:
+            return "#IA #Marketing #IA #Agentes"
+        if "imagen" in prompt:
+            return "Ilustración isométrica de agentes de IA"
+        return "Los agentes de IA ya escriben campañas."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeLLM
+
+    def log_message(self, *_: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with srv.lock:
+            srv.calls.append(body)
+            srv.inflight += 1
+            srv.peak = max(srv.peak, srv.inflight)
+        try:
+            time.sleep(srv.delay)
+            if srv.fail:
+                self.send_response(500)
+                self.end_headers()
+                return
+            text = srv.answer(body)
+            self.send_response(200)
+            if not body.get("stream"):
+                payload = {"choices": [{"message": {"role": "assistant", "content": text}}]}
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps(payload).encode())
+                return
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for word in text.split(" "):
+                chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        finally:
+            with srv.lock:
+                srv.inflight -= 1
+
+
+@pytest.fixture
+def llm(monkeypatch: Any) -> Iterator[FakeLLM]:
+    server = FakeLLM(delay=0.2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("GENERATION_BACKEND", "openai")
+    monkeypatch.setenv("GENERATION_BASE_URL", server.url)
+    generation.reset_backend()
+    yield server
+    server.shutdown()
+    server.server_close()
+    generation.reset_backend()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_backend() -> Iterator[None]:
+    generation.reset_backend()
+    yield
+    generation.reset_backend()
+
+
+def _app(router: Any) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _events(r: httpx.Response) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in r.text.splitlines() if line]
+
+
+def test_template_backend_is_default_and_uses_account_style() -> None:
+    r = _app(generator.router).post(
+        "/generator/post",
+        json={"topic": "IA aplicada", "account": "vibecodinglatam", "keywords": ["agentes"]},
+    )
+    data = r.json()
+    assert data["text"] == "IA aplicada (tono innovador, optimista y tecnológico).  agentes"
+    assert data["hashtags"] == ["#Agentes", "#IA", "#Innovacion", "#Comunidad"]
+    assert "vibecodinglatam" in data["visual_prompt"]
+
+
+def test_llm_fields_generated_in_parallel_and_cached_by_normalized_request(llm: FakeLLM) -> None:
+    client = _app(generator.router)
+    t0 = time.perf_counter()
+    r = client.post("/generator/post", json={"topic": "IA  en marketing", "account": "Acc"})
+    elapsed = time.perf_counter() - t0
+    assert r.json() == {
+        "text": "Los agentes de IA ya escriben campañas.",
+        "hashtags": ["#IA", "#Marketing", "#Agentes"],
+        "visual_prompt": "Ilustración isométrica de agentes de IA",
+    }
+    assert llm.peak == 3 and elapsed < 0.5  # tres llamadas de 0.2 s a la vez
+
+    hits = metrics.counter("generation.cache.hits")
+    again = client.post("/generator/post", json={"topic": " IA en marketing ", "account": "acc"})
+    assert again.json() == r.json()
+    assert len(llm.calls) == 3
+    assert metrics.counter("generation.cache.hits") == hits + 1
+
+
+def test_failed_field_falls_back_to_template_and_is_not_cached(llm: FakeLLM) -> None:
+    llm.fail = True
+    client = _app(generator.router)
+    payload = {"topic": "Cultura", "account": "wavwearevision"}
+    r = client.post("/generator/post", json=payload)
+    assert r.json()["hashtags"] == ["#Liderazgo", "#Cultura", "#Proposito"]
+    llm.fail = False
+    assert client.post("/generator/post", json=payload).json()["hashtags"][0] == "#IA"
+
+
+def test_stream_emits_tokens_then_fields_then_done(llm: FakeLLM) -> None:
+    r = _app(generator.router).post("/generator/post/stream", json={"topic": "IA"})
+    events = _events(r)
+    kinds = [e["type"] for e in events]
+    assert kinds[0] == "token" and kinds[-3:] == ["field", "field", "done"]
+    tokens = "".join(e["delta"] for e in events if e["type"] == "token")
+    assert tokens.strip() == events[-1]["data"]["text"]
+    assert events[-1]["cached"] is False
+    assert [e["field"] for e in events if e["type"] == "field"] == ["hashtags", "visual_prompt"]
+    assert sum(bool(c["stream"]) for c in llm.calls) == 1  # sólo el copy va en streaming
+
+    replay = _events(_app(generator.router).post("/generator/post/stream", json={"topic": "IA"}))
+    assert replay[-1]["cached"] is True and replay[-1]["data"] == events[-1]["data"]
+
+
+def test_stream_clamps_copy_to_length(llm: FakeLLM, monkeypatch: Any) -> None:
+    monkeypatch.setattr(FakeLLM, "answer", lambda self, body: "palabra " * 40)
+    r = _app(generator.router).post("/generator/post/stream", json={"topic": "IA", "length": 80})
+    text = _events(r)[-1]["data"]["text"]
+    assert len(text) == 80 and text.endswith("…")
+
+
+def test_async_router_streams_and_gathers_fields(llm: FakeLLM) -> None:
+    client = _app(generator_async.router)
+    r = client.post("/generator/post", json={"topic": "Agentes", "account": "acc"})
+    assert r.json()["hashtags"] == ["#IA", "#Marketing", "#Agentes"]
+    assert llm.peak == 3
+
+    events = _events(client.post("/generator/post/stream?format=ndjson", json={"topic": "Nuevo"}))
+    assert events[-1]["type"] == "done" and events[-1]["data"]["visual_prompt"]
+    assert client.post("/generator/post/stream?format=xml", json={"topic": "x"}).status_code == 422
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Presupuesto del cold start; configurable para runners lentos de CI
+TIME_BUDGET_S = float(os.getenv("IMPORT_TIME_BUDGET_S", "1.5"))
+MEMORY_BUDGET_MB = float(os.getenv("IMPORT_MEMORY_BUDGET_MB", "60"))
+HEAVY_MODULES = ("numpy", "supabase", "openai")
+
+_PROBE = """
+import json, resource, sys, time
+rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+import app.main  # noqa: F401
+elapsed = time.perf_counter() - t0
+rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [m for m in %r if m in sys.modules]
+print(json.dumps({"seconds": elapsed, "rss_mb": (rss1 - rss0) / 1024, "heavy": heavy}))
+""" % (HEAVY_MODULES,)
+
+
+def _top_imports(stderr: str, n: int = 10) -> str:
+    """Resume la salida de `-X importtime` con los imports acumulados más caros."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:") :].split("|")]
+        try:
+            rows.append((int(parts[1]), parts[2]))
+        except (IndexError, ValueError):
+            continue
+    rows.sort(reverse=True)
+    return "\n".join(f"{us / 1000:8.1f} ms  {name}" for us, name in rows[:n])
+
+
+def test_import_app_main_within_budget() -> None:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    top = _top_imports(proc.stderr)
+
+    assert report["heavy"] == [], f"imports pesados en el arranque: {report['heavy']}\n{top}"
+    assert (
+        report["seconds"] <= TIME_BUDGET_S
+    ), f"import app.main tomó {report['seconds']:.3f}s (budget {TIME_BUDGET_S}s)\n{top}"
+    assert (
+        report["rss_mb"] <= MEMORY_BUDGET_MB
+    ), f"import app.main usó {report['rss_mb']:.1f} MB (budget {MEMORY_BUDGET_MB} MB)\n{top}"
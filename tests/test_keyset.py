@@ -0,0 +1,58 @@
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services.keyset import KeysetScan
+
+
+def _rows() -> List[Dict[str, Any]]:
+    # Inserts en bulk: varios items comparten created_at
+    return [
+        {"id": i, "created_at": f"2026-01-0{1 + i // 4}T00:00:00+00:00", "account": "a"}
+        for i in range(1, 12)
+    ]
+
+
+def test_compound_key_desc_never_loses_ties_between_pages(supabase: Any) -> None:
+    db = supabase({"items": _rows()})
+    scan = KeysetScan(db, "items", key=("created_at", "id"), desc=True, page_size=3)
+    ids = [r["id"] for r in scan.rows()]
+    assert ids == list(range(11, 0, -1))
+    assert scan.cursor == ("2026-01-01T00:00:00+00:00", 1)
+
+
+@pytest.mark.parametrize("desc", [True, False])
+def test_compound_key_pages_through_null_values(supabase: Any, desc: bool) -> None:
+    rows = _rows()
+    for row in rows[2:6]:
+        row["created_at"] = None  # filas sin fecha: antes el cursor pedía `created_at.lt.None`
+    db = supabase({"items": rows})
+    scan = KeysetScan(db, "items", key=("created_at", "id"), desc=desc, page_size=3)
+    ids = [r["id"] for r in scan.rows()]
+
+    nulls = [3, 4, 5, 6]
+    dated = sorted((r for r in rows if r["created_at"]), key=lambda r: (r["created_at"], r["id"]))
+    expected = [r["id"] for r in dated]
+    # Orden de Postgres: NULL al principio en desc, al final en asc
+    assert ids == (nulls[::-1] + expected[::-1] if desc else expected + nulls)
+
+
+def test_single_key_resume_max_rows_and_chunks(supabase: Any) -> None:
+    db = supabase({"items": _rows()})
+    scan = KeysetScan(db, "items", page_size=4, after=(2,), max_rows=5, prefetch=False)
+    chunks = list(scan.chunks())
+    assert [c["id"] for c in chunks] == [[3, 4, 5, 6], [7]]
+    assert db.queries == 2
+
+
+def test_next_page_is_prefetched_while_caller_processes_current(supabase: Any) -> None:
+    db = supabase({"items": _rows()})
+    pages = KeysetScan(db, "items", page_size=5).pages()
+    next(pages)
+    # Sin pedir la siguiente página, ya se está consultando en segundo plano
+    deadline = time.monotonic() + 1
+    while db.queries < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert db.queries == 2
+    assert [r["id"] for r in next(pages)] == [6, 7, 8, 9, 10]
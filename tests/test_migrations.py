@@ -0,0 +1,199 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import pytest
+
+from app.jobs import migrate, query_plans
+from app.routers import export, scheduler_ai, semantic
+from app.services import daily_plan, dedup, embeddings, recent_items, scheduler_core
+from app.services.daily_runs import fetch_runs
+from app.services.engagement_matrix import build_matrices
+from app.services.shared_index import load_from_supabase
+from app.services.vector_store import LocalVectorStore
+
+
+def test_migrations_are_numbered_in_order_and_transaction_free() -> None:
+    migrations = migrate.discover()
+    assert [int(m.version) for m in migrations] == list(range(1, len(migrations) + 1))
+    for m in migrations:
+        # Cada migración corre dentro de la transacción del runner
+        sql = re.sub(r"--.*", "", m.sql()).lower()
+        assert not re.search(r"^\s*(begin|commit)\s*;", sql, re.M), m.path.name
+        assert "concurrently" not in sql, m.path.name
+
+
+def test_discover_rejects_bad_names_and_duplicate_versions(tmp_path: Path) -> None:
+    (tmp_path / "0001_init.sql").write_text("select 1;")
+    (tmp_path / "0001_other.sql").write_text("select 2;")
+    with pytest.raises(ValueError, match="repetida"):
+        migrate.discover(tmp_path)
+    (tmp_path / "0001_other.sql").unlink()
+    (tmp_path / "loose.sql").write_text("select 3;")
+    with pytest.raises(ValueError, match="inválido"):
+        migrate.discover(tmp_path)
+
+
+def test_hot_queries_only_touch_tables_created_by_migrations() -> None:
+    created = set()
+    for m in migrate.discover():
+        created |= set(re.findall(r"create table if not exists (?:public\.)?(\w+)", m.sql(), re.I))
+    touched = {re.search(r"from public\.(\w+)", q.sql).group(1) for q in query_plans.HOT_QUERIES}
+    assert touched <= created
+
+
+def test_item_embeddings_upsert_key_is_unique() -> None:
+    # upsert(on_conflict="item_id,model") necesita un índice único exacto
+    sql = "\n".join(m.sql() for m in migrate.discover())
+    assert re.search(
+        r"create unique index if not exists \w+\s+on public\.item_embeddings \(item_id, model\)",
+        sql,
+    )
+
+
+def _shape(sql: str) -> Tuple[str, FrozenSet[str], Tuple[Tuple[str, bool], ...]]:
+    """(tabla, columnas filtradas, order) del SQL de un `HotQuery`."""
+    table = re.search(r"from public\.(\w+)", sql).group(1)  # type: ignore[union-attr]
+    body = re.sub(r"'[^']*'", "''", sql)
+    where = re.search(r" where (.*?)(?: order by | limit |$)", body)
+    cols = re.findall(r"(\w+) (?:=|<|>|<=|>=|is) ", where.group(1)) if where else []
+    order = re.search(r" order by (.*?)(?: limit |$)", body)
+    keys = [k.split() for k in order.group(1).split(",")] if order else []
+    return table, frozenset(cols), tuple((k[0], k[-1] == "desc") for k in keys)
+
+
+def test_hot_queries_match_the_builder_calls(
+    tmp_path: Path, monkeypatch: Any, supabase: Any
+) -> None:
+    monkeypatch.setenv("KEYSET_PAGE_SIZE", "1")  # dos páginas: la segunda lleva el cursor
+    model = embeddings.DEFAULT_EMBEDDING_MODEL
+    now = datetime.now(timezone.utc)
+    ago = [(now - timedelta(hours=h)).isoformat() for h in (1, 2)]
+    db = supabase(
+        {
+            "items": [
+                {"id": i, "title": f"IA {i}", "summary": "", "created_at": ago[i - 1]}
+                for i in (1, 2)
+            ],
+            "posts_feedback": [
+                {"id": 1, "account": "plans_a", "posted_at": ago[0]},
+                {"id": 2, "account": "plans_a", "posted_at": ago[1]},
+                {"id": 3, "account": "plans_b", "posted_at": ago[0]},
+            ],
+            "item_embeddings": [
+                {"item_id": i, "model": model, "created_at": ago[i - 1], "embedding": [1.0, 0.0]}
+                for i in (1, 2)
+            ],
+        }
+    )
+    accounts = ["plans_a", "plans_b"]
+    # Llamada real que emite cada consulta caliente; -1 = última página (con cursor)
+    drivers: Dict[str, Tuple[Callable[[], Any], int]] = {
+        "recent_items": (lambda: recent_items._query(db).execute(), 0),
+        "trends_page": (lambda: scheduler_ai._trends(6), -1),
+        "dedup_rebuild": (lambda: dedup.rebuild(db), 0),
+        "engagement_matrix": (lambda: build_matrices(db, accounts, lambda r: 1.0), 0),
+        "engagement_matrix_account_page": (
+            lambda: build_matrices(db, accounts[:1], lambda r: 1.0),
+            -1,
+        ),
+        "model_params": (lambda: scheduler_core.load_model_params(db, accounts), 0),
+        "daily_plan": (lambda: daily_plan.load(db, now.date().isoformat(), accounts), 0),
+        "daily_runs": (lambda: fetch_runs(db, accounts, now.date().isoformat()), 0),
+        "embed_status": (lambda: semantic.embed_status("987654"), 0),
+        "shared_index": (lambda: load_from_supabase(db, model), 0),
+        "vector_store_sync": (lambda: LocalVectorStore(tmp_path, model).sync(db, page_size=1), -1),
+        "export_posts_feedback": (
+            lambda: list(export._pages(db, "posts_feedback", 1, "plans_a", None, None)),
+            -1,
+        ),
+    }
+    assert set(drivers) == {q.name for q in query_plans.HOT_QUERIES}
+    try:
+        for q in query_plans.HOT_QUERIES:
+            run, page = drivers[q.name]
+            db.selects.clear()
+            run()
+            table, filters, order = _shape(q.sql)
+            emitted = [s for s in db.selects if s.table == table]
+            assert emitted, q.name
+            assert (emitted[page].filters, emitted[page].order) == (filters, order), q.name
+    finally:
+        dedup.reset()
+        scheduler_core.forget_params()
+
+
+class FakeConn:
+    """Conexión psycopg mínima: guarda lo ejecutado y el registro de migraciones."""
+
+    def __init__(self, ledger: Optional[Dict[str, str]] = None) -> None:
+        self.ledger = ledger
+        self.executed: List[Tuple[str, Any]] = []
+        self.plan: Any = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        yield
+
+    def execute(self, sql: str, params: Any = None) -> Any:
+        self.executed.append((sql, params))
+        result: List[Any] = []
+        if sql.startswith("select to_regclass"):
+            result = [(None if self.ledger is None else "schema_migrations",)]
+        elif sql.startswith("select version"):
+            result = list((self.ledger or {}).items())
+        elif (
+            sql.startswith("create table if not exists public.schema_migrations") or "\n" in sql[:1]
+        ):
+            self.ledger = {} if self.ledger is None else self.ledger
+        elif sql.startswith("insert into public.schema_migrations"):
+            version, _, checksum = params
+            self.ledger = {**(self.ledger or {}), version: checksum}
+        elif sql.startswith("explain"):
+            result = [(self.plan,)]
+        return type("Cursor", (), {"fetchone": lambda s: result[0], "fetchall": lambda s: result})()
+
+
+def test_apply_runs_only_pending_and_warns_on_changed(tmp_path: Path) -> None:
+    (tmp_path / "0001_init.sql").write_text("create table if not exists public.a (id int);")
+    (tmp_path / "0002_idx.sql").write_text("create index if not exists a_id on public.a (id);")
+    migrations = migrate.discover(tmp_path)
+
+    conn = FakeConn()
+    logs: List[str] = []
+    assert migrate.apply(conn, migrations, log=logs.append) == 2
+    assert conn.ledger == {m.version: m.checksum for m in migrations}
+
+    (tmp_path / "0001_init.sql").write_text("create table if not exists public.a (id bigint);")
+    (tmp_path / "0003_more.sql").write_text("select 1;")
+    conn.executed.clear()
+    assert migrate.apply(conn, migrate.discover(tmp_path), log=logs.append) == 1
+    ran = [sql for sql, _ in conn.executed]
+    assert "select 1;" in ran and not any("bigint" in sql for sql in ran)
+    assert any("0001_init.sql cambió" in line for line in logs)
+
+
+def test_explain_flags_sequential_scans() -> None:
+    conn = FakeConn()
+    conn.plan = [
+        {
+            "Plan": {
+                "Node Type": "Limit",
+                "Plans": [
+                    {
+                        "Node Type": "Sort",
+                        "Plans": [{"Node Type": "Seq Scan", "Relation Name": "items"}],
+                    }
+                ],
+            }
+        }
+    ]
+    report = query_plans.check(conn, query_plans.HOT_QUERIES[:1])[0]
+    assert report.seq_scans == ["items"] and report.error is None
+    assert conn.executed[0][0] == "set local enable_seqscan = off"
+
+    conn.plan = '[{"Plan": {"Node Type": "Index Scan", "Index Name": "items_created_at_id_idx"}}]'
+    report = query_plans.check(conn, query_plans.HOT_QUERIES[:1])[0]
+    assert report.seq_scans == [] and report.indexes == ["items_created_at_id_idx"]
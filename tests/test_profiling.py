@@ -0,0 +1,108 @@
+import marshal
+import pstats
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import debug
+from app.services.profiling import ProfileStore, ProfilingMiddleware, samples_to_stats
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def _slow_sync() -> None:
+    time.sleep(0.15)
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow() -> dict:  # sync: corre en el threadpool, fuera del event loop
+        _slow_sync()
+        return {"ok": True}
+
+    @app.get("/fast")
+    async def fast() -> dict:
+        return {"ok": True}
+
+    app.include_router(debug.router)
+    app.add_middleware(ProfilingMiddleware)
+    return app
+
+
+@pytest.fixture
+def client(monkeypatch: Any, tmp_path: Path) -> TestClient:
+    monkeypatch.setenv("PROFILING_ENABLED", "true")
+    monkeypatch.setenv("PROFILING_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILING_KEEP", "2")
+    monkeypatch.setenv("PROFILING_INTERVAL_MS", "2")
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    return TestClient(_app())
+
+
+def test_sampling_profile_sees_sync_endpoint_in_threadpool(client: TestClient) -> None:
+    r = client.get("/slow", headers={"X-Profile": "1", **ADMIN})
+    assert r.status_code == 200 and r.json() == {"ok": True}
+    profile_id = r.headers["x-profile-id"]
+
+    listing = client.get("/debug/profiles", headers=ADMIN).json()["profiles"]
+    assert [p["id"] for p in listing] == [profile_id]
+    assert listing[0]["path"] == "/slow" and listing[0]["status"] == 200
+    assert listing[0]["mode"] == "sample" and listing[0]["duration_ms"] >= 150
+
+    raw = client.get(f"/debug/profiles/{profile_id}", headers=ADMIN)
+    assert raw.status_code == 200
+    stats = marshal.loads(raw.content)
+    funcs = {name: row for (_, _, name), row in stats.items()}
+    assert "_slow_sync" in funcs and funcs["_slow_sync"][3] >= 0.05  # tiempo acumulado
+
+    text = client.get(f"/debug/profiles/{profile_id}?format=text", headers=ADMIN)
+    assert "_slow_sync" in text.text
+
+
+def test_cprofile_mode_is_deterministic_on_event_loop(client: TestClient) -> None:
+    r = client.get("/fast", headers={"X-Profile": "cprofile", **ADMIN})
+    path = Path(client.get("/debug/profiles", headers=ADMIN).json()["dir"])
+    stats = pstats.Stats(str(path / f"{r.headers['x-profile-id']}.prof"))
+    assert any(name == "fast" for (_, _, name) in stats.stats)
+
+
+def test_requires_header_admin_token_and_config(client: TestClient, monkeypatch: Any) -> None:
+    assert "x-profile-id" not in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/fast", headers={"X-Profile": "1"}).headers
+    bad = {"X-Profile": "1", "X-Admin-Token": "nope"}
+    assert "x-profile-id" not in client.get("/fast", headers=bad).headers
+    assert client.get("/debug/profiles", headers={"X-Admin-Token": "nope"}).status_code == 401
+    assert client.get("/debug/profiles", headers=ADMIN).json()["profiles"] == []
+
+    monkeypatch.setenv("PROFILING_ENABLED", "false")
+    assert "x-profile-id" not in client.get("/fast", headers={"X-Profile": "1", **ADMIN}).headers
+    assert client.get("/debug/profiles", headers=ADMIN).status_code == 404
+
+
+def test_ring_keeps_newest_and_rejects_traversal(client: TestClient) -> None:
+    ids = [client.get("/fast", headers={"X-Profile": "1", **ADMIN}).headers["x-profile-id"]]
+    for _ in range(2):
+        time.sleep(0.01)  # mtimes distintos
+        r = client.get("/fast", headers={"X-Profile": "1", **ADMIN})
+        ids.append(r.headers["x-profile-id"])
+    listing = client.get("/debug/profiles", headers=ADMIN).json()["profiles"]
+    assert [p["id"] for p in listing] == ids[:0:-1]
+    assert client.get(f"/debug/profiles/{ids[0]}", headers=ADMIN).status_code == 404
+    assert client.get("/debug/profiles/..%2F..%2Fetc%2Fpasswd", headers=ADMIN).status_code == 404
+
+
+def test_samples_to_stats_builds_callers_and_cumulative(tmp_path: Path) -> None:
+    a, b, c = ("m.py", 1, "a"), ("m.py", 5, "b"), ("m.py", 9, "c")
+    stats = samples_to_stats({(a, b): 3, (a, b, c): 1, (a,): 2}, 0.01)
+    assert stats[a][:4] == (6, 6, pytest.approx(0.02), pytest.approx(0.06))
+    assert stats[b][2:4] == (pytest.approx(0.03), pytest.approx(0.04))
+    assert stats[c][4] == {b: (1, 1, pytest.approx(0.01), pytest.approx(0.01))}
+    ProfileStore(tmp_path).save("20260101T000000-0000abcd", stats, {})
+    loaded = pstats.Stats(str(tmp_path / "20260101T000000-0000abcd.prof"))
+    assert loaded.total_tt == pytest.approx(0.06)
@@ -0,0 +1,44 @@
+import time
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import warmup
+
+
+def test_ready_before_warmup() -> None:
+    warmup.reset()
+    r = TestClient(app).get("/ready")
+    assert r.status_code == 503
+    assert r.json()["status"] == "warming_up"
+
+
+def test_ready_after_lifespan_warmup(monkeypatch: Any) -> None:
+    calls: list[str] = []
+
+    def mock_get_client() -> Any:
+        raise RuntimeError("no supabase")
+
+    monkeypatch.setattr("app.services.warmup.get_client", mock_get_client)
+
+    @warmup.warmup_step("test_step")
+    def _step(supabase: Any) -> None:
+        calls.append("test_step")
+
+    try:
+        with TestClient(app) as client:
+            assert client.get("/health").status_code == 200
+            for _ in range(100):
+                r = client.get("/ready")
+                if r.status_code == 200:
+                    break
+                time.sleep(0.02)
+            assert r.status_code == 200
+            data = r.json()
+            assert data["status"] == "ready"
+            assert data["steps"]["supabase_client"]["status"] == "error"
+            assert data["steps"]["test_step"]["status"] == "ok"
+            assert calls == ["test_step"]
+    finally:
+        warmup._steps[:] = [(n, f) for n, f in warmup._steps if n != "test_step"]
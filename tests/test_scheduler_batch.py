@@ -1,3 +1,5 @@
+import json
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -15,3 +17,30 @@ def test_scheduler_run_daily_single() -> None:
     first = data["results"][0]
     assert "scheduled" in first and "content" in first
     assert "text" in first["content"]
+
+
+def test_scheduler_run_daily_stream_ndjson() -> None:
+    payload = {"accounts": ["vibecodinglatam", "wavwearevision"], "length": 100}
+    with client.stream("POST", "/scheduler/run_daily/stream", json=payload) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in r.iter_lines() if line]
+    assert [rec["type"] for rec in records] == ["result", "result", "summary"]
+    assert records[0]["account"] == "vibecodinglatam"
+    assert "text" in records[0]["data"]["content"]
+    assert records[-1]["accounts"] == 2 and records[-1]["succeeded"] == 2
+
+
+def test_scheduler_run_daily_stream_sse() -> None:
+    payload = {"accounts": ["vibecodinglatam"]}
+    r = client.post("/scheduler/run_daily/stream?format=sse", json=payload)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [b for b in r.text.split("\n\n") if b]
+    assert events[0].startswith("event: result\ndata: ")
+    assert events[-1].startswith("event: summary\ndata: ")
+
+
+def test_scheduler_run_daily_stream_bad_format() -> None:
+    r = client.post("/scheduler/run_daily/stream?format=xml", json={"accounts": ["a"]})
+    assert r.status_code == 422
@@ -0,0 +1,53 @@
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.daily_runs import forget_runs
+
+client = TestClient(app)
+
+
+def _setup(supabase: Any) -> Any:
+    forget_runs()
+    return supabase()
+
+
+def test_run_daily_rerun_is_idempotent(supabase: Any) -> None:
+    fake = _setup(supabase)
+    payload = {"accounts": ["vibecodinglatam", "wavwearevision"]}
+
+    first = client.post("/scheduler/run_daily", json=payload).json()["results"]
+    assert [r["replayed"] for r in first] == [False, False]
+    assert fake.calls.count("insert:items") == 2
+    assert fake.calls.count("upsert:scheduler_daily_runs") == 2
+
+    forget_runs()  # fuerza la lectura desde la tabla (otro proceso / reinicio)
+    second = client.post("/scheduler/run_daily", json=payload).json()["results"]
+    assert [r["replayed"] for r in second] == [True, True]
+    assert [r["item_id"] for r in second] == [r["item_id"] for r in first]
+    assert fake.calls.count("insert:items") == 2
+    assert fake.calls.count("select:scheduler_daily_runs") == 2  # una lectura por corrida
+
+
+def test_run_daily_force_regenerates(supabase: Any) -> None:
+    fake = _setup(supabase)
+    payload = {"accounts": ["vibecodinglatam"]}
+
+    client.post("/scheduler/run_daily", json=payload)
+    r = client.post("/scheduler/run_daily", json={**payload, "force": True}).json()
+    assert r["results"][0]["replayed"] is False
+    assert fake.calls.count("insert:items") == 2
+
+
+def test_run_daily_not_recorded_without_item(monkeypatch: Any) -> None:
+    def mock_get_client_fail() -> Any:
+        raise RuntimeError("no supabase")
+
+    forget_runs()
+    monkeypatch.setattr("app.routers.scheduler_ai.get_client", mock_get_client_fail)
+    payload = {"accounts": ["vibecodinglatam"]}
+
+    client.post("/scheduler/run_daily", json=payload)
+    r = client.post("/scheduler/run_daily", json=payload).json()
+    assert r["results"][0]["replayed"] is False
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import scheduler_core
+from app.services.daily_plan import plan
+from app.services.daily_runs import forget_runs
+from app.services.engagement_matrix import forget_matrices
+from app.services.recent_items import invalidate_recent_items
+
+
+def _tables(
+    feedback: List[Dict[str, Any]], params: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    return {
+        "posts_feedback": feedback,
+        "scheduler_model_params": params,
+        "items": [{"id": 1, "title": "IA aplicada a marketing", "summary": "agentes"}],
+        "scheduler_daily_runs": [],
+    }
+
+
+def _feedback(account: str, content_type: str, likes: int) -> Dict[str, Any]:
+    posted = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+    return {
+        "account": account,
+        "likes": likes,
+        "comments": 0,
+        "saves": 0,
+        "followers": 100,
+        "content_type": content_type,
+        "posted_at": posted.isoformat(),
+    }
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches() -> Any:
+    for reset in (forget_matrices, forget_runs, invalidate_recent_items, plan.forget):
+        reset()
+    scheduler_core.forget_params()
+    yield
+    for reset in (forget_matrices, forget_runs, invalidate_recent_items, plan.forget):
+        reset()
+    scheduler_core.forget_params()
+
+
+def test_next_post_batch_one_query_per_table(supabase: Any) -> None:
+    accounts = [f"acc{i}" for i in range(6)]
+    feedback = [
+        _feedback(a, "carousel" if i % 2 else "story", 10 + 10 * i) for i, a in enumerate(accounts)
+    ]
+    params = [{"account": "acc1", "w_engagement": 1.0, "w_relevance": 0.0, "learning_rate": 0.05}]
+    db = supabase(_tables(feedback, params))
+
+    r = TestClient(app).post("/scheduler/next_post_batch", json={"accounts": accounts + ["nuevo"]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+
+    assert set(results) == set(accounts) | {"nuevo"}
+    assert results["acc1"]["content_type"] == "carousel"
+    assert results["acc0"]["content_type"] == "story"
+    assert results["acc1"]["priority"] == pytest.approx(0.2)  # w_e=1 → engagement puro
+    assert db.reads == {
+        "items": 1,
+        "posts_feedback": 1,
+        "scheduler_model_params": 1,
+        "scheduler_daily_plan": 1,
+    }
+    # Cuentas sin registro de pesos se crean con defaults en un único insert
+    assert {p["account"] for p in db.tables["scheduler_model_params"]} == {"acc1"} | set(accounts)
+
+
+def test_next_post_batch_matches_single_next_post(supabase: Any) -> None:
+    supabase(_tables([_feedback("solo", "reel", 30)], []))
+    client = TestClient(app)
+
+    single = client.get("/scheduler/next_post", params={"account": "solo"}).json()
+    batch = client.post("/scheduler/next_post_batch", json={"accounts": ["solo"]}).json()
+    assert batch["results"]["solo"] == single
+
+
+def test_run_daily_recommends_all_accounts_in_one_pass(supabase: Any) -> None:
+    accounts = ["a", "b", "c"]
+    db = supabase(_tables([_feedback(a, "post", 20) for a in accounts], []))
+
+    r = TestClient(app).post("/scheduler/run_daily", json={"accounts": accounts})
+    assert r.status_code == 200
+    assert [x["scheduled"]["account"] for x in r.json()["results"]] == accounts
+    assert db.reads["posts_feedback"] == 1
+    assert db.reads["scheduler_model_params"] == 1
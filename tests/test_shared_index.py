@@ -0,0 +1,110 @@
+import subprocess
+import sys
+import uuid
+from typing import Any, Iterator
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.routers.semantic as semantic
+from app.main import app
+from app.services import shared_index
+from app.services.shared_index import SharedEmbeddingIndex, load_from_supabase
+
+READER = """
+import sys
+from app.services.shared_index import SharedEmbeddingIndex
+
+view = SharedEmbeddingIndex(sys.argv[1]).view()
+assert not view.matrix.flags.writeable
+print(view.epoch, len(view), view.neighbors(int(sys.argv[2]), 1)[0][0])
+"""
+
+
+@pytest.fixture
+def publisher() -> Iterator[SharedEmbeddingIndex]:
+    index = SharedEmbeddingIndex(f"wav-test-{uuid.uuid4().hex[:8]}")
+    assert index.try_become_publisher()
+    yield index
+    index.close()
+
+
+def _read_in_worker(name: str, item_id: int) -> str:
+    out = subprocess.run(
+        [sys.executable, "-c", READER, name, str(item_id)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return out.stdout.strip()
+
+
+def test_other_process_maps_index_and_sees_epoch_swap(publisher: SharedEmbeddingIndex) -> None:
+    matrix = np.array([[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    assert publisher.publish([30, 10, 20, 40], matrix) == 1
+    assert _read_in_worker(publisher.name, 30) == "1 4 10"
+
+    # Sólo un publicador por nombre
+    assert not SharedEmbeddingIndex(publisher.name).try_become_publisher()
+
+    assert publisher.publish([30, 50], np.array([[1, 0, 0], [1, 0.1, 0]])) == 2
+    assert _read_in_worker(publisher.name, 30) == "2 2 50"
+
+
+def test_reader_follows_publisher_restart(publisher: SharedEmbeddingIndex) -> None:
+    publisher.publish([1, 2], np.array([[1, 0], [0, 1]], dtype=np.float32))
+    reader = SharedEmbeddingIndex(publisher.name)
+    assert reader.view().ids.tolist() == [1, 2]  # type: ignore[union-attr]
+
+    # Reinicio ordenado: el control viejo se desvincula y el nuevo empieza en epoch 1
+    publisher.close()
+    assert reader.view() is None
+    restarted = SharedEmbeddingIndex(publisher.name)
+    assert restarted.try_become_publisher()
+    try:
+        restarted.publish([7, 8, 9], np.eye(3, dtype=np.float32))
+        view = reader.view()
+        assert view is not None and view.epoch == 1 and view.ids.tolist() == [7, 8, 9]
+        assert restarted.publish([7], np.eye(1, dtype=np.float32)) == 2
+        assert reader.view().ids.tolist() == [7]  # type: ignore[union-attr]
+    finally:
+        reader.close()
+        restarted.close()
+
+
+def test_index_name_is_read_on_start(monkeypatch: Any) -> None:
+    # `.env` se carga después de importar el módulo: el nombre se resuelve al arrancar
+    monkeypatch.setattr(shared_index, "index", SharedEmbeddingIndex())
+    monkeypatch.setenv("EMBED_INDEX_NAME", "wav-from-env")
+    monkeypatch.delenv("EMBED_INDEX_ENABLED", raising=False)
+    assert shared_index.start_index() is False
+    assert shared_index.index.name == "wav-from-env"
+
+
+def test_similar_endpoint(monkeypatch: Any, publisher: SharedEmbeddingIndex) -> None:
+    monkeypatch.setattr(semantic, "embed_index", publisher)
+    client = TestClient(app)
+    assert client.get("/semantic/similar/1").status_code == 503
+
+    publisher.publish([1, 2, 3], np.array([[1, 0], [0.8, 0.2], [0, 1]], dtype=np.float32))
+    r = client.get("/semantic/similar/1", params={"k": 2}).json()
+    assert r["index_epoch"] == 1
+    assert [x["item_id"] for x in r["results"]] == [2, 3]
+    assert r["results"][0]["similarity"] > r["results"][1]["similarity"]
+    assert client.get("/semantic/similar/99").status_code == 404
+
+
+def test_load_from_supabase_keeps_majority_dimension(supabase: Any) -> None:
+    model = "text-embedding-3-small"
+    rows = [
+        {"item_id": 1, "model": model, "embedding": "[1,0,0]"},
+        {"item_id": 2, "model": model, "embedding": [0, 1, 0]},
+        {"item_id": 3, "model": model, "embedding": "[1,0]"},  # dimensión vieja
+        {"item_id": 4, "model": model},  # sin vector
+        {"item_id": 5, "model": "otro", "embedding": "[0,0,1]"},
+    ]
+
+    db = supabase({"item_embeddings": rows}, patch=False)
+    ids, matrix = load_from_supabase(db, model)
+    assert ids.tolist() == [2, 1] and matrix.shape == (2, 3) and matrix.dtype == np.float32
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import singleflight
+from app.services.metrics import metrics
+from app.services.singleflight import invalidate_tag, single_flight
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    calls: List[int] = []
+
+    @single_flight("test.slow", ttl=0)
+    def slow(x: int) -> dict:
+        calls.append(x)
+        time.sleep(0.1)
+        return {"x": x}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(slow, [1] * 6 + [2] * 2))
+
+    assert sorted(calls) == [1, 2]
+    assert results[0] is results[5]  # mismo objeto compartido
+    assert metrics.counter("singleflight.test.slow.collapsed") >= 6
+    # ttl=0: sin cache, la siguiente llamada vuelve a ejecutar
+    slow(1)
+    assert calls.count(1) == 2
+
+
+def test_errors_propagate_to_waiters_and_are_not_cached() -> None:
+    attempts = {"n": 0}
+    gate = threading.Event()
+
+    @single_flight("test.boom", ttl=10)
+    def boom() -> None:
+        attempts["n"] += 1
+        gate.wait(1)
+        raise RuntimeError("supabase caído")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(boom) for _ in range(3)]
+        time.sleep(0.05)
+        gate.set()
+        for f in futures:
+            with pytest.raises(RuntimeError):
+                f.result()
+    assert attempts["n"] == 1
+    with pytest.raises(RuntimeError):
+        boom()
+    assert attempts["n"] == 2
+
+
+def test_ttl_and_tag_invalidation() -> None:
+    calls = {"n": 0}
+
+    @single_flight("test.cached", ttl=60, tags=("items",))
+    def cached() -> int:
+        calls["n"] += 1
+        return calls["n"]
+
+    assert cached() == 1 and cached() == 1
+    invalidate_tag("items")
+    assert cached() == 2
+    singleflight.invalidate("test.cached")
+
+
+def test_invalidation_during_flight_is_not_overwritten_by_stale_result() -> None:
+    source = {"version": 1}
+    started, release = threading.Event(), threading.Event()
+
+    @single_flight("test.racy", ttl=60, tags=("test.racy",))
+    def read() -> int:
+        value = source["version"]
+        started.set()
+        release.wait(1)
+        return value
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(read)
+        started.wait(1)
+        source["version"] = 2  # escritura + invalidación con el líder en vuelo
+        invalidate_tag("test.racy")
+        release.set()
+        assert leader.result() == 1
+    assert read() == 2
+
+
+def test_async_invalidation_during_flight_is_not_cached() -> None:
+    source = {"version": 1}
+
+    @single_flight("test.aracy", ttl=60, tags=("test.aracy",))
+    async def read() -> int:
+        value = source["version"]
+        await asyncio.sleep(0.05)
+        return value
+
+    async def scenario() -> None:
+        leader = asyncio.ensure_future(read())
+        await asyncio.sleep(0.01)
+        source["version"] = 2
+        invalidate_tag("test.aracy")
+        assert await read() == 2  # no se suma al vuelo viejo
+        assert await leader == 1
+        assert await read() == 2
+
+    asyncio.run(scenario())
+
+
+def test_weights_endpoint_collapses_concurrent_requests(supabase: Any) -> None:
+    params = {"account": "acc", "w_engagement": 0.7, "w_relevance": 0.3, "learning_rate": 0.05}
+    db = supabase({"scheduler_model_params": [params]}, delay=0.2)
+
+    client = TestClient(app)
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        responses = list(
+            pool.map(
+                lambda _: client.get("/scheduler/weights", params={"account": "acc"}), range(5)
+            )
+        )
+
+    assert all(r.status_code == 200 and r.json()["w_engagement"] == 0.7 for r in responses)
+    assert db.reads["scheduler_model_params"] == 1
+    assert (
+        client.get("/metrics").json()["counters"]["singleflight.scheduler.weights.collapsed"] >= 4
+    )
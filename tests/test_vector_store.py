@@ -0,0 +1,118 @@
+import threading
+from pathlib import Path
+from typing import Any, List
+
+import numpy as np
+
+from app.services.vector_store import LocalVectorStore
+
+MODEL = "text-embedding-3-small"
+
+
+def _add(db: Any, item_id: int, ts: str, vec: List[float]) -> None:
+    row = {"item_id": item_id, "created_at": ts, "model": MODEL, "embedding": vec}
+    db.tables.setdefault("item_embeddings", []).append(row)
+
+
+def test_restart_maps_disk_and_fetches_only_rows_past_watermark(
+    tmp_path: Path, supabase: Any
+) -> None:
+    db = supabase()
+    for i in range(1, 6):  # insert en bulk: mismo created_at
+        _add(db, i, "2026-01-01T00:00:00+00:00", [float(i), 0.0, 1.0])
+
+    store = LocalVectorStore(tmp_path, MODEL)
+    assert store.sync(db, page_size=2) == 5
+    assert store.watermark == ("2026-01-01T00:00:00+00:00", 5)
+
+    _add(db, 6, "2026-01-02T00:00:00+00:00", [6.0, 0.0, 1.0])
+    db.pages.clear()
+    restarted = LocalVectorStore(tmp_path, MODEL)
+    ids, matrix = restarted.arrays()
+    assert isinstance(matrix, np.memmap) and ids.tolist() == [1, 2, 3, 4, 5]
+
+    assert restarted.sync(db, page_size=2) == 1
+    assert sum(db.pages) == 1
+    ids, matrix = restarted.arrays()
+    assert ids.tolist() == [1, 2, 3, 4, 5, 6] and matrix[-1].tolist() == [6.0, 0.0, 1.0]
+
+
+def test_reembedded_item_wins_and_compaction_drops_deleted(tmp_path: Path, supabase: Any) -> None:
+    db = supabase()
+    _add(db, 1, "2026-01-01T00:00:00+00:00", [1.0, 0.0])
+    _add(db, 2, "2026-01-01T00:00:01+00:00", [0.0, 1.0])
+    _add(db, 1, "2026-01-01T00:00:02+00:00", [0.5, 0.5])  # re-embebido
+    store = LocalVectorStore(tmp_path, MODEL)
+    store.sync(db)
+
+    ids, matrix = store.arrays()
+    assert ids.tolist() == [2, 1] and matrix[1].tolist() == [0.5, 0.5]
+
+    db.table("item_embeddings").delete().eq("item_id", 2).execute()  # item borrado (cascade)
+    report = store.check(db)
+    assert report["stale"] == 1 and report["duplicates"] == 1 and not report["consistent"]
+
+    assert store.compact(db) == 2
+    assert store.check(db)["consistent"]
+    assert LocalVectorStore(tmp_path, MODEL).arrays()[0].tolist() == [1]
+
+
+def test_interrupted_append_is_truncated_on_open(tmp_path: Path) -> None:
+    store = LocalVectorStore(tmp_path, MODEL)
+    store.append([7], np.ones((1, 4)), ("2026-01-01", 7))
+    with open(store.vectors_path, "ab") as f:
+        f.write(b"\x00" * 10)  # fila a medias sin JSON actualizado
+
+    reopened = LocalVectorStore(tmp_path, MODEL)
+    assert reopened.vectors_path.stat().st_size == 16
+    assert reopened.arrays()[0].tolist() == [7]
+
+
+def test_compact_waits_for_sync_in_other_process_and_rereads_meta(
+    tmp_path: Path, supabase: Any
+) -> None:
+    db = supabase()
+    _add(db, 1, "2026-01-01T00:00:00+00:00", [1.0, 0.0])
+    _add(db, 1, "2026-01-01T00:00:01+00:00", [0.5, 0.5])  # re-embebido: duplicado local
+    server = LocalVectorStore(tmp_path, MODEL)
+    server.sync(db)
+    cli = LocalVectorStore(tmp_path, MODEL)  # `python -m app.jobs.vector_store compact`
+
+    done = threading.Event()
+    with server._locked():  # sync en curso en el servidor
+        worker = threading.Thread(target=lambda: (cli.compact(), done.set()))
+        worker.start()
+        assert not done.wait(0.2)  # compact espera el flock
+    worker.join(timeout=5)
+    assert done.is_set() and cli.count == 1
+
+    # El servidor relee el JSON compactado antes de agregar: no pisa filas
+    _add(db, 2, "2026-01-02T00:00:00+00:00", [0.0, 1.0])
+    assert server.sync(db) == 1 and server.count == 2
+    ids, matrix = LocalVectorStore(tmp_path, MODEL).arrays()
+    assert ids.tolist() == [1, 2] and matrix.tolist() == [[0.5, 0.5], [0.0, 1.0]]
+
+
+def test_rows_synced_during_compaction_snapshot_are_kept(tmp_path: Path, supabase: Any) -> None:
+    db = supabase()
+    _add(db, 1, "2026-01-01T00:00:00+00:00", [1.0, 0.0])
+    server = LocalVectorStore(tmp_path, MODEL)
+    server.sync(db)
+    cli = LocalVectorStore(tmp_path, MODEL)
+    snapshot = cli.remote_ids
+    syncs: List[threading.Thread] = []
+
+    def remote_ids_then_new_item(client: Any) -> Any:
+        ids = snapshot(client)
+        # Llega un item nuevo y el servidor lo sincroniza antes de la reescritura
+        _add(db, 2, "2026-01-02T00:00:00+00:00", [0.0, 1.0])
+        syncs.append(threading.Thread(target=server.sync, args=(db,)))
+        syncs[0].start()
+        syncs[0].join(0.2)
+        return ids
+
+    cli.remote_ids = remote_ids_then_new_item  # type: ignore[method-assign]
+    cli.compact(db)
+    syncs[0].join(timeout=5)
+
+    assert LocalVectorStore(tmp_path, MODEL).arrays()[0].tolist() == [1, 2]